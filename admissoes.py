@@ -0,0 +1,281 @@
+import sqlite3
+import time
+from collections import namedtuple
+
+import senhas
+
+# -------------------------------
+# Admissões: candidaturas seriadas por média e lista de espera
+# -------------------------------
+# Cada candidatura guarda a média do certificado. Enquanto as candidaturas de
+# um curso estão abertas ficam 'pendente'; ao fechar, passam todas para
+# 'em_espera' e as melhores são admitidas até acabarem as vagas. Depois disso
+# cada vaga libertada (Vagas.liberar_vaga) ou criada (Vagas.ajustar_vagas)
+# admite, na mesma transação, o primeiro da fila desse ano letivo (por omissão,
+# o último ano letivo fechado do curso).
+#
+# A fila é o índice idx_candidaturas_fila (curso, ano letivo, estado, média
+# DESC, id): o primeiro em espera é uma descida da árvore, O(log n), e a ordem
+# sobrevive a reinícios e é a mesma para todos os processos.
+#
+# A admissão é feita em lotes de até tamanho_lote candidaturas: um executemany
+# por tabela (alunos, usuarios, matriculas). Um candidato com dados em conflito
+# desfaz só o seu lote, que é então admitido um a um.
+
+TAMANHO_LOTE = 500
+
+CONSULTAS_QUENTES = {
+    "Admissoes.fila": ("""
+        SELECT id FROM candidaturas
+        WHERE curso=? AND ano_letivo=? AND estado=?
+        ORDER BY media_certificado DESC, id
+        LIMIT ?
+    """, ("Informatica", "2025", "em_espera", 1)),
+    "Admissoes.posicao": ("""
+        SELECT COUNT(*) FROM candidaturas
+        WHERE curso=? AND ano_letivo=? AND estado='em_espera'
+          AND (media_certificado > ? OR (media_certificado = ? AND id < ?))
+    """, ("Informatica", "2025", 15.0, 15.0, 1)),
+}
+
+CandidaturaLinha = namedtuple("CandidaturaLinha", "id nome numero_bilhete curso media_certificado estado")
+
+
+class Admissoes:
+    def __init__(self, db_manager, vagas_manager):
+        self.db_manager = db_manager
+        self.vagas_manager = vagas_manager
+        # A partir daqui, liberar_vaga e ajustar_vagas promovem da lista de espera
+        vagas_manager.admissoes = self
+
+    # ---- candidaturas ----
+    def candidatar(self, nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso, media_certificado,
+                   username, senha, ano_letivo):
+        """
+        Regista a candidatura e devolve (id, estado), ou (None, None) se for recusada.
+        Num curso já seriado entra direto na fila e é admitida se houver vaga.
+        """
+        from sistema import validar_idade_e_media
+
+        try:
+            ano = int(str(data_nascimento).split("-")[0])
+        except ValueError:
+            print("⚠️ Data inválida.")
+            return None, None
+        valido, idade = validar_idade_e_media(ano, media_certificado)
+        if not valido:
+            print(f"⚠️ Rejeitado: idade={idade} e média={media_certificado}. Regras: 15-18 anos e média 12-20.")
+            return None, None
+        if genero not in (None, "", "M", "F"):
+            print("⚠️ Gênero inválido (M/F).")
+            return None, None
+        if curso not in {c for c, _, _ in self.vagas_manager.obter_todas()}:
+            print(f"⚠️ O curso {curso} não tem vagas definidas.")
+            return None, None
+
+        # scrypt antes de abrir a transação
+        senha_hash = senhas.gerar_hash(senha)
+        try:
+            with self.db_manager.transacao("IMMEDIATE") as conn:
+                if conn.execute("""
+                    SELECT 1 FROM usuarios WHERE username=?
+                    UNION ALL
+                    SELECT 1 FROM candidaturas WHERE username=? AND estado IN ('pendente', 'em_espera')
+                """, (username, username)).fetchone():
+                    print("⚠️ Nome de usuário já existe.")
+                    return None, None
+                if conn.execute("SELECT 1 FROM alunos WHERE numero_bilhete=?", (numero_bilhete,)).fetchone():
+                    print("⚠️ Já existe um aluno com este bilhete.")
+                    return None, None
+                fechada = conn.execute("SELECT 1 FROM admissoes_fechadas WHERE curso=? AND ano_letivo=?",
+                                       (curso, ano_letivo)).fetchone()
+                cid = conn.execute("""
+                    INSERT INTO candidaturas (nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso,
+                                              media_certificado, ano_letivo, username, senha, estado, criada_em)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso, media_certificado,
+                      ano_letivo, username, senha_hash, "em_espera" if fechada else "pendente",
+                      time.time())).lastrowid
+                if fechada:
+                    self.promover(curso, ano_letivo, conn)
+                estado = conn.execute("SELECT estado FROM candidaturas WHERE id=?", (cid,)).fetchone()[0]
+        except sqlite3.IntegrityError as e:
+            if "candidaturas.numero_bilhete" in str(e):
+                print("⚠️ Já existe uma candidatura ativa com este bilhete para este ano letivo.")
+            elif "candidaturas.username" in str(e):
+                print("⚠️ Nome de usuário já existe.")
+            else:
+                print(f"⚠️ Candidatura recusada: {e}")
+            return None, None
+        if estado == "admitida":
+            self.vagas_manager.invalidar_cache()
+        return cid, estado
+
+    def desistir(self, candidatura_id):
+        """Retira da fila uma candidatura ainda não admitida. True se mudou."""
+        with self.db_manager.transacao() as conn:
+            cursor = conn.execute("""
+                UPDATE candidaturas SET estado='desistiu', senha='', decidida_em=?
+                WHERE id=? AND estado IN ('pendente', 'em_espera')
+            """, (time.time(), candidatura_id))
+        return cursor.rowcount == 1
+
+    # ---- seriação e promoção ----
+    def fechar(self, curso, ano_letivo, tamanho_lote=TAMANHO_LOTE):
+        """Fecha as candidaturas do curso: todas vão para a fila e as melhores ocupam as vagas livres."""
+        with self.db_manager.transacao("IMMEDIATE") as conn:
+            conn.execute("INSERT OR IGNORE INTO admissoes_fechadas (curso, ano_letivo, fechada_em) VALUES (?, ?, ?)",
+                         (curso, ano_letivo, time.time()))
+            conn.execute("UPDATE candidaturas SET estado='em_espera' WHERE curso=? AND ano_letivo=? AND estado='pendente'",
+                         (curso, ano_letivo))
+            admitidas = self.promover(curso, ano_letivo, conn, tamanho_lote)
+            em_espera = conn.execute("""
+                SELECT COUNT(*) FROM candidaturas WHERE curso=? AND ano_letivo=? AND estado='em_espera'
+            """, (curso, ano_letivo)).fetchone()[0]
+        self.vagas_manager.invalidar_cache()
+        return admitidas, em_espera
+
+    def promover(self, curso, ano_letivo=None, conn=None, tamanho_lote=TAMANHO_LOTE):
+        """
+        Admite os primeiros da fila do curso e ano letivo enquanto houver vagas, na transação
+        de `conn` (ou numa nova). Sem ano letivo, usa o último fechado do curso.
+        Devolve a lista de ids de candidatura admitidos.
+        """
+        if conn is None:
+            with self.db_manager.transacao("IMMEDIATE") as conn:
+                admitidas = self.promover(curso, ano_letivo, conn, tamanho_lote)
+            if admitidas:
+                self.vagas_manager.invalidar_cache()
+            return admitidas
+
+        if ano_letivo is None:
+            ano_letivo = self._ultimo_ano_fechado(conn, curso)
+            if ano_letivo is None:
+                return []
+        admitidas = []
+        while True:
+            row = conn.execute("SELECT total_vagas - vagas_ocupadas FROM vagas WHERE curso=?", (curso,)).fetchone()
+            if not row or row[0] <= 0:
+                return admitidas
+            proximos = conn.execute(CONSULTAS_QUENTES["Admissoes.fila"][0],
+                                    (curso, ano_letivo, "em_espera", min(row[0], tamanho_lote))).fetchall()
+            if not proximos:
+                return admitidas
+            admitidas.extend(self._admitir_lote(conn, curso, [cid for (cid,) in proximos]))
+
+    @staticmethod
+    def _ultimo_ano_fechado(conn, curso):
+        row = conn.execute("""
+            SELECT ano_letivo FROM admissoes_fechadas WHERE curso=? ORDER BY fechada_em DESC LIMIT 1
+        """, (curso,)).fetchone()
+        return row[0] if row else None
+
+    def _admitir_lote(self, conn, curso, ids):
+        """
+        Admite as candidaturas `ids` do curso com um executemany por tabela e devolve as admitidas.
+        Se alguma tiver dados em conflito, desfaz o lote e admite uma a uma (_admitir).
+        """
+        linhas = conn.execute(f"""
+            SELECT id, nome, data_nascimento, genero, bairro, numero_bilhete, turma, ano_letivo, username, senha
+            FROM candidaturas WHERE id IN ({','.join('?' * len(ids))})
+        """, ids).fetchall()
+        # Pela ordem da fila: é a ordem das matrículas e dos ids de aluno
+        ordem = {cid: i for i, cid in enumerate(ids)}
+        linhas.sort(key=lambda r: ordem[r[0]])
+        conn.execute("SAVEPOINT admitir_lote")
+        try:
+            if self.vagas_manager.reservar(conn, curso, len(linhas)):
+                # Ids dos alunos atribuídos aqui (transação de escrita): o executemany não devolve lastrowid
+                primeiro = conn.execute("""
+                    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name='alunos'), 0),
+                               COALESCE((SELECT MAX(id) FROM alunos), 0)) + 1
+                """).fetchone()[0]
+                alunos = {cid: primeiro + i for i, (cid, *_) in enumerate(linhas)}
+                conn.executemany("""
+                    INSERT INTO alunos (id, nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(alunos[cid], nome, nascimento, genero, bairro, bilhete, turma, curso)
+                      for cid, nome, nascimento, genero, bairro, bilhete, turma, *_ in linhas])
+                conn.executemany("INSERT INTO usuarios (username, senha, tipo, referencia_id) VALUES (?, ?, 'aluno', ?)",
+                                 [(username, senha_hash, alunos[cid]) for cid, *_, username, senha_hash in linhas])
+                conn.executemany("INSERT INTO matriculas (aluno_id, curso, ano_letivo) VALUES (?, ?, ?)",
+                                 [(alunos[cid], curso, ano_letivo) for cid, *_, ano_letivo, _, _ in linhas])
+                agora = time.time()
+                conn.executemany("""
+                    UPDATE candidaturas SET estado='admitida', aluno_id=?, senha='', decidida_em=? WHERE id=?
+                """, [(aluno_id, agora, cid) for cid, aluno_id in alunos.items()])
+                conn.execute("RELEASE admitir_lote")
+                return [r[0] for r in linhas]
+        except sqlite3.IntegrityError:
+            pass
+        conn.execute("ROLLBACK TO admitir_lote")
+        conn.execute("RELEASE admitir_lote")
+        return [cid for cid in ids if self._admitir(conn, cid)]
+
+    def _admitir(self, conn, cid):
+        """Cria aluno, usuário e matrícula da candidatura e ocupa a vaga. False se não foi possível."""
+        (nome, nascimento, genero, bairro, bilhete, turma, curso, ano_letivo, username,
+         senha_hash) = conn.execute("""
+            SELECT nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso, ano_letivo, username, senha
+            FROM candidaturas WHERE id=?
+        """, (cid,)).fetchone()
+        # Savepoint: um candidato com dados em conflito não desfaz os outros
+        conn.execute("SAVEPOINT admitir")
+        try:
+            if not self.vagas_manager.reservar(conn, curso):
+                conn.execute("ROLLBACK TO admitir")
+                conn.execute("RELEASE admitir")
+                return False
+            aluno_id = conn.execute("""
+                INSERT INTO alunos (nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (nome, nascimento, genero, bairro, bilhete, turma, curso)).lastrowid
+            conn.execute("INSERT INTO usuarios (username, senha, tipo, referencia_id) VALUES (?, ?, 'aluno', ?)",
+                         (username, senha_hash, aluno_id))
+            conn.execute("INSERT INTO matriculas (aluno_id, curso, ano_letivo) VALUES (?, ?, ?)",
+                         (aluno_id, curso, ano_letivo))
+            conn.execute("""
+                UPDATE candidaturas SET estado='admitida', aluno_id=?, senha='', decidida_em=? WHERE id=?
+            """, (aluno_id, time.time(), cid))
+            conn.execute("RELEASE admitir")
+            return True
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK TO admitir")
+            conn.execute("RELEASE admitir")
+            conn.execute("UPDATE candidaturas SET estado='rejeitada', senha='', motivo=?, decidida_em=? WHERE id=?",
+                         (str(e), time.time(), cid))
+            return False
+
+    # ---- consultas ----
+    def posicao(self, candidatura_id):
+        """Posição (1 = próximo a entrar) de uma candidatura em espera, ou None."""
+        with self.db_manager.conexao() as conn:
+            row = conn.execute("SELECT curso, ano_letivo, media_certificado, estado FROM candidaturas WHERE id=?",
+                               (candidatura_id,)).fetchone()
+            if not row or row[3] != "em_espera":
+                return None
+            curso, ano_letivo, media, _ = row
+            return conn.execute(CONSULTAS_QUENTES["Admissoes.posicao"][0],
+                                (curso, ano_letivo, media, media, candidatura_id)).fetchone()[0] + 1
+
+    def lista_espera(self, curso, ano_letivo=None, limite=50):
+        """Fila do curso num ano letivo (por omissão, o último fechado)."""
+        with self.db_manager.conexao() as conn:
+            if ano_letivo is None:
+                ano_letivo = self._ultimo_ano_fechado(conn, curso)
+            rows = conn.execute("""
+                SELECT id, nome, numero_bilhete, curso, media_certificado, estado FROM candidaturas
+                WHERE curso=? AND ano_letivo=? AND estado='em_espera'
+                ORDER BY media_certificado DESC, id
+                LIMIT ?
+            """, (curso, ano_letivo, limite)).fetchall()
+        return [CandidaturaLinha(*r) for r in rows]
+
+    def imprimir_lista_espera(self, curso, ano_letivo=None, limite=50):
+        linhas = self.lista_espera(curso, ano_letivo, limite)
+        if not linhas:
+            print(f"📭 Ninguém em lista de espera em {curso}.")
+            return
+        print(f"\n📋 Lista de espera de {curso}:")
+        for posicao, c in enumerate(linhas, start=1):
+            print(f"{posicao}. {c.nome} | Bilhete: {c.numero_bilhete} | Média: {c.media_certificado:.2f}")
@@ -0,0 +1,382 @@
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import banco_do_sistema
+
+# -------------------------------
+# Snapshots com a API de backup online
+# -------------------------------
+# A cópia é feita com a API de backup do SQLite em passos de PAGINAS_POR_PASSO
+# páginas, com uma pausa entre passos. Em WAL, a conexão de origem mantém uma
+# transação de leitura aberta durante a cópia:
+#   - todas as páginas vêm do mesmo instante (a cópia é consistente e não
+#     recomeça quando alguém grava uma nota a meio);
+#   - os escritores continuam a fazer commit no -wal sem esperar; só o
+#     checkpoint fica adiado até a cópia acabar.
+# Sem WAL, uma leitura aberta bloquearia os escritores, por isso aí não se
+# fixa o instante e a API recomeça sozinha se a origem mudar.
+# Nunca copiar banco_escolar.db com cp enquanto o sistema corre: o ficheiro e
+# o -wal mudam a meio da cópia.
+#
+# Cada snapshot passa por PRAGMA integrity_check antes de ser guardado e é
+# gravado com um nome temporário e só depois ligado ao nome final, que nunca
+# substitui um snapshot existente: um ficheiro .db.gz com o nome final está
+# sempre completo. O restauro "até um instante" usa o último
+# snapshot tirado antes dele (a granularidade é a dos snapshots).
+#
+#     python backup.py criar          # snapshot comprimido em backups/ e rotação
+#     python backup.py verificar --todos
+#     python backup.py restaurar --ate 2026-10-18T12:00
+
+PASTA_PADRAO = "backups"
+PAGINAS_POR_PASSO = 1024
+PAUSA_ENTRE_PASSOS = 0.005
+# Quantos snapshots guardar: os N mais recentes, mais o último de cada dia, semana e mês
+RETENCAO = {"recentes": 24, "diarias": 7, "semanais": 5, "mensais": 12}
+
+# Microssegundos no nome: dois snapshots no mesmo segundo (o de segurança do
+# restauro logo a seguir a um manual, por exemplo) não ficam com o mesmo nome
+FORMATO_MOMENTO = "%Y%m%dT%H%M%S.%fZ"
+_FORMATO_SEGUNDOS = "%Y%m%dT%H%M%SZ"  # nomes antigos, ainda listados
+_PADRAO_NOME = re.compile(r"^(?P<base>.+)-(?P<momento>\d{8}T\d{6}(?:\.\d{6})?Z)\.db(?P<gz>\.gz)?$")
+
+Snapshot = namedtuple("Snapshot", "caminho base momento comprimido tamanho")
+
+
+def _momento_utc(texto):
+    """Aceita 'AAAA-MM-DD', 'AAAA-MM-DDTHH:MM[:SS]' (hora local) ou com fuso; devolve datetime em UTC."""
+    momento = datetime.fromisoformat(texto)
+    if momento.tzinfo is None:
+        momento = momento.astimezone()
+    return momento.astimezone(timezone.utc)
+
+
+def _fsync(caminho):
+    with open(caminho, "rb") as f:
+        os.fsync(f.fileno())
+
+
+# -------------------------------
+# Criar e verificar
+# -------------------------------
+def copiar(caminho_db, destino, paginas=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS, progresso=None):
+    """
+    Copia o banco para `destino` (ficheiro .db simples, sem -wal), em passos de `paginas`
+    páginas com `pausa` segundos entre eles. progresso(copiadas, total) é chamado a cada passo.
+    """
+    origem = banco_do_sistema.conectar(caminho_db, isolation_level=None)
+    copia = sqlite3.connect(destino)
+    try:
+        fixar = origem.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if fixar:
+            origem.execute("BEGIN")
+            origem.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            origem.backup(copia, pages=paginas, sleep=pausa,
+                          progress=(lambda estado, faltam, total: progresso(total - faltam, total)) if progresso else None)
+        finally:
+            if fixar:
+                origem.execute("COMMIT")
+        # A cópia herda o modo WAL da origem; um snapshot deve ser um único ficheiro
+        copia.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        copia.close()
+        origem.close()
+
+
+def integridade(caminho):
+    """Lista de problemas de PRAGMA integrity_check (vazia se o banco está íntegro)."""
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        problemas = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    return [] if problemas == ["ok"] else problemas
+
+
+def criar(caminho_db=None, pasta=PASTA_PADRAO, comprimir=True, paginas=PAGINAS_POR_PASSO,
+          pausa=PAUSA_ENTRE_PASSOS, progresso=None):
+    """Cria um snapshot verificado em `pasta` e devolve o seu Snapshot."""
+    caminho_db = caminho_db or banco_do_sistema.CAMINHO_PADRAO
+    if not os.path.exists(caminho_db):
+        raise FileNotFoundError(caminho_db)
+    os.makedirs(pasta, exist_ok=True)
+    base = os.path.splitext(os.path.basename(caminho_db))[0]
+    momento = datetime.now(timezone.utc)
+    final = os.path.join(pasta, f"{base}-{momento.strftime(FORMATO_MOMENTO)}.db" + (".gz" if comprimir else ""))
+
+    temporario = final + ".parcial"
+    copia = os.path.join(pasta, f".{base}-{os.getpid()}-{momento.strftime(FORMATO_MOMENTO)}.copia.db")
+    try:
+        copiar(caminho_db, copia, paginas, pausa, progresso)
+        problemas = integridade(copia)
+        if problemas:
+            raise sqlite3.DatabaseError(f"Snapshot com problemas de integridade: {problemas[:5]}")
+        if comprimir:
+            with open(copia, "rb") as entrada, gzip.open(temporario, "wb", compresslevel=6) as saida:
+                shutil.copyfileobj(entrada, saida, 1024 * 1024)
+        else:
+            shutil.copyfile(copia, temporario)
+        _fsync(temporario)
+        # link em vez de replace: nunca substituir um snapshot que já exista
+        try:
+            os.link(temporario, final)
+        except FileExistsError:
+            raise FileExistsError(f"Já existe um snapshot com o nome {final}.") from None
+    finally:
+        for resto in (copia, temporario):
+            if os.path.exists(resto):
+                os.remove(resto)
+    return Snapshot(final, base, momento, comprimir, os.path.getsize(final))
+
+
+def listar(pasta=PASTA_PADRAO, base=None):
+    """Snapshots da pasta (de um banco, se `base` for dado), do mais antigo para o mais recente."""
+    if not os.path.isdir(pasta):
+        return []
+    snapshots = []
+    for nome in os.listdir(pasta):
+        encontrado = _PADRAO_NOME.match(nome)
+        if not encontrado or (base and encontrado["base"] != base):
+            continue
+        caminho = os.path.join(pasta, nome)
+        formato = FORMATO_MOMENTO if "." in encontrado["momento"] else _FORMATO_SEGUNDOS
+        momento = datetime.strptime(encontrado["momento"], formato).replace(tzinfo=timezone.utc)
+        snapshots.append(Snapshot(caminho, encontrado["base"], momento, bool(encontrado["gz"]),
+                                  os.path.getsize(caminho)))
+    return sorted(snapshots, key=lambda s: s.momento)
+
+
+def _extrair(snapshot, destino):
+    if snapshot.comprimido:
+        with gzip.open(snapshot.caminho, "rb") as entrada, open(destino, "wb") as saida:
+            shutil.copyfileobj(entrada, saida, 1024 * 1024)
+    else:
+        shutil.copyfile(snapshot.caminho, destino)
+
+
+def verificar(snapshot):
+    """Descomprime para um temporário e corre integrity_check. Devolve a lista de problemas."""
+    with tempfile.TemporaryDirectory(prefix="verificar_backup_") as pasta:
+        caminho = os.path.join(pasta, "snapshot.db")
+        try:
+            _extrair(snapshot, caminho)
+        except (OSError, EOFError) as e:  # gzip truncado ou com CRC errado
+            return [f"arquivo ilegível: {e}"]
+        try:
+            return integridade(caminho)
+        except sqlite3.DatabaseError as e:
+            return [str(e)]
+
+
+# -------------------------------
+# Rotação
+# -------------------------------
+def a_manter(snapshots, retencao=RETENCAO):
+    """Subconjunto de `snapshots` que a retenção guarda: os mais recentes e o último de cada dia/semana/mês."""
+    recentes = sorted(snapshots, key=lambda s: s.momento, reverse=True)
+    manter = set(recentes[:retencao.get("recentes", 0)])
+    periodos = {
+        "diarias": lambda m: m.date(),
+        "semanais": lambda m: m.isocalendar()[:2],
+        "mensais": lambda m: (m.year, m.month),
+    }
+    for nome, periodo in periodos.items():
+        vistos = set()
+        for s in recentes:
+            chave = periodo(s.momento)
+            if chave in vistos:
+                continue
+            if len(vistos) >= retencao.get(nome, 0):
+                break
+            vistos.add(chave)
+            manter.add(s)
+    return manter
+
+
+def rodar(pasta=PASTA_PADRAO, base=None, retencao=RETENCAO):
+    """Apaga os snapshots que a retenção já não guarda (por banco). Devolve os apagados."""
+    apagados = []
+    snapshots = listar(pasta, base)
+    for nome_base in {s.base for s in snapshots}:
+        do_banco = [s for s in snapshots if s.base == nome_base]
+        manter = a_manter(do_banco, retencao)
+        for s in do_banco:
+            if s not in manter:
+                os.remove(s.caminho)
+                apagados.append(s)
+    return apagados
+
+
+# -------------------------------
+# Restauro
+# -------------------------------
+def escolher(pasta=PASTA_PADRAO, base=None, ate=None):
+    """O snapshot mais recente tirado até ao instante `ate` (datetime com fuso), ou o último; None se não houver."""
+    candidatos = [s for s in listar(pasta, base) if ate is None or s.momento <= ate]
+    return candidatos[-1] if candidatos else None
+
+
+def restaurar(snapshot, destino, pasta=PASTA_PADRAO, guardar_atual=True):
+    """
+    Repõe `snapshot` em `destino`. O snapshot é verificado antes; se `destino` já existir,
+    é primeiro guardado como um snapshot novo (para se poder desfazer o restauro).
+    A cópia para o destino usa a API de backup, numa só transação: quem ler o
+    banco vê o estado antigo ou o restaurado, nunca uma mistura. Parar o sistema antes.
+    """
+    anterior = None
+    with tempfile.TemporaryDirectory(prefix="restaurar_backup_") as temporaria:
+        caminho = os.path.join(temporaria, "snapshot.db")
+        try:
+            _extrair(snapshot, caminho)
+            problemas = integridade(caminho)
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            problemas = [str(e)]
+        if problemas:
+            raise sqlite3.DatabaseError(f"Snapshot com problemas de integridade: {problemas[:5]}")
+        if guardar_atual and os.path.exists(destino):
+            anterior = criar(destino, pasta)
+        origem = sqlite3.connect(caminho)
+        alvo = banco_do_sistema.conectar(destino)
+        try:
+            origem.backup(alvo)
+        finally:
+            alvo.close()
+            origem.close()
+    return anterior
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+def _tamanho(n):
+    for unidade in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unidade == "GiB":
+            return f"{n:.1f} {unidade}" if unidade != "B" else f"{n} B"
+        n /= 1024
+
+
+def _base(args):
+    return os.path.splitext(os.path.basename(args.db or banco_do_sistema.CAMINHO_PADRAO))[0]
+
+
+def _cmd_criar(args):
+    inicio = time.perf_counter()
+
+    def progresso(copiadas, total):
+        print(f"\r⏳ {copiadas}/{total} páginas", end="", file=sys.stderr)
+
+    try:
+        s = criar(args.db, args.pasta, not args.sem_compressao, args.paginas, args.pausa, progresso)
+    except FileExistsError as e:
+        print(f"\n❌ {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(f"✅ Snapshot {s.caminho} ({_tamanho(s.tamanho)}) em {time.perf_counter() - inicio:.1f}s, íntegro.")
+    if not args.sem_rotacao:
+        for apagado in rodar(args.pasta, s.base):
+            print(f"🗑️ Rotação: {os.path.basename(apagado.caminho)}")
+    return 0
+
+
+def _cmd_listar(args):
+    snapshots = listar(args.pasta, _base(args))
+    if not snapshots:
+        print(f"📭 Nenhum snapshot em {args.pasta}.")
+        return 0
+    print(f"\n💾 Snapshots em {args.pasta}:")
+    for s in snapshots:
+        print(f"- {s.momento.astimezone():%Y-%m-%d %H:%M:%S} | {_tamanho(s.tamanho):>10} | {os.path.basename(s.caminho)}")
+    return 0
+
+
+def _cmd_verificar(args):
+    snapshots = listar(args.pasta, _base(args))
+    if not args.todos:
+        snapshots = snapshots[-1:]
+    if not snapshots:
+        print(f"📭 Nenhum snapshot em {args.pasta}.")
+        return 1
+    falhas = 0
+    for s in snapshots:
+        problemas = verificar(s)
+        if problemas:
+            falhas += 1
+            print(f"❌ {os.path.basename(s.caminho)}: {'; '.join(problemas[:5])}")
+        else:
+            print(f"✅ {os.path.basename(s.caminho)}: íntegro")
+    return 1 if falhas else 0
+
+
+def _cmd_restaurar(args):
+    if args.arquivo:
+        s = next((s for s in listar(os.path.dirname(args.arquivo) or ".")
+                  if os.path.samefile(s.caminho, args.arquivo)), None)
+    else:
+        s = escolher(args.pasta, _base(args), _momento_utc(args.ate) if args.ate else None)
+    if s is None:
+        print("⚠️ Nenhum snapshot encontrado para restaurar.")
+        return 1
+    destino = args.destino or args.db or banco_do_sistema.CAMINHO_PADRAO
+    try:
+        anterior = restaurar(s, destino, args.pasta, not args.sem_copia_atual)
+    except (sqlite3.DatabaseError, FileExistsError) as e:
+        print(f"❌ {os.path.basename(s.caminho)} não foi restaurado: {e}")
+        return 1
+    if anterior:
+        print(f"💾 Estado anterior de {destino} guardado em {anterior.caminho}")
+    print(f"✅ {destino} restaurado para {s.momento.astimezone():%Y-%m-%d %H:%M:%S} ({os.path.basename(s.caminho)}).")
+    return 0
+
+
+def _cmd_rodar(args):
+    apagados = rodar(args.pasta, _base(args))
+    for s in apagados:
+        print(f"🗑️ {os.path.basename(s.caminho)}")
+    print(f"✅ Rotação aplicada: {len(apagados)} snapshot(s) apagado(s).")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cópias de segurança do banco escolar")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    parser.add_argument("--pasta", default=PASTA_PADRAO, help="pasta dos snapshots")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("criar", help="tira um snapshot verificado e aplica a rotação")
+    p.add_argument("--sem-compressao", action="store_true")
+    p.add_argument("--paginas", type=int, default=PAGINAS_POR_PASSO, help="páginas copiadas por passo")
+    p.add_argument("--pausa", type=float, default=PAUSA_ENTRE_PASSOS, help="segundos entre passos")
+    p.add_argument("--sem-rotacao", action="store_true")
+    p.set_defaults(func=_cmd_criar)
+
+    sub.add_parser("listar", help="lista os snapshots").set_defaults(func=_cmd_listar)
+
+    p = sub.add_parser("verificar", help="integrity_check do último snapshot")
+    p.add_argument("--todos", action="store_true", help="verifica todos os snapshots")
+    p.set_defaults(func=_cmd_verificar)
+
+    p = sub.add_parser("restaurar", help="repõe o banco a partir de um snapshot")
+    p.add_argument("--ate", help="instante (AAAA-MM-DD[THH:MM[:SS]]): usa o último snapshot até lá")
+    p.add_argument("--arquivo", help="snapshot a usar (em vez de --ate)")
+    p.add_argument("--destino", help="banco a repor (padrão: --db)")
+    p.add_argument("--sem-copia-atual", action="store_true", help="não guarda o estado atual antes de restaurar")
+    p.set_defaults(func=_cmd_restaurar)
+
+    sub.add_parser("rodar", help="apaga os snapshots fora da retenção").set_defaults(func=_cmd_rodar)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,333 @@
+import argparse
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
-def conectar():
-    return sqlite3.connect("banco_escolar.db")
+# Caminho do banco; pode ser trocado pela variável de ambiente BANCO_ESCOLAR_DB
+CAMINHO_PADRAO = os.environ.get("BANCO_ESCOLAR_DB", "banco_escolar.db")
 
 
-def criar_tabelas():
-    conn = conectar()
-    cursor = conn.cursor()
+# -------------------------------
+# Perfis de armazenamento (PRAGMAs aplicados a cada conexão)
+# -------------------------------
+# cache_size negativo = KiB; mmap_size em bytes; busy_timeout em ms
+PERFIS = {
+    # Uso normal do sistema: leitores não bloqueiam escritores (WAL)
+    "interativo": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    # Importações grandes: sem fsync por commit e cache maior
+    "carga_em_massa": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 1024 * 1024 * 1024,
+        "cache_size": -256000,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    # Máxima durabilidade: fsync em cada commit
+    "duravel": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -32000,
+        "temp_store": "DEFAULT",
+        "foreign_keys": "ON",
+    },
+}
 
+PERFIL_PADRAO = os.environ.get("BANCO_ESCOLAR_PERFIL", "interativo")
+
+
+def aplicar_perfil(conn, perfil=None):
+    nome = perfil or PERFIL_PADRAO
+    if nome not in PERFIS:
+        raise ValueError(f"Perfil de armazenamento desconhecido: {nome}")
+    for pragma, valor in PERFIS[nome].items():
+        conn.execute(f"PRAGMA {pragma}={valor}")
+    return nome
+
+
+def conectar(caminho=None, perfil=None, **opcoes):
+    conn = sqlite3.connect(caminho or CAMINHO_PADRAO, **opcoes)
+    aplicar_perfil(conn, perfil)
+    return conn
+
+
+_NOMES_PRAGMA = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+    "foreign_keys": {0: "OFF", 1: "ON"},
+}
+
+
+def diagnostico(conn):
+    """Devolve os valores efetivos dos PRAGMAs de armazenamento da conexão."""
+    info = {"sqlite_version": sqlite3.sqlite_version}
+    for pragma in PERFIS["interativo"]:
+        valor = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        info[pragma] = _NOMES_PRAGMA.get(pragma, {}).get(valor, valor)
+    info["page_size"] = conn.execute("PRAGMA page_size").fetchone()[0]
+    info["page_count"] = conn.execute("PRAGMA page_count").fetchone()[0]
+    info["freelist_count"] = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return info
+
+
+def banco_ocupado(erro):
+    """True se o erro é o SQLite a recusar por lock (SQLITE_BUSY/SQLITE_LOCKED)."""
+    mensagem = str(erro).lower()
+    return isinstance(erro, sqlite3.OperationalError) and ("locked" in mensagem or "busy" in mensagem)
+
+
+def com_retentativas(funcao, tentativas=6, espera_inicial=0.02):
+    """
+    Executa funcao() e, se o banco estiver ocupado mesmo depois do busy_timeout,
+    tenta de novo com backoff exponencial e jitter.
+    """
+    for tentativa in range(tentativas):
+        try:
+            return funcao()
+        except sqlite3.OperationalError as e:
+            if not banco_ocupado(e) or tentativa == tentativas - 1:
+                raise
+            time.sleep(espera_inicial * (2 ** tentativa) * (0.5 + random.random()))
+
+
+# -------------------------------
+# Pool de conexões
+# -------------------------------
+# Statements compilados guardados por conexão (o padrão do sqlite3 é 128). As
+# consultas registadas em consultas.py, as listagens com cada combinação de
+# filtros e as consultas quentes cabem todas sem se expulsarem umas às outras.
+CACHE_STATEMENTS = 512
+
+
+class ConexaoPooled(sqlite3.Connection):
+    """
+    Conexão que pertence a um PoolConexoes: close() devolve-a ao pool
+    em vez de a fechar de verdade.
+    """
+    pool = None
+    _rastrear = False           # checkout amostrado pelo rastreador do pool
+    _inicio_transacao = None    # (perf_counter, chamador) quando rastreada
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = self.pool.rastreador.Cursor if self._rastrear else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # O conn.execute() do sqlite3 cria o cursor em C, sem passar por cursor()
+    def execute(self, sql, parametros=()):
+        if self._rastrear:
+            return self.cursor().execute(sql, parametros)
+        return super().execute(sql, parametros)
+
+    def executemany(self, sql, sequencia):
+        if self._rastrear:
+            return self.cursor().executemany(sql, sequencia)
+        return super().executemany(sql, sequencia)
+
+    def _fim_transacao(self, confirmada):
+        inicio, self._inicio_transacao = self._inicio_transacao, None
+        if inicio is not None and self.pool is not None and self.pool.rastreador is not None:
+            self.pool.rastreador.transacao(time.perf_counter() - inicio[0], inicio[1], confirmada)
+
+    def commit(self):
+        super().commit()
+        if self._inicio_transacao is not None:
+            self._fim_transacao(True)
+
+    def rollback(self):
+        super().rollback()
+        if self._inicio_transacao is not None:
+            self._fim_transacao(False)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.devolver(self)
+        else:
+            super().close()
+
+    def fechar_de_vez(self):
+        self.pool = None
+        super().close()
+
+
+class _Emprestimo:
+    # O mesmo que um @contextmanager, sem criar um gerador a cada leitura (é o caminho mais quente)
+    __slots__ = ("pool", "conn")
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        self.conn = self.pool.obter()
+        return self.conn
+
+    def __exit__(self, *erro):
+        self.pool.devolver(self.conn)
+        return False
+
+
+class PoolConexoes:
+    """
+    Pool limitado e thread-safe de conexões SQLite reutilizáveis.
+
+    Cada thread recebe sempre a mesma conexão enquanto a tiver em uso
+    (chamadas aninhadas a obter() apenas incrementam um contador), e a
+    conexão só volta ao pool quando o último close() dessa thread acontece.
+    """
+
+    def __init__(self, caminho=None, tamanho_max=5, timeout=30.0, perfil=None, rastreador=None):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.perfil = perfil or PERFIL_PADRAO
+        self.tamanho_max = tamanho_max
+        self.timeout = timeout
+        self._livres = []
+        self._abertas = 0
+        self._fechado = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._checkouts = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self.rastreador = rastreador  # rastreamento.Rastreador ou None
+
+    def _nova_conexao(self):
+        conn = conectar(self.caminho, self.perfil, factory=ConexaoPooled, check_same_thread=False,
+                        cached_statements=CACHE_STATEMENTS)
+        conn.pool = self
+        return conn
+
+    def obter(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.refs += 1
+            return conn
+
+        inicio = time.perf_counter()
+        criar = False
+        with self._cond:
+            if self._fechado:
+                raise sqlite3.ProgrammingError("Pool de conexões fechado.")
+            while not self._livres and self._abertas >= self.tamanho_max:
+                restante = self.timeout - (time.perf_counter() - inicio)
+                if restante <= 0 or not self._cond.wait(restante):
+                    raise TimeoutError("Nenhuma conexão livre no pool.")
+            if self._livres:
+                conn = self._livres.pop()
+            else:
+                self._abertas += 1
+                criar = True
+            espera = time.perf_counter() - inicio
+            self._checkouts += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+
+        if criar:
+            try:
+                conn = self._nova_conexao()
+            except Exception:
+                with self._cond:
+                    self._abertas -= 1
+                    self._cond.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.refs = 1
+        if self.rastreador is not None:
+            self.rastreador.aquisicao(conn, espera)
+        return conn
+
+    def devolver(self, conn):
+        if getattr(self._local, "conn", None) is conn:
+            self._local.refs -= 1
+            if self._local.refs > 0:
+                return
+            self._local.conn = None
+
+        # Transação esquecida aberta: descartar, como faria um close() real
+        if conn.in_transaction:
+            conn.rollback()
+        conn._rastrear = False
+
+        with self._cond:
+            if self._fechado:
+                self._abertas -= 1
+                conn.fechar_de_vez()
+            else:
+                self._livres.append(conn)
+            self._cond.notify()
+
+    def conexao(self):
+        """with pool.conexao() as conn: a conexão volta ao pool no fim do bloco."""
+        return _Emprestimo(self)
+
+    def em_transacao(self):
+        """True se esta thread já tem uma conexão do pool com uma transação aberta."""
+        conn = getattr(self._local, "conn", None)
+        return conn is not None and conn.in_transaction
+
+    @contextmanager
+    def transacao(self, modo="DEFERRED"):
+        """Abre BEGIN <modo>; faz commit no fim ou rollback se houver erro."""
+        with self.conexao() as conn:
+            aninhada = conn.in_transaction
+            if not aninhada:
+                conn.execute(f"BEGIN {modo}")
+            try:
+                yield conn
+            except BaseException:
+                if not aninhada and conn.in_transaction:
+                    conn.rollback()
+                raise
+            else:
+                if not aninhada and conn.in_transaction:
+                    conn.commit()
+
+    def estatisticas(self):
+        with self._cond:
+            return {
+                "caminho": self.caminho,
+                "perfil": self.perfil,
+                "tamanho_max": self.tamanho_max,
+                "abertas": self._abertas,
+                "livres": len(self._livres),
+                "em_uso": self._abertas - len(self._livres),
+                "checkouts": self._checkouts,
+                "espera_total_s": round(self._espera_total, 6),
+                "espera_media_s": round(self._espera_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "espera_max_s": round(self._espera_max, 6),
+            }
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+            self._abertas -= len(livres)
+            self._cond.notify_all()
+        for conn in livres:
+            conn.fechar_de_vez()
+
+
+# -------------------------------
+# Migrações de esquema
+# -------------------------------
+# Cada passo recebe um cursor já dentro de uma transação e é aplicado uma
+# única vez; a versão aplicada fica registada em schema_version.
+def _migracao_tabelas_base(cursor):
     # Tabela de alunos
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS alunos (
@@ -106,7 +426,552 @@ def criar_tabelas():
         )
     """)
 
-    conn.commit()
-    conn.close()
+
+def _migracao_indices_secundarios(cursor):
+    # Boletim e médias: notas de um aluno por disciplina/trimestre (cobre a nota)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notas_aluno ON notas (aluno_id, disciplina_id, trimestre, nota)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notas_disciplina ON notas (disciplina_id)")
+    # Presenças por aluno e por aula (disciplina + data)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_presencas_aluno ON presencas (aluno_id, disciplina_id, data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_presencas_disciplina ON presencas (disciplina_id, data)")
+    # Listagens por curso/turma
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matriculas_curso ON matriculas (curso, ano_letivo)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matriculas_aluno ON matriculas (aluno_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alunos_curso_turma ON alunos (curso, turma)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_professores_especialidade ON professores (especialidade)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_disciplinas_curso ON disciplinas (curso, classe)")
+
+
+def _migracao_presenca_unica(cursor):
+    # Uma presença por aluno/disciplina/dia: fica o registo mais recente
+    cursor.execute("""
+        DELETE FROM presencas
+        WHERE id NOT IN (SELECT MAX(id) FROM presencas GROUP BY aluno_id, disciplina_id, data)
+    """)
+    # O índice único substitui idx_presencas_aluno (mesmas colunas)
+    cursor.execute("DROP INDEX IF EXISTS idx_presencas_aluno")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_presencas_aula ON presencas (aluno_id, disciplina_id, data)")
+
+
+# -------------------------------
+# Trimestres
+# -------------------------------
+TRIMESTRES = ("1º Trimestre", "2º Trimestre", "3º Trimestre")
+
+
+def trimestre_canonico(texto):
+    """"1", "1º", "1º Tri", "1ºtrimestre", "1 TRIMESTRE"... -> "1º Trimestre"; None se não for um trimestre."""
+    chave = re.sub(r"[\sºª°.]", "", str(texto or "").lower())
+    if chave[:1] in ("1", "2", "3") and "trimestre".startswith(chave[1:]):
+        return TRIMESTRES[int(chave[0]) - 1]
+    return None
+
+
+def reconstruir_resumo_notas(cursor):
+    """Recalcula resumo_notas a partir de notas e invalida todas as médias em cache."""
+    cursor.execute("DELETE FROM resumo_notas")
+    cursor.execute("""
+        INSERT INTO resumo_notas (aluno_id, disciplina_id, trimestre, soma, quantidade)
+        SELECT aluno_id, disciplina_id, trimestre, SUM(nota), COUNT(nota)
+        FROM notas
+        WHERE nota IS NOT NULL
+        GROUP BY aluno_id, disciplina_id, trimestre
+    """)
+    cursor.execute("DELETE FROM medias_alunos")
+
+
+def _migracao_resumo_notas(cursor):
+    # Soma e quantidade de notas por aluno/disciplina/trimestre, mantidas pelos triggers
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_notas (
+            aluno_id INTEGER NOT NULL,
+            disciplina_id INTEGER NOT NULL,
+            trimestre TEXT NOT NULL,
+            soma REAL NOT NULL,
+            quantidade INTEGER NOT NULL,
+            PRIMARY KEY (aluno_id, disciplina_id, trimestre)
+        ) WITHOUT ROWID
+    """)
+    # Média final por aluno (NULL = sem notas); a linha é apagada pelos triggers
+    # quando as notas mudam e recalculada a partir de resumo_notas por quem grava
+    # a nota ou pela leitura seguinte (ver boletim.media_final)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS medias_alunos (
+            aluno_id INTEGER PRIMARY KEY,
+            media_final REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notas_resumo_insert AFTER INSERT ON notas
+        WHEN NEW.nota IS NOT NULL
+        BEGIN
+            INSERT INTO resumo_notas (aluno_id, disciplina_id, trimestre, soma, quantidade)
+            VALUES (NEW.aluno_id, NEW.disciplina_id, NEW.trimestre, NEW.nota, 1)
+            ON CONFLICT (aluno_id, disciplina_id, trimestre)
+            DO UPDATE SET soma = soma + excluded.soma, quantidade = quantidade + 1;
+            DELETE FROM medias_alunos WHERE aluno_id = NEW.aluno_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notas_resumo_delete AFTER DELETE ON notas
+        WHEN OLD.nota IS NOT NULL
+        BEGIN
+            UPDATE resumo_notas SET soma = soma - OLD.nota, quantidade = quantidade - 1
+            WHERE aluno_id = OLD.aluno_id AND disciplina_id = OLD.disciplina_id AND trimestre = OLD.trimestre;
+            DELETE FROM resumo_notas
+            WHERE aluno_id = OLD.aluno_id AND disciplina_id = OLD.disciplina_id AND trimestre = OLD.trimestre
+              AND quantidade <= 0;
+            DELETE FROM medias_alunos WHERE aluno_id = OLD.aluno_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_notas_resumo_update AFTER UPDATE OF aluno_id, disciplina_id, trimestre, nota ON notas
+        BEGIN
+            UPDATE resumo_notas SET soma = soma - OLD.nota, quantidade = quantidade - 1
+            WHERE OLD.nota IS NOT NULL
+              AND aluno_id = OLD.aluno_id AND disciplina_id = OLD.disciplina_id AND trimestre = OLD.trimestre;
+            DELETE FROM resumo_notas
+            WHERE aluno_id = OLD.aluno_id AND disciplina_id = OLD.disciplina_id AND trimestre = OLD.trimestre
+              AND quantidade <= 0;
+            INSERT INTO resumo_notas (aluno_id, disciplina_id, trimestre, soma, quantidade)
+            SELECT NEW.aluno_id, NEW.disciplina_id, NEW.trimestre, NEW.nota, 1
+            WHERE NEW.nota IS NOT NULL
+            ON CONFLICT (aluno_id, disciplina_id, trimestre)
+            DO UPDATE SET soma = soma + excluded.soma, quantidade = quantidade + 1;
+            DELETE FROM medias_alunos WHERE aluno_id IN (OLD.aluno_id, NEW.aluno_id);
+        END
+    """)
+    reconstruir_resumo_notas(cursor)
+
+
+def _indice_fts(cursor, tabela, colunas):
+    """Índice FTS5 de conteúdo externo sobre `tabela`, sincronizado por triggers."""
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{c}" for c in colunas)
+    antigos = ", ".join(f"old.{c}" for c in colunas)
+    # remove_diacritics: "Conceição" encontra-se com "conceicao"; prefix acelera pesquisas parciais
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {tabela}_fts USING fts5(
+            {lista}, content='{tabela}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela}_fts_insert AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {tabela}_fts (rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela}_fts_delete AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {tabela}_fts ({tabela}_fts, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela}_fts_update AFTER UPDATE ON {tabela} BEGIN
+            INSERT INTO {tabela}_fts ({tabela}_fts, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+            INSERT INTO {tabela}_fts (rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+    cursor.execute(f"INSERT INTO {tabela}_fts ({tabela}_fts) VALUES ('rebuild')")
+
+
+def _migracao_pesquisa_texto(cursor):
+    _indice_fts(cursor, "alunos", ["nome", "bairro", "numero_bilhete", "turma", "curso"])
+    _indice_fts(cursor, "professores", ["nome", "especialidade", "email"])
+
+
+def _migracao_sessoes(cursor):
+    # Só o SHA-256 do token é guardado: quem lê a base não consegue usar as sessões
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessoes (
+            token_hash TEXT PRIMARY KEY,
+            usuario_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            referencia_id INTEGER,
+            criada_em REAL NOT NULL,
+            expira_em REAL NOT NULL,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes(expira_em)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes(usuario_id)")
+
+
+# Tabelas de referência com contador de versão (ver cache_referencia.py)
+TABELAS_VERSIONADAS = ("disciplinas", "vagas", "professores")
+
+
+def _migracao_versoes_tabelas(cursor):
+    # Cada escrita numa tabela de referência sobe o seu contador, venha de que processo vier
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS versoes_tabelas (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for tabela in TABELAS_VERSIONADAS:
+        cursor.execute("INSERT OR IGNORE INTO versoes_tabelas (tabela) VALUES (?)", (tabela,))
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_versao_{evento.lower()} AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            """)
+
+
+# Resumos de presenças: tabela -> (coluna do período, expressão SQLite sobre {p}.data, por disciplina?)
+# Datas inválidas ficam com o próprio texto como período, para a presença nunca falhar por causa do resumo
+RESUMOS_PRESENCAS = {
+    "presencas_dia": ("data", "{p}.data", False),
+    "presencas_semana": ("semana", "COALESCE(date({p}.data, 'weekday 0', '-6 days'), {p}.data)", True),
+    "presencas_mes": ("mes", "COALESCE(date({p}.data, 'start of month'), {p}.data)", True),
+}
+
+
+def reconstruir_resumo_presencas(cursor):
+    """Recalcula os resumos diário, semanal e mensal a partir de presencas."""
+    for tabela, (periodo, expressao, por_disciplina) in RESUMOS_PRESENCAS.items():
+        disciplina = ", disciplina_id" if por_disciplina else ""
+        cursor.execute(f"DELETE FROM {tabela}")
+        cursor.execute(f"""
+            INSERT INTO {tabela} (aluno_id, {periodo}{disciplina}, presencas, faltas)
+            SELECT aluno_id, {expressao.format(p="presencas")} AS periodo{disciplina},
+                   SUM(presente), SUM(1 - presente)
+            FROM presencas
+            GROUP BY aluno_id, periodo{disciplina}
+        """)
+
+
+def _migracao_resumo_presencas(cursor):
+    # Presenças e faltas por aluno e dia, e por aluno/disciplina e semana (segunda-feira) ou mês
+    # (dia 1), mantidas pelos triggers: as taxas de faltas não voltam a percorrer presencas
+    somar, subtrair = [], []
+    for tabela, (periodo, expressao, por_disciplina) in RESUMOS_PRESENCAS.items():
+        disciplina = ", disciplina_id" if por_disciplina else ""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                aluno_id INTEGER NOT NULL,
+                {periodo} DATE NOT NULL,
+                {"disciplina_id INTEGER NOT NULL," if por_disciplina else ""}
+                presencas INTEGER NOT NULL,
+                faltas INTEGER NOT NULL,
+                PRIMARY KEY (aluno_id, {periodo}{disciplina})
+            ) WITHOUT ROWID
+        """)
+        novo = expressao.format(p="NEW")
+        somar.append(f"""
+            INSERT INTO {tabela} (aluno_id, {periodo}{disciplina}, presencas, faltas)
+            VALUES (NEW.aluno_id, {novo}{", NEW.disciplina_id" if por_disciplina else ""},
+                    NEW.presente, 1 - NEW.presente)
+            ON CONFLICT (aluno_id, {periodo}{disciplina})
+            DO UPDATE SET presencas = presencas + excluded.presencas, faltas = faltas + excluded.faltas;""")
+        chave = f"aluno_id = OLD.aluno_id AND {periodo} = {expressao.format(p='OLD')}"
+        if por_disciplina:
+            chave += " AND disciplina_id = OLD.disciplina_id"
+        subtrair.append(f"""
+            UPDATE {tabela} SET presencas = presencas - OLD.presente, faltas = faltas - (1 - OLD.presente)
+            WHERE {chave};
+            DELETE FROM {tabela} WHERE {chave} AND presencas + faltas <= 0;""")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_presencas_resumo_insert AFTER INSERT ON presencas
+        BEGIN {"".join(somar)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_presencas_resumo_delete AFTER DELETE ON presencas
+        BEGIN {"".join(subtrair)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_presencas_resumo_update
+        AFTER UPDATE OF aluno_id, disciplina_id, data, presente ON presencas
+        BEGIN {"".join(subtrair)}{"".join(somar)}
+        END
+    """)
+    reconstruir_resumo_presencas(cursor)
+
+
+def _migracao_candidaturas(cursor):
+    # A senha já vai em hash (apagado quando a candidatura é admitida e o usuário criado)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS candidaturas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            data_nascimento DATE NOT NULL,
+            genero TEXT CHECK(genero IN ('M', 'F')),
+            bairro TEXT,
+            numero_bilhete TEXT NOT NULL,
+            turma TEXT,
+            curso TEXT NOT NULL,
+            media_certificado REAL NOT NULL CHECK(media_certificado >= 0 AND media_certificado <= 20),
+            ano_letivo TEXT NOT NULL,
+            username TEXT NOT NULL,
+            senha TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendente'
+                CHECK(estado IN ('pendente', 'em_espera', 'admitida', 'rejeitada', 'desistiu')),
+            motivo TEXT,
+            aluno_id INTEGER,
+            criada_em REAL NOT NULL,
+            decidida_em REAL,
+            FOREIGN KEY(aluno_id) REFERENCES alunos(id) ON DELETE SET NULL
+        )
+    """)
+    # A fila de cada curso é este índice: o melhor candidato em espera está a uma descida da árvore
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_candidaturas_fila
+        ON candidaturas (curso, estado, media_certificado DESC, id)
+    """)
+    # Uma candidatura ativa por bilhete e ano letivo
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_candidaturas_bilhete ON candidaturas (numero_bilhete, ano_letivo)
+        WHERE estado IN ('pendente', 'em_espera', 'admitida')
+    """)
+    # Cursos cuja seriação já foi feita: as candidaturas seguintes entram direto na fila
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS admissoes_fechadas (
+            curso TEXT NOT NULL,
+            ano_letivo TEXT NOT NULL,
+            fechada_em REAL NOT NULL,
+            PRIMARY KEY (curso, ano_letivo)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migracao_fila_por_ano_letivo(cursor):
+    # A fila passa a ser por curso e ano letivo: uma vaga deste ano não vai para um candidato de outro
+    cursor.execute("DROP INDEX IF EXISTS idx_candidaturas_fila")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_candidaturas_fila
+        ON candidaturas (curso, ano_letivo, estado, media_certificado DESC, id)
+    """)
+    # Um nome de usuário por candidatura ativa; repetidos já existentes ficam com a mais antiga
+    cursor.execute("""
+        UPDATE candidaturas SET estado='rejeitada', senha='', motivo='nome de usuário repetido'
+        WHERE estado IN ('pendente', 'em_espera')
+          AND id NOT IN (SELECT MIN(id) FROM candidaturas WHERE estado IN ('pendente', 'em_espera') GROUP BY username)
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_candidaturas_username ON candidaturas (username)
+        WHERE estado IN ('pendente', 'em_espera')
+    """)
+
+
+def _migracao_trimestres_canonicos(cursor):
+    # Notas gravadas antes da validação ("1º Tri", "1ºtrimestre"...) passam ao nome canónico.
+    # Valores sem número de trimestre não se adivinham: ficam como estão para correção manual
+    for (texto,) in cursor.execute("SELECT DISTINCT trimestre FROM notas").fetchall():
+        canonico = trimestre_canonico(texto)
+        if canonico and canonico != texto:
+            cursor.execute("UPDATE notas SET trimestre=? WHERE trimestre=?", (canonico, texto))
+    reconstruir_resumo_notas(cursor)
+
+
+# Lista ordenada: (versão, descrição, função). Novas migrações vão no fim.
+MIGRACOES = [
+    (1, "tabelas base", _migracao_tabelas_base),
+    (2, "índices secundários", _migracao_indices_secundarios),
+    (3, "presença única por aluno/disciplina/data", _migracao_presenca_unica),
+    (4, "resumo materializado de notas e médias", _migracao_resumo_notas),
+    (5, "pesquisa de texto (FTS5) em alunos e professores", _migracao_pesquisa_texto),
+    (6, "sessões com token", _migracao_sessoes),
+    (7, "versões das tabelas de referência", _migracao_versoes_tabelas),
+    (8, "resumos diário, semanal e mensal de presenças", _migracao_resumo_presencas),
+    (9, "candidaturas e lista de espera por curso", _migracao_candidaturas),
+    (10, "lista de espera por ano letivo e usuário único nas candidaturas", _migracao_fila_por_ano_letivo),
+    (11, "trimestres das notas com nome canónico", _migracao_trimestres_canonicos),
+]
+
+
+def versao_esquema(conn):
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not existe:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+
+
+def migrar(conn):
+    """Aplica, em ordem, as migrações ainda não aplicadas. Devolve as versões aplicadas."""
+    if versao_esquema(conn) >= MIGRACOES[-1][0]:
+        return []
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT NOT NULL,
+            aplicada_em TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    aplicadas = []
+    for versao, descricao, passo in MIGRACOES:
+        # BEGIN IMMEDIATE: dois processos a migrar ao mesmo tempo não aplicam o passo duas vezes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE versao=?", (versao,)).fetchone():
+                conn.rollback()
+                continue
+            passo(conn.cursor())
+            conn.execute("INSERT INTO schema_version (versao, descricao) VALUES (?, ?)", (versao, descricao))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        aplicadas.append(versao)
+    return aplicadas
+
+
+def criar_tabelas(caminho=None, perfil=None):
+    conn = conectar(caminho, perfil)
+    try:
+        migrar(conn)
+    finally:
+        conn.close()
     print("✅ Banco e tabelas criados com sucesso!")
 
+
+# -------------------------------
+# Consultas quentes e EXPLAIN QUERY PLAN
+# -------------------------------
+# nome -> (sql, parâmetros de exemplo). Qualquer consulta registada aqui tem
+# de ser servida por índice; verificar_planos() acusa as que fazem SCAN.
+CONSULTAS_QUENTES = {
+    "Auth.login": (
+        "SELECT id, tipo, referencia_id, senha FROM usuarios WHERE username=?", ("x",)),
+    "CacheReferencia.obter": (
+        "SELECT versao FROM versoes_tabelas WHERE tabela=?", ("vagas",)),
+    "Aluno.listar_alunos_de_um_curso": (
+        "SELECT id, nome FROM alunos WHERE curso=? AND turma=?", ("Informatica", "A")),
+    "Disciplina.listar_por_curso": (
+        "SELECT id, nome, curso, classe FROM disciplinas WHERE curso=? ORDER BY classe, id", ("Informatica",)),
+    "Matricula.listar_por_curso": ("""
+        SELECT m.id, a.nome, m.curso
+        FROM matriculas m
+        JOIN alunos a ON m.aluno_id = a.id
+        WHERE m.curso = ?
+    """, ("Informatica",)),
+    "Presenca.listar_por_aluno": ("""
+        SELECT d.nome, p.data, p.presente
+        FROM presencas p
+        JOIN disciplinas d ON p.disciplina_id = d.id
+        WHERE p.aluno_id=?
+    """, (1,)),
+    "Presenca.registrar_turma": (
+        "SELECT id FROM alunos WHERE curso=? AND turma=?", ("Informatica", "A")),
+    "Presenca.taxa_faltas": ("""
+        SELECT COALESCE(SUM(presencas), 0), COALESCE(SUM(faltas), 0)
+        FROM presencas_dia
+        WHERE aluno_id=? AND data BETWEEN ? AND ?
+    """, (1, "0000-01-01", "9999-12-31")),
+    "Presenca.faltas_da_turma": ("""
+        SELECT a.id, a.nome, a.curso, a.turma, SUM(r.presencas) + SUM(r.faltas) AS aulas, SUM(r.faltas) AS faltas
+        FROM presencas_dia r
+        JOIN alunos a ON a.id = r.aluno_id
+        WHERE r.data BETWEEN ? AND ? AND a.curso = ? AND a.turma = ?
+        GROUP BY a.id
+    """, ("0000-01-01", "9999-12-31", "Informatica", "A")),
+    "Presenca.resumo": ("""
+        SELECT r.mes, d.nome, r.presencas, r.faltas
+        FROM presencas_mes r LEFT JOIN disciplinas d ON d.id = r.disciplina_id
+        WHERE r.aluno_id = ? AND r.mes BETWEEN ? AND ?
+        ORDER BY r.mes, 2
+    """, (1, "0000-01-01", "9999-12-31")),
+    "Presenca.por_aula": (
+        "SELECT aluno_id, presente FROM presencas WHERE disciplina_id=? AND data=?", (1, "2025-01-01")),
+}
+
+
+def plano_consulta(conn, sql, parametros=()):
+    return [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+
+
+def verificar_planos(conn, consultas=None):
+    """Devolve [(nome, detalhe)] das consultas quentes cujo plano faz SCAN de uma tabela."""
+    falhas = []
+    for nome, (sql, parametros) in (consultas or CONSULTAS_QUENTES).items():
+        plano = plano_consulta(conn, sql, parametros)
+        # Percorrer o resultado de uma CTE ou subconsulta não é varrer uma tabela
+        intermedios = {d.split(" ", 1)[1] for d in plano if d.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        for detalhe in plano:
+            if not detalhe.startswith("SCAN "):
+                continue
+            alvo = detalhe[5:].split(" ", 1)[0]
+            if alvo.startswith("(") or alvo in intermedios:
+                continue
+            falhas.append((nome, detalhe))
+    return falhas
+
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+def _cmd_diagnostico(args):
+    conn = conectar(args.db, args.perfil)
+    try:
+        info = diagnostico(conn)
+    finally:
+        conn.close()
+    print(f"\n🩺 Diagnóstico de {args.db or CAMINHO_PADRAO} (perfil {args.perfil or PERFIL_PADRAO}):")
+    for chave, valor in info.items():
+        print(f"- {chave}: {valor}")
+
+
+def _cmd_migrar(args):
+    conn = conectar(args.db, args.perfil)
+    try:
+        antes = versao_esquema(conn)
+        aplicadas = migrar(conn)
+        depois = versao_esquema(conn)
+    finally:
+        conn.close()
+    if aplicadas:
+        print(f"✅ Esquema migrado da versão {antes} para {depois} (passos: {', '.join(map(str, aplicadas))}).")
+    else:
+        print(f"✅ Esquema já está na versão {depois}.")
+
+
+# Módulos com o seu próprio dicionário CONSULTAS_QUENTES
+MODULOS_COM_CONSULTAS = ["boletim", "sessoes", "admissoes", "consultas"]
+
+
+def _todas_consultas_quentes():
+    import importlib
+    consultas = dict(CONSULTAS_QUENTES)
+    for modulo in MODULOS_COM_CONSULTAS:
+        consultas.update(importlib.import_module(modulo).CONSULTAS_QUENTES)
+    return consultas
+
+
+def _cmd_verificar_planos(args):
+    consultas = _todas_consultas_quentes()
+    conn = conectar(args.db, args.perfil)
+    try:
+        falhas = verificar_planos(conn, consultas)
+    finally:
+        conn.close()
+    if falhas:
+        print("❌ Consultas quentes a fazer varrimento de tabela:")
+        for nome, detalhe in falhas:
+            print(f"- {nome}: {detalhe}")
+        return 1
+    print(f"✅ {len(consultas)} consultas quentes servidas por índice.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ferramentas do banco escolar")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), help="perfil de armazenamento")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("diagnostico", help="mostra os PRAGMAs efetivos da conexão").set_defaults(func=_cmd_diagnostico)
+    sub.add_parser("migrar", help="aplica as migrações de esquema pendentes").set_defaults(func=_cmd_migrar)
+    sub.add_parser("verificar-planos", help="falha se alguma consulta quente fizer SCAN").set_defaults(
+        func=_cmd_verificar_planos)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
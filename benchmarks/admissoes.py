@@ -0,0 +1,150 @@
+"""
+Benchmark das admissões: fecha as candidaturas de um curso com muitos
+candidatos, mede a promoção da lista de espera a cada vaga libertada e o
+aumento de vagas, e compara com uma fila pequena (a promoção deve custar o
+mesmo, O(log n)). Falha (código 1) se a ordem por média ou as vagas não
+baterem certo.
+
+    python -m benchmarks.admissoes --candidatos 100000 --vagas 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import banco_do_sistema
+import senhas
+from admissoes import Admissoes
+from benchmarks.cenarios import medir
+from sistema import DatabaseManager, Vagas
+
+CURSO = "Informatica"
+ANO_LETIVO = "2026"
+
+
+def _preparar(caminho, candidatos, vagas, seed):
+    rnd = random.Random(seed)
+    # O mesmo hash para todos: o scrypt não é o que se mede aqui
+    senha = senhas.gerar_hash("candidato")
+    conn = banco_do_sistema.conectar(caminho)
+    banco_do_sistema.migrar(conn)
+    conn.execute("UPDATE vagas SET total_vagas=?, vagas_ocupadas=0 WHERE curso=?", (vagas, CURSO))
+    agora = time.time()
+    conn.executemany("""
+        INSERT INTO candidaturas (nome, data_nascimento, genero, numero_bilhete, turma, curso,
+                                  media_certificado, ano_letivo, username, senha, criada_em)
+        VALUES (?, '2010-01-01', 'M', ?, 'A', ?, ?, ?, ?, ?, ?)
+    """, ((f"Candidato {i}", f"C{i:07d}", CURSO, round(rnd.uniform(12, 20), 1), ANO_LETIVO, f"cand{i}", senha, agora)
+          for i in range(candidatos)))
+    conn.commit()
+    conn.close()
+
+
+def _verificar(caminho, liberacoes):
+    conn = banco_do_sistema.conectar(caminho)
+    admitidas = conn.execute("SELECT COUNT(*) FROM candidaturas WHERE curso=? AND estado='admitida'",
+                             (CURSO,)).fetchone()[0]
+    ocupadas, total = conn.execute("SELECT vagas_ocupadas, total_vagas FROM vagas WHERE curso=?",
+                                   (CURSO,)).fetchone()
+    matriculas = conn.execute("SELECT COUNT(*) FROM matriculas WHERE curso=?", (CURSO,)).fetchone()[0]
+    # Ninguém em espera pode estar à frente (média maior, ou igual e mais antigo) de um admitido
+    pior_admitido = conn.execute("""
+        SELECT media_certificado, id FROM candidaturas WHERE curso=? AND estado='admitida'
+        ORDER BY media_certificado, id DESC LIMIT 1
+    """, (CURSO,)).fetchone()
+    melhor_em_espera = conn.execute("""
+        SELECT media_certificado, id FROM candidaturas WHERE curso=? AND estado='em_espera'
+        ORDER BY media_certificado DESC, id LIMIT 1
+    """, (CURSO,)).fetchone()
+    conn.close()
+    ordem_ok = (pior_admitido is None or melhor_em_espera is None
+                or (pior_admitido[0], -pior_admitido[1]) > (melhor_em_espera[0], -melhor_em_espera[1]))
+    return {
+        "admitidas": admitidas,
+        "ordem_ok": ordem_ok,
+        "vagas_ok": admitidas == matriculas == ocupadas + liberacoes and (ocupadas == total or melhor_em_espera is None),
+    }
+
+
+def executar(candidatos=100000, vagas=2000, repeticoes=500, aumento=500, seed=0):
+    pasta = tempfile.mkdtemp(prefix="admissoes_")
+    caminho = os.path.join(pasta, "admissoes.db")
+    try:
+        _preparar(caminho, candidatos, vagas, seed)
+        db = DatabaseManager(caminho, tamanho_pool=2)
+        vagas_model = Vagas(db)
+        admissoes = Admissoes(db, vagas_model)
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            admitidas, em_espera = admissoes.fechar(CURSO, ANO_LETIVO)
+            fechar_s = time.perf_counter() - inicio
+
+            # Cada vaga libertada admite o primeiro da fila na mesma transação
+            promocao = medir(lambda rnd: vagas_model.liberar_vaga(CURSO), repeticoes, seed=seed)
+
+            inicio = time.perf_counter()
+            ajustadas = vagas_model.ajustar_vagas(CURSO, vagas + aumento)
+            ajustar_s = time.perf_counter() - inicio
+        db.fechar()
+        verificacao = _verificar(caminho, repeticoes)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return {
+        "candidatos": candidatos,
+        "vagas": vagas,
+        "fechar_s": round(fechar_s, 3),
+        "admitidas_ao_fechar": len(admitidas),
+        "em_espera": em_espera,
+        "promocao": promocao,
+        "aumento": aumento,
+        "ajustar_s": round(ajustar_s, 3),
+        "admitidas_ao_ajustar": len(ajustadas),
+        **verificacao,
+    }
+
+
+def _imprimir(r):
+    print(f"\n🏁 {r['candidatos']} candidatos para {r['vagas']} vagas")
+    print(f"- Fechar candidaturas: {r['fechar_s']}s ({r['admitidas_ao_fechar']} admitidos, "
+          f"{r['em_espera']} em espera)")
+    p = r["promocao"]
+    print(f"- Vaga libertada -> 1º da fila: p50 {p['p50_ms']} ms | p99 {p['p99_ms']} ms | {p['ops_s']} ops/s")
+    print(f"- Mais {r['aumento']} vagas: {r['ajustar_s']}s ({r['admitidas_ao_ajustar']} admitidos)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidatos", type=int, default=100000)
+    parser.add_argument("--vagas", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=500)
+    parser.add_argument("--aumento", type=int, default=500)
+    parser.add_argument("--fila-pequena", type=int, default=5000,
+                        help="candidatos do cenário de comparação (0 para não correr)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    resultados = [executar(args.candidatos, args.vagas, args.repeticoes, args.aumento, args.seed)]
+    if args.fila_pequena:
+        resultados.append(executar(args.fila_pequena, args.vagas, args.repeticoes, args.aumento, args.seed))
+    for r in resultados:
+        _imprimir(r)
+
+    if len(resultados) == 2:
+        grande, pequena = (r["promocao"]["p50_ms"] for r in resultados)
+        print(f"\n📈 Promoção com fila de {resultados[0]['em_espera']} vs {resultados[1]['em_espera']}: "
+              f"{grande} ms vs {pequena} ms (x{grande / pequena if pequena else 0:.2f})")
+    if not all(r["ordem_ok"] and r["vagas_ok"] for r in resultados):
+        print("❌ Admissões fora da ordem por média ou vagas inconsistentes!")
+        return 1
+    print("✅ Admissões pela ordem da média e sem vagas a mais.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
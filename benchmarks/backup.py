@@ -0,0 +1,140 @@
+"""
+Mede o efeito de um snapshot (backup.py) no lançamento de notas: um professor
+lança notas sem parar enquanto o snapshot corre, e compara a latência com o
+mesmo lançamento sem snapshot. Falha (código 1) se o snapshot não passar no
+integrity_check ou se alguma nota se perder.
+
+    python -m benchmarks.backup --alunos 5000
+    python -m benchmarks.backup --db dados.db        # usa uma cópia de um banco existente
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import backup
+import banco_do_sistema
+from benchmarks import gerar_dados
+from benchmarks.cenarios import _percentil
+from sistema import DatabaseManager, Nota
+
+
+def _lancar(db, alunos, disciplinas, parar, seed):
+    """Lança notas até parar ser ligado; devolve as latências em segundos."""
+    nota = Nota(db)
+    rnd = random.Random(seed)
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            nota.adicionar(rnd.choice(alunos), rnd.choice(disciplinas), "3º Trimestre", round(rnd.uniform(0, 20), 1))
+            tempos.append(time.perf_counter() - inicio)
+    return sorted(tempos)
+
+
+def _resumo(tempos, duracao):
+    return {
+        "n": len(tempos),
+        "ops_s": round(len(tempos) / duracao, 1) if duracao else 0.0,
+        "p50_ms": round(_percentil(tempos, 50) * 1000, 3),
+        "p99_ms": round(_percentil(tempos, 99) * 1000, 3),
+        "max_ms": round(tempos[-1] * 1000, 3) if tempos else 0.0,
+    }
+
+
+def executar(caminho, pasta, paginas=backup.PAGINAS_POR_PASSO, pausa=backup.PAUSA_ENTRE_PASSOS, seed=0):
+    conn = banco_do_sistema.conectar(caminho)
+    alunos = [r[0] for r in conn.execute("SELECT id FROM alunos")]
+    disciplinas = [r[0] for r in conn.execute("SELECT id FROM disciplinas")]
+    notas_antes = conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+    conn.close()
+    db = DatabaseManager(caminho, tamanho_pool=2)
+
+    # Com snapshot: lança enquanto backup.criar corre noutra thread
+    parar = threading.Event()
+    resultado = {}
+
+    def snapshot():
+        passos = []
+        inicio = time.perf_counter()
+        try:
+            resultado["snapshot"] = backup.criar(caminho, pasta, paginas=paginas, pausa=pausa,
+                                                 progresso=lambda copiadas, total: passos.append(total - copiadas))
+        except Exception as e:
+            resultado["erro"] = e
+        resultado["duracao"] = time.perf_counter() - inicio
+        # A API recomeça a cópia se a origem mudar a meio; com o instante fixado não deve acontecer
+        resultado["recomecos"] = sum(1 for a, b in zip(passos, passos[1:]) if b > a)
+        parar.set()
+
+    thread = threading.Thread(target=snapshot)
+    thread.start()
+    com = _lancar(db, alunos, disciplinas, parar, seed)
+    thread.join()
+    if "erro" in resultado:
+        raise resultado["erro"]
+
+    # Sem snapshot: o mesmo tempo só a lançar
+    parar = threading.Event()
+    temporizador = threading.Timer(resultado["duracao"], parar.set)
+    temporizador.start()
+    sem = _lancar(db, alunos, disciplinas, parar, seed + 1)
+    db.fechar()
+
+    conn = banco_do_sistema.conectar(caminho)
+    notas = conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+    conn.close()
+    return {
+        "snapshot": resultado["snapshot"],
+        "duracao_s": round(resultado["duracao"], 2),
+        "recomecos": resultado["recomecos"],
+        "integro": not backup.verificar(resultado["snapshot"]),
+        "com": _resumo(com, resultado["duracao"]),
+        "sem": _resumo(sem, resultado["duracao"]),
+        "gravadas": notas - notas_antes,
+        "lancadas": len(com) + len(sem),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="banco existente (é copiado para uma pasta temporária)")
+    parser.add_argument("--alunos", type=int, default=5000)
+    parser.add_argument("--paginas", type=int, default=backup.PAGINAS_POR_PASSO, help="páginas por passo do backup")
+    parser.add_argument("--pausa", type=float, default=backup.PAUSA_ENTRE_PASSOS, help="segundos entre passos")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="backup_")
+    try:
+        caminho = os.path.join(pasta, "backup.db")
+        if args.db:
+            shutil.copy(args.db, caminho)
+        else:
+            gerar_dados.gerar(caminho, alunos=args.alunos, seed=args.seed, progresso=lambda *_: None)
+        r = executar(caminho, os.path.join(pasta, "snapshots"), args.paginas, args.pausa, args.seed)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    s = r["snapshot"]
+    print(f"\n🏁 Snapshot de {os.path.basename(s.caminho)} ({s.tamanho / 2 ** 20:.1f} MiB comprimido) "
+          f"em {r['duracao_s']}s, {r['recomecos']} recomeço(s)")
+    for nome in ("sem", "com"):
+        m = r[nome]
+        print(f"- {nome} snapshot: {m['ops_s']:>8} notas/s | p50 {m['p50_ms']} ms | p99 {m['p99_ms']} ms "
+              f"| máx {m['max_ms']} ms")
+    if not r["integro"] or r["gravadas"] != r["lancadas"]:
+        print(f"❌ Snapshot íntegro: {r['integro']} | notas gravadas {r['gravadas']} de {r['lancadas']}")
+        return 1
+    print("✅ Snapshot íntegro e todas as notas gravadas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
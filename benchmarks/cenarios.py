@@ -0,0 +1,269 @@
+"""
+Cenários de desempenho das operações quentes: login, boletim, chamada da turma,
+matrícula sob contenção, listagens e pesquisa. Para cada cenário mede a
+latência de cada operação (p50/p95/p99) e o débito, e grava tudo num JSON em
+benchmarks/resultados/ para comparar commits.
+
+    python -m benchmarks.cenarios --alunos 5000                # gera os dados num banco temporário
+    python -m benchmarks.cenarios --db dados.db --threads 4    # usa uma cópia de um banco existente
+    python -m benchmarks.cenarios --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import boletim
+import rastreamento
+import senhas
+from benchmarks import gerar_dados
+from sistema import Aluno, Auth, DatabaseManager, Matricula, Nota, Presenca, Vagas
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+# -------------------------------
+# Medição
+# -------------------------------
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def medir(operacao, repeticoes, threads=1, seed=0):
+    """Corre operacao(rnd) `repeticoes` vezes repartidas por `threads`; devolve as estatísticas."""
+    def trabalhador(n):
+        rnd = random.Random(seed * 1000 + n)
+        tempos = []
+        for _ in range(repeticoes // threads + (n < repeticoes % threads)):
+            inicio = time.perf_counter()
+            operacao(rnd)
+            tempos.append(time.perf_counter() - inicio)
+        return tempos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        tempos = sorted(t for parte in executor.map(trabalhador, range(threads)) for t in parte)
+    duracao = time.perf_counter() - inicio
+    return {
+        "n": len(tempos),
+        "threads": threads,
+        "p50_ms": round(_percentil(tempos, 50) * 1000, 3),
+        "p95_ms": round(_percentil(tempos, 95) * 1000, 3),
+        "p99_ms": round(_percentil(tempos, 99) * 1000, 3),
+        "media_ms": round(sum(tempos) / len(tempos) * 1000, 3) if tempos else 0.0,
+        "ops_s": round(len(tempos) / duracao, 1) if duracao else 0.0,
+    }
+
+
+# -------------------------------
+# Cenários
+# -------------------------------
+class Contexto:
+    def __init__(self, db):
+        self.db = db
+        self.vagas = Vagas(db)
+        self.auth_frio = Auth(db, cache=senhas.CacheVerificacoes(max_entradas=0))
+        self.auth = Auth(db, cache=senhas.CacheVerificacoes())
+        self.alunos = Aluno(db, self.vagas)
+        self.matriculas = Matricula(db, self.vagas)
+        self.notas = Nota(db)
+        self.presencas = Presenca(db)
+        with db.conexao() as conn:
+            self.lista_alunos = conn.execute("SELECT id, numero_bilhete FROM alunos").fetchall()
+            self.turmas = conn.execute("SELECT DISTINCT curso, turma FROM alunos").fetchall()
+            self.disciplinas = conn.execute("SELECT id FROM disciplinas").fetchall()
+        self._dia = date(2030, 1, 1)
+        self._lock = threading.Lock()
+
+    def novo_dia(self):
+        # Cada chamada numa data nova: mede inserções, não o atalho do upsert sem mudanças
+        with self._lock:
+            self._dia += timedelta(days=1)
+            return self._dia.isoformat()
+
+
+def _login(ctx, rnd):
+    _, bilhete = rnd.choice(ctx.lista_alunos)
+    assert ctx.auth_frio.verificar_credenciais(bilhete, gerar_dados.SENHA_ALUNOS)
+
+
+def _login_em_cache(ctx, rnd):
+    # Poucos utilizadores a repetir o login: depois do primeiro, todos acertam na cache
+    _, bilhete = rnd.choice(ctx.lista_alunos[:50])
+    assert ctx.auth.verificar_credenciais(bilhete, gerar_dados.SENHA_ALUNOS)
+
+
+def _boletim(ctx, rnd):
+    boletim.gerar_boletim(ctx.db, rnd.choice(ctx.lista_alunos)[0])
+
+
+def _boletins_turma(ctx, rnd):
+    curso, turma = rnd.choice(ctx.turmas)
+    for _ in boletim.gerar_boletins(ctx.db, curso=curso, turma=turma):
+        pass
+
+
+def _media_final(ctx, rnd):
+    ctx.notas.calcular_media_final(rnd.choice(ctx.lista_alunos)[0])
+
+
+def _chamada(ctx, rnd):
+    curso, turma = rnd.choice(ctx.turmas)
+    ausentes = [a for a, _ in rnd.sample(ctx.lista_alunos, 3)]
+    ctx.presencas.registrar_turma(rnd.choice(ctx.disciplinas)[0], ctx.novo_dia(), curso, turma, ausentes)
+
+
+def _matricula(ctx, rnd):
+    ctx.matriculas.adicionar(rnd.choice(ctx.lista_alunos)[0], "Informatica", "2026")
+
+
+def _listagem_alunos(ctx, rnd):
+    curso, turma = rnd.choice(ctx.turmas)
+    for i, _ in enumerate(ctx.alunos.iterar(curso, turma, tamanho_pagina=50)):
+        if i == 49:
+            break
+
+
+def _listagem_notas(ctx, rnd):
+    list(ctx.notas.iterar(aluno_id=rnd.choice(ctx.lista_alunos)[0]))
+
+
+def _pesquisa(ctx, rnd):
+    ctx.alunos.pesquisar(rnd.choice(gerar_dados.APELIDOS).split()[-1][:4])
+
+
+# nome -> (função, repetições relativas; o login sem cache paga o scrypt)
+CENARIOS = {
+    "login": (_login, 0.05),
+    "login_em_cache": (_login_em_cache, 1),
+    "boletim": (_boletim, 1),
+    "boletins_turma": (_boletins_turma, 0.1),
+    "media_final": (_media_final, 1),
+    "chamada": (_chamada, 0.2),
+    "matricula_concorrente": (_matricula, 1),
+    "listagem_alunos": (_listagem_alunos, 1),
+    "listagem_notas": (_listagem_notas, 1),
+    "pesquisa": (_pesquisa, 1),
+}
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def executar(caminho, repeticoes=500, threads=1, cenarios=None, seed=42, rastreio=None):
+    rastreador = rastreamento.Rastreador(amostragem=rastreio) if rastreio else None
+    db = DatabaseManager(caminho, tamanho_pool=max(threads, 2), rastreador=rastreador)
+    resultados = {}
+    try:
+        ctx = Contexto(db)
+        # Matrícula sob contenção: metade das tentativas fica sem vaga
+        with db.transacao() as conn:
+            conn.execute("UPDATE vagas SET total_vagas = vagas_ocupadas + ? WHERE curso='Informatica'",
+                         (repeticoes // 2,))
+        for nome in cenarios or CENARIOS:
+            funcao, peso = CENARIOS[nome]
+            n = max(threads, int(repeticoes * peso))
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultados[nome] = medir(lambda rnd: funcao(ctx, rnd), n, threads, seed)
+            print(f"  {nome:24s} p50={resultados[nome]['p50_ms']:9.3f} ms  p95={resultados[nome]['p95_ms']:9.3f} ms  "
+                  f"p99={resultados[nome]['p99_ms']:9.3f} ms  {resultados[nome]['ops_s']:10.1f} ops/s")
+        if "matricula_concorrente" in resultados:
+            total, ocupadas = next((t, o) for c, t, o in ctx.vagas.obter_todas() if c == "Informatica")
+            assert ocupadas <= total, "vagas vendidas a mais"
+            resultados["matricula_concorrente"]["vagas_livres_no_fim"] = total - ocupadas
+        if rastreador:
+            print(rastreador.relatorio())
+    finally:
+        db.fechar()
+    return resultados
+
+
+def comparar(atual, anterior):
+    print(f"\n📈 Comparação com {anterior.get('commit')} ({anterior.get('data')}):")
+    for nome, r in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(nome)
+        if not antes:
+            continue
+        dp95 = (r["p95_ms"] / antes["p95_ms"] - 1) * 100 if antes["p95_ms"] else 0.0
+        dops = (r["ops_s"] / antes["ops_s"] - 1) * 100 if antes["ops_s"] else 0.0
+        alerta = " ⚠️" if dp95 > 20 else ""
+        print(f"  {nome:24s} p95 {dp95:+7.1f}%   ops/s {dops:+7.1f}%{alerta}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="banco existente (é copiado; o original não é alterado)")
+    parser.add_argument("--alunos", type=int, default=2000, help="tamanho do banco gerado quando não há --db")
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS))
+    parser.add_argument("--rastreio", type=float, help="fração de checkouts rastreados (ex.: 0.05; mede o custo)")
+    parser.add_argument("--saida", help="JSON de resultados (padrão: benchmarks/resultados/<data>_<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="cenarios_")
+    caminho = os.path.join(pasta, "cenarios.db")
+    try:
+        if args.db:
+            origem = sqlite3.connect(args.db)
+            destino = sqlite3.connect(caminho)
+            origem.backup(destino)
+            origem.close()
+            destino.close()
+            parametros = {"db": args.db}
+        else:
+            print(f"⏳ A gerar banco com {args.alunos} alunos...")
+            gerar_dados.gerar(caminho, alunos=args.alunos, dias=args.dias, progresso=lambda *_: None)
+            parametros = {"alunos": args.alunos, "dias": args.dias}
+        parametros.update(repeticoes=args.repeticoes, threads=args.threads, rastreio=args.rastreio)
+
+        print(f"\n⏱️ Cenários ({args.threads} threads):")
+        resultados = executar(caminho, args.repeticoes, args.threads, args.cenarios, rastreio=args.rastreio)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                    "cpus": os.cpu_count(), "sistema": platform.platform()},
+        "parametros": parametros,
+        "cenarios": resultados,
+    }
+    saida = args.saida
+    if not saida:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        saida = os.path.join(PASTA_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}_{relatorio['commit'] or 'sem-git'}.json")
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(relatorio, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Micro-benchmark do registo de consultas (consultas.py): linhas por segundo de
+uma listagem de 100k notas e fichas de aluno por segundo, com o código de antes
+(SQL montado a cada chamada, cursor novo, SELECT *, _make linha a linha) e com
+o de agora (SQL registado, tipos construídos com tuple.__new__).
+
+    python -m benchmarks.consultas --linhas 100000
+    python -m benchmarks.consultas --db dados.db        # usa uma cópia de um banco existente
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+
+from benchmarks import gerar_dados
+from consultas import NotaLinha
+from sistema import Aluno, DatabaseManager, Nota
+
+NOTAS_POR_ALUNO = 48  # 8 disciplinas x 3 trimestres x 2 avaliações (gerar_dados)
+
+
+# -------------------------------
+# Como era antes do registo
+# -------------------------------
+def _iterar_antes(db_manager, select, chave, tipo, filtros=None, tamanho_pagina=500, depois=-1):
+    filtros = {c: v for c, v in (filtros or {}).items() if v is not None}
+    condicoes = [f"{chave} > ?"] + [f"{coluna} = ?" for coluna in filtros]
+    sql = f"{select} WHERE {' AND '.join(condicoes)} ORDER BY {chave} LIMIT ?"
+    ultimo = depois
+    while True:
+        with db_manager.conexao() as conn:
+            cursor = conn.execute(sql, (ultimo, *filtros.values(), tamanho_pagina))
+            pagina = cursor.fetchmany(tamanho_pagina)
+        for row in pagina:
+            yield tipo._make(row)
+        if len(pagina) < tamanho_pagina:
+            return
+        ultimo = pagina[-1][0]
+
+
+def _notas_antes(db_manager):
+    return _iterar_antes(db_manager, """
+        SELECT n.id, a.nome, d.nome, n.trimestre, n.nota
+        FROM notas n
+        JOIN alunos a ON n.aluno_id = a.id
+        JOIN disciplinas d ON n.disciplina_id = d.id
+    """, "n.id", NotaLinha)
+
+
+def _aluno_antes(db_manager, aluno_id):
+    conn = db_manager.connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM alunos WHERE id=?", (aluno_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+# -------------------------------
+# Medição
+# -------------------------------
+# Antes e depois alternados em cada ronda, ficando o melhor tempo de cada um:
+# assim um pico de carga na máquina não cai todo no mesmo lado.
+def _melhor(funcoes, rondas):
+    melhores = [None] * len(funcoes)
+    for _ in range(rondas):
+        for i, funcao in enumerate(funcoes):
+            inicio = time.perf_counter()
+            funcao()
+            duracao = time.perf_counter() - inicio
+            melhores[i] = duracao if melhores[i] is None else min(melhores[i], duracao)
+    return melhores
+
+
+def executar(caminho, linhas=100000, rondas=5, fichas=20000, seed=0):
+    db = DatabaseManager(caminho, tamanho_pool=1)
+    aluno, nota = Aluno(db), Nota(db)
+    with db.conexao() as conn:
+        max_aluno = conn.execute("SELECT MAX(id) FROM alunos").fetchone()[0]
+    rnd = random.Random(seed)
+    ids = [rnd.randint(1, max_aluno) for _ in range(fichas)]
+    lidas = [sum(1 for _ in islice(_notas_antes(db), linhas)), sum(1 for _ in islice(nota.iterar(), linhas))]
+
+    listagem = _melhor([lambda: sum(1 for _ in islice(_notas_antes(db), linhas)),
+                        lambda: sum(1 for _ in islice(nota.iterar(), linhas))], rondas)
+    ficha = _melhor([lambda: [_aluno_antes(db, i) for i in ids],
+                     lambda: [aluno.obter_por_id(i) for i in ids]], rondas)
+    db.fechar()
+    return {
+        "linhas": lidas,
+        "listagem_s": [round(lidas[0] / listagem[0]), round(lidas[1] / listagem[1])],
+        "fichas_s": [round(fichas / ficha[0]), round(fichas / ficha[1])],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="banco existente (é copiado para uma pasta temporária)")
+    parser.add_argument("--linhas", type=int, default=100000, help="linhas da listagem de notas")
+    parser.add_argument("--rondas", type=int, default=5, help="rondas antes/depois (fica a melhor de cada)")
+    parser.add_argument("--fichas", type=int, default=20000, help="leituras de ficha de aluno")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="consultas_")
+    try:
+        caminho = os.path.join(pasta, "consultas.db")
+        if args.db:
+            shutil.copy(args.db, caminho)
+        else:
+            alunos = args.linhas // NOTAS_POR_ALUNO + 1
+            gerar_dados.gerar(caminho, alunos=alunos, dias=1, seed=args.seed, progresso=lambda *_: None)
+        r = executar(caminho, args.linhas, args.rondas, args.fichas, args.seed)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    antes, depois = r["listagem_s"]
+    print(f"\n🏁 Listagem de {r['linhas'][1]} notas (melhor de {args.rondas} rondas)")
+    print(f"- antes:  {antes:>9} linhas/s")
+    print(f"- depois: {depois:>9} linhas/s x{depois / antes:.2f}")
+    antes, depois = r["fichas_s"]
+    print(f"\n🏁 {args.fichas} fichas de aluno por id")
+    print(f"- antes:  {antes:>9} fichas/s")
+    print(f"- depois: {depois:>9} fichas/s x{depois / antes:.2f}")
+    if r["linhas"][0] != r["linhas"][1]:
+        print("❌ As duas listagens não leram o mesmo número de linhas!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Compara o lançamento de notas e presenças com um commit por linha e com a
+escrita diferida (group commit). Vários "professores" (threads) lançam ao mesmo
+tempo; mede o débito e a latência até a escrita estar gravada. Falha (código 1)
+se alguma escrita se perder.
+
+    python -m benchmarks.escrita_diferida --threads 8 --escritas 4000 --perfil duravel
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import banco_do_sistema
+from benchmarks import gerar_dados
+from benchmarks.cenarios import medir
+from sistema import DatabaseManager, Nota, Presenca
+
+MODOS = ("por_linha", "diferida")
+
+
+def _contar(caminho):
+    conn = banco_do_sistema.conectar(caminho)
+    notas, presencas = conn.execute("SELECT (SELECT COUNT(*) FROM notas), (SELECT COUNT(*) FROM presencas)").fetchone()
+    conn.close()
+    return notas, presencas
+
+
+def _cenario(base, pasta, modo, threads, escritas, perfil, intervalo_ms, seed):
+    caminho = os.path.join(pasta, f"{modo}.db")
+    shutil.copy(base, caminho)
+    notas_antes, presencas_antes = _contar(caminho)
+    conn = banco_do_sistema.conectar(caminho)
+    alunos = [r[0] for r in conn.execute("SELECT id FROM alunos")]
+    disciplinas = [r[0] for r in conn.execute("SELECT id FROM disciplinas")]
+    conn.close()
+
+    db = DatabaseManager(caminho, tamanho_pool=threads + 1, perfil=perfil, diferir_escritas=modo == "diferida")
+    if db.escrita:
+        db.escrita.intervalo = intervalo_ms / 1000
+    nota, presenca = Nota(db), Presenca(db)
+    # Presenças em datas que não existem no banco gerado: cada escrita é uma linha nova
+    contador = iter(range(escritas))
+    lock = threading.Lock()
+    inicio_datas = date(2030, 1, 1)
+
+    def lancar(rnd):
+        with lock:
+            i = next(contador)
+        aluno_id, disciplina_id = rnd.choice(alunos), rnd.choice(disciplinas)
+        if i % 2:
+            nota.adicionar(aluno_id, disciplina_id, "1º Trimestre", round(rnd.uniform(0, 20), 1))
+        else:
+            presenca.registrar(aluno_id, disciplina_id, (inicio_datas + timedelta(days=i)).isoformat(),
+                               rnd.random() > 0.1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        r = medir(lancar, escritas, threads, seed)
+    r["escrita"] = db.escrita.estatisticas() if db.escrita else None
+    db.fechar()
+    notas, presencas = _contar(caminho)
+    r["gravadas"] = (notas - notas_antes) + (presencas - presencas_antes)
+    return r
+
+
+def _assincrono(base, pasta, escritas, perfil, intervalo_ms, seed):
+    """Submissões sem esperar pelo commit (callback de confirmação): o limite do escritor."""
+    caminho = os.path.join(pasta, "assincrono.db")
+    shutil.copy(base, caminho)
+    notas_antes, _ = _contar(caminho)
+    conn = banco_do_sistema.conectar(caminho)
+    alunos = [r[0] for r in conn.execute("SELECT id FROM alunos")]
+    disciplinas = [r[0] for r in conn.execute("SELECT id FROM disciplinas")]
+    conn.close()
+    rnd = random.Random(seed)
+    lancamentos = [(rnd.choice(alunos), rnd.choice(disciplinas), round(rnd.uniform(0, 20), 1)) for _ in range(escritas)]
+
+    db = DatabaseManager(caminho, tamanho_pool=2, perfil=perfil, diferir_escritas=True)
+    db.escrita.intervalo = intervalo_ms / 1000
+    confirmadas = []
+    inicio = time.perf_counter()
+    for aluno_id, disciplina_id, valor in lancamentos:
+        db.escrita.submeter(lambda c, a=aluno_id, d=disciplina_id, v=valor: Nota._inserir(c, a, d, "2º Trimestre", v),
+                            callback=confirmadas.append)
+    db.fechar()  # grava o que ficou na fila
+    duracao = time.perf_counter() - inicio
+    notas, _ = _contar(caminho)
+    return {
+        "ops_s": round(escritas / duracao, 1),
+        "confirmadas": sum(1 for f in confirmadas if f.exception() is None),
+        "gravadas": notas - notas_antes,
+    }
+
+
+def executar(threads=8, escritas=4000, alunos=500, perfil="duravel", intervalo_ms=0, seed=0):
+    pasta = tempfile.mkdtemp(prefix="escrita_diferida_")
+    try:
+        base = os.path.join(pasta, "base.db")
+        gerar_dados.gerar(base, alunos=alunos, trimestres=1, dias=1, seed=seed, progresso=lambda *_: None)
+        resultados = {modo: _cenario(base, pasta, modo, threads, escritas, perfil, intervalo_ms, seed)
+                      for modo in MODOS}
+        resultados["assincrono"] = _assincrono(base, pasta, escritas, perfil, intervalo_ms, seed)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="professores a lançar ao mesmo tempo")
+    parser.add_argument("--escritas", type=int, default=4000, help="notas + presenças por cenário")
+    parser.add_argument("--alunos", type=int, default=500)
+    parser.add_argument("--perfil", default="duravel", choices=sorted(banco_do_sistema.PERFIS),
+                        help="duravel = fsync em cada commit")
+    parser.add_argument("--intervalo-ms", type=float, default=0, help="espera extra do escritor por mais linhas")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    r = executar(args.threads, args.escritas, args.alunos, args.perfil, args.intervalo_ms, args.seed)
+    print(f"\n🏁 {args.escritas} escritas, {args.threads} threads, perfil {args.perfil}, "
+          f"intervalo {args.intervalo_ms} ms")
+    for modo in MODOS:
+        m = r[modo]
+        extra = ""
+        if m["escrita"]:
+            extra = f" | lotes: {m['escrita']['lotes']} (média {m['escrita']['media_lote']}, maior {m['escrita']['maior_lote']})"
+        print(f"- {modo:<10} {m['ops_s']:>9} escritas/s | p50 {m['p50_ms']} ms | p99 {m['p99_ms']} ms{extra}")
+    a = r["assincrono"]
+    print(f"- assíncrono {a['ops_s']:>9} escritas/s | {a['confirmadas']} confirmações por callback")
+    print(f"\n📈 Group commit: x{r['diferida']['ops_s'] / r['por_linha']['ops_s']:.1f} o débito do commit por linha")
+
+    perdidas = [m for m in MODOS if r[m]["gravadas"] != args.escritas]
+    if perdidas or a["gravadas"] != args.escritas or a["confirmadas"] != args.escritas:
+        print(f"❌ Escritas perdidas: {perdidas or ['assincrono']}")
+        return 1
+    print("✅ Todas as escritas gravadas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
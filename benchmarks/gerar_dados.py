@@ -0,0 +1,191 @@
+"""
+Gera um banco escolar sintético do tamanho que se quiser, com nomes e bairros
+ao estilo de Luanda, para benchmarks e testes de carga.
+
+    python -m benchmarks.gerar_dados dados.db --alunos 5000 --professores 120 --dias 60
+
+Cada aluno tem utilizador com username = número do bilhete e senha SENHA_ALUNOS;
+o diretor é 'diretor' / SENHA_DIRETOR. Para não gastar minutos em scrypt, todos
+os alunos partilham o mesmo hash (aceitável só em dados sintéticos).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import banco_do_sistema
+import senhas
+
+SENHA_ALUNOS = "senha123"
+SENHA_DIRETOR = "diretor"
+
+NOMES_M = ["António", "Manuel", "João", "José", "Domingos", "Joaquim", "Adilson", "Edvaldo", "Nelson",
+           "Feliciano", "Mateus", "Agostinho", "Francisco", "Hélder", "Osvaldo", "Kiluange", "Ngola",
+           "Mbala", "Lukeny", "Emanuel", "Celso", "Valdemar", "Gaspar", "Sebastião", "Anderson"]
+NOMES_F = ["Maria", "Ana", "Esperança", "Luzia", "Isabel", "Teresa", "Madalena", "Josefa", "Celestina",
+           "Albertina", "Nzinga", "Kiesse", "Nsimba", "Yola", "Rosa", "Domingas", "Engrácia", "Filomena",
+           "Lurdes", "Paulina", "Wezy", "Djamila", "Graça", "Helena", "Tchissola"]
+APELIDOS = ["dos Santos", "Neto", "Lourenço", "Kiala", "Cassoma", "Sapalo", "Kapinga", "Muteka", "Ndala",
+            "Domingos", "Fernandes", "Gaspar", "Sebastião", "Bento", "Cambundo", "Kaluanda", "Mbemba",
+            "Chipenda", "Tchiyuka", "Massango", "da Silva", "Pedro", "Miguel", "João", "Lussati", "Nunda",
+            "Ngunza", "Samakuva", "Catumbela", "Kanda"]
+BAIRROS = ["Maianga", "Rangel", "Sambizanga", "Cazenga", "Viana", "Kilamba", "Talatona", "Cacuaco",
+           "Ingombota", "Prenda", "Palanca", "Golfe", "Benfica", "Mutamba", "Zango", "Rocha Pinto",
+           "Hoji-ya-Henda", "Mulenvos", "Camama", "Patriota"]
+DISCIPLINAS = {
+    "Informatica": ["Matemática", "Língua Portuguesa", "Inglês", "Física", "Programação",
+                    "Redes de Computadores", "Sistemas Operativos", "Base de Dados"],
+    "Contabilidade": ["Matemática", "Língua Portuguesa", "Inglês", "Contabilidade Geral",
+                      "Direito Comercial", "Economia", "Fiscalidade", "Estatística"],
+    "Finanças": ["Matemática", "Língua Portuguesa", "Inglês", "Matemática Financeira", "Economia",
+                 "Gestão Financeira", "Mercados de Capitais", "Estatística"],
+}
+# Turma -> classe: cada classe tem duas turmas por curso
+TURMAS = {"A": "10", "B": "10", "C": "11", "D": "11", "E": "12", "F": "12"}
+TRIMESTRES = ["1º Trimestre", "2º Trimestre", "3º Trimestre"]
+
+
+def _nome(rnd, genero):
+    proprio = rnd.choice(NOMES_M if genero == "M" else NOMES_F)
+    return f"{proprio} {rnd.choice(APELIDOS)} {rnd.choice(APELIDOS)}"
+
+
+def _dias_letivos(inicio, quantidade):
+    dia = inicio
+    while quantidade:
+        if dia.weekday() < 5:
+            yield dia.isoformat()
+            quantidade -= 1
+        dia += timedelta(days=1)
+
+
+def gerar(caminho, alunos=1000, professores=40, trimestres=3, dias=40, aulas_por_dia=3,
+          ano_letivo="2025", seed=42, progresso=print):
+    """Cria `caminho` do zero e devolve um dicionário com as contagens geradas."""
+    rnd = random.Random(seed)
+    inicio = time.perf_counter()
+    conn = banco_do_sistema.conectar(caminho, "carga_em_massa")
+    banco_do_sistema.migrar(conn)
+    contagens = {}
+
+    with conn:
+        # Disciplinas: o mesmo plano por curso e classe
+        plano = {}  # (curso, classe) -> [ids]
+        for curso, nomes in DISCIPLINAS.items():
+            for classe in sorted(set(TURMAS.values())):
+                ids = []
+                for nome in nomes:
+                    ids.append(conn.execute("INSERT INTO disciplinas (nome, curso, classe) VALUES (?, ?, ?)",
+                                            (nome, curso, classe)).lastrowid)
+                plano[curso, classe] = ids
+        contagens["disciplinas"] = sum(len(v) for v in plano.values())
+
+        especialidades = sorted({n for nomes in DISCIPLINAS.values() for n in nomes})
+        conn.executemany("INSERT INTO professores (nome, especialidade, telefone, email) VALUES (?, ?, ?, ?)", [
+            (_nome(rnd, rnd.choice("MF")), rnd.choice(especialidades), f"9{rnd.randint(10000000, 99999999)}",
+             f"professor{i}@escola.ao") for i in range(professores)
+        ])
+        contagens["professores"] = professores
+
+        linhas = []
+        for i in range(alunos):
+            genero = rnd.choice("MF")
+            curso = rnd.choice(list(DISCIPLINAS))
+            turma = rnd.choice(list(TURMAS))
+            # Idade ~ classe + 6 anos
+            nascimento = date(int(ano_letivo) - 6 - int(TURMAS[turma]) + rnd.randint(-1, 1),
+                              rnd.randint(1, 12), rnd.randint(1, 28))
+            bilhete = f"{i:09d}{rnd.choice(['LA', 'BE', 'HO', 'HA', 'BA'])}{rnd.randint(0, 999):03d}"
+            linhas.append((_nome(rnd, genero), nascimento.isoformat(), genero, rnd.choice(BAIRROS),
+                           bilhete, turma, curso))
+        conn.executemany("""
+            INSERT INTO alunos (nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+        alunos_db = conn.execute("SELECT id, numero_bilhete, turma, curso FROM alunos ORDER BY id").fetchall()
+        contagens["alunos"] = len(alunos_db)
+        progresso(f"⏳ {len(alunos_db)} alunos, {professores} professores, {contagens['disciplinas']} disciplinas")
+
+        hash_alunos = senhas.gerar_hash(SENHA_ALUNOS)
+        conn.executemany("INSERT INTO usuarios (username, senha, tipo, referencia_id) VALUES (?, ?, 'aluno', ?)",
+                         [(b, hash_alunos, aid) for aid, b, _, _ in alunos_db])
+        conn.execute("INSERT OR IGNORE INTO usuarios (username, senha, tipo) VALUES ('diretor', ?, 'diretor')",
+                     (senhas.gerar_hash(SENHA_DIRETOR),))
+
+        conn.executemany("INSERT INTO matriculas (aluno_id, curso, ano_letivo) VALUES (?, ?, ?)",
+                         [(aid, curso, ano_letivo) for aid, _, _, curso in alunos_db])
+        for curso in DISCIPLINAS:
+            ocupadas = sum(1 for r in alunos_db if r[3] == curso)
+            conn.execute("UPDATE vagas SET total_vagas=MAX(total_vagas, ?), vagas_ocupadas=? WHERE curso=?",
+                         (ocupadas + ocupadas // 10, ocupadas, curso))
+
+    # Notas: duas avaliações por trimestre em cada disciplina do plano do aluno
+    with conn:
+        def notas():
+            for aid, _, turma, curso in alunos_db:
+                nivel = rnd.gauss(12, 3)
+                for did in plano[curso, TURMAS[turma]]:
+                    for trimestre in TRIMESTRES[:trimestres]:
+                        for _ in range(2):
+                            yield aid, did, trimestre, round(min(20, max(0, rnd.gauss(nivel, 2.5))), 1)
+        conn.executemany("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, ?)", notas())
+        contagens["notas"] = conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+    progresso(f"⏳ {contagens['notas']} notas")
+
+    # Presenças: por dia letivo, cada turma tem `aulas_por_dia` disciplinas em rotação
+    por_turma = {}
+    for aid, _, turma, curso in alunos_db:
+        por_turma.setdefault((curso, turma), []).append(aid)
+    total = 0
+    for n, dia in enumerate(_dias_letivos(date(int(ano_letivo), 2, 3), dias)):
+        lote = []
+        for (curso, turma), ids in por_turma.items():
+            disciplinas = plano[curso, TURMAS[turma]]
+            for k in range(aulas_por_dia):
+                did = disciplinas[(n * aulas_por_dia + k) % len(disciplinas)]
+                lote.extend((aid, did, dia, int(rnd.random() > 0.08)) for aid in ids)
+        with conn:
+            conn.executemany("INSERT INTO presencas (aluno_id, disciplina_id, data, presente) VALUES (?, ?, ?, ?)",
+                             lote)
+        total += len(lote)
+    contagens["presencas"] = total
+    progresso(f"⏳ {total} presenças")
+
+    conn.execute("ANALYZE")
+    conn.close()
+    contagens["segundos"] = round(time.perf_counter() - inicio, 1)
+    return contagens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("destino", help="ficheiro .db a criar")
+    parser.add_argument("--alunos", type=int, default=1000)
+    parser.add_argument("--professores", type=int, default=40)
+    parser.add_argument("--trimestres", type=int, default=3, choices=[1, 2, 3])
+    parser.add_argument("--dias", type=int, default=40, help="dias letivos de presenças")
+    parser.add_argument("--aulas-por-dia", type=int, default=3)
+    parser.add_argument("--ano-letivo", default="2025")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--substituir", action="store_true", help="apaga o destino se já existir")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.destino):
+        if not args.substituir:
+            print(f"⚠️ {args.destino} já existe. Use --substituir para o recriar.")
+            return 1
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(args.destino + sufixo):
+                os.remove(args.destino + sufixo)
+
+    c = gerar(args.destino, args.alunos, args.professores, args.trimestres, args.dias, args.aulas_por_dia,
+              args.ano_letivo, args.seed)
+    print(f"✅ {args.destino} gerado em {c['segundos']}s: {c['alunos']} alunos, {c['notas']} notas, "
+          f"{c['presencas']} presenças.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
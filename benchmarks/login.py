@@ -0,0 +1,86 @@
+"""
+Logins por segundo para cada custo do scrypt, com vários logins em paralelo,
+sem cache (cada login paga o KDF) e com a cache de verificações recentes.
+
+    python -m benchmarks.login --custos 4096 8192 16384 32768 --threads 8 --logins 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import banco_do_sistema
+import senhas
+from sistema import Auth, DatabaseManager
+
+
+def _medir(auth, usuarios, logins, threads):
+    def um(i):
+        username = usuarios[i % len(usuarios)]
+        return auth.verificar_credenciais(username, "senha-" + username) is not None
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(um, range(logins)))
+    duracao = time.perf_counter() - inicio
+    assert ok == logins, "login falhou durante o benchmark"
+    return logins / duracao
+
+
+def executar(custos, threads=8, logins=200, usuarios=50):
+    pasta = tempfile.mkdtemp(prefix="login_")
+    caminho = os.path.join(pasta, "login.db")
+    conn = banco_do_sistema.conectar(caminho)
+    banco_do_sistema.migrar(conn)
+    conn.close()
+    db = DatabaseManager(caminho, tamanho_pool=threads)
+    resultados = []
+    custo_original = senhas.SCRYPT_N
+    try:
+        for n in custos:
+            senhas.SCRYPT_N = n  # evita o rehash no primeiro login
+            nomes = [f"u{n}_{i}" for i in range(usuarios)]
+            with db.transacao() as conn:
+                conn.executemany("INSERT INTO usuarios (username, senha, tipo) VALUES (?, ?, 'aluno')",
+                                 [(u, senhas.gerar_hash("senha-" + u, n=n)) for u in nomes])
+
+            sem_cache = Auth(db, cache=senhas.CacheVerificacoes(max_entradas=0))
+            com_cache = Auth(db, cache=senhas.CacheVerificacoes())
+            with contextlib.redirect_stdout(io.StringIO()):
+                frio = _medir(sem_cache, nomes, logins, threads)
+                _medir(com_cache, nomes, len(nomes), threads)  # aquece a cache
+                quente = _medir(com_cache, nomes, logins, threads)
+
+            inicio = time.perf_counter()
+            senhas.gerar_hash("x", n=n)
+            latencia = time.perf_counter() - inicio
+            resultados.append({"n": n, "ms_por_hash": round(latencia * 1000, 1),
+                               "logins_s_sem_cache": round(frio, 1), "logins_s_com_cache": round(quente, 1)})
+    finally:
+        senhas.SCRYPT_N = custo_original
+        db.fechar()
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--custos", type=int, nargs="+", default=[2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"\n🔐 Logins/s com {args.threads} threads ({os.cpu_count()} CPUs)")
+    print(f"{'N':>8s} {'ms/hash':>9s} {'sem cache':>12s} {'com cache':>12s}")
+    for r in executar(args.custos, args.threads, args.logins):
+        print(f"{r['n']:8d} {r['ms_por_hash']:9.1f} {r['logins_s_sem_cache']:12.1f} {r['logins_s_com_cache']:12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
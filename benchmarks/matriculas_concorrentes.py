@@ -0,0 +1,113 @@
+"""
+Teste de stress das matrículas: muitos processos a matricular alunos ao mesmo
+tempo no mesmo curso. Falha (código 1) se alguma vaga for vendida a mais.
+
+    python -m benchmarks.matriculas_concorrentes --processos 16 --alunos 2000 --vagas 500
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import banco_do_sistema
+from sistema import DatabaseManager, Matricula, Vagas
+
+CURSO = "Informatica"
+
+
+def _preparar(caminho, alunos, vagas):
+    conn = banco_do_sistema.conectar(caminho)
+    banco_do_sistema.migrar(conn)
+    conn.execute("UPDATE vagas SET total_vagas=?, vagas_ocupadas=0 WHERE curso=?", (vagas, CURSO))
+    conn.executemany(
+        "INSERT INTO alunos (nome, data_nascimento, genero, turma, curso) VALUES (?, '2009-01-01', 'M', 'A', ?)",
+        ((f"Aluno {i}", CURSO) for i in range(alunos)))
+    conn.commit()
+    conn.close()
+
+
+def _trabalhador(caminho, aluno_ids, partida, resultados):
+    db = DatabaseManager(caminho, tamanho_pool=1)
+    matricula = Matricula(db, Vagas(db))
+    aceites = erros = 0
+    partida.wait()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for aid in aluno_ids:
+            try:
+                if matricula.adicionar(aid, CURSO, "2025/2026"):
+                    aceites += 1
+            except Exception:
+                erros += 1
+    resultados.put((aceites, erros, len(aluno_ids), time.perf_counter() - inicio))
+    db.fechar()
+
+
+def executar(processos=8, alunos=1000, vagas=300):
+    pasta = tempfile.mkdtemp(prefix="matriculas_")
+    caminho = os.path.join(pasta, "stress.db")
+    try:
+        _preparar(caminho, alunos, vagas)
+        partida = multiprocessing.Event()
+        resultados = multiprocessing.Queue()
+        fatias = [list(range(1 + i, alunos + 1, processos)) for i in range(processos)]
+        procs = [multiprocessing.Process(target=_trabalhador, args=(caminho, f, partida, resultados))
+                 for f in fatias]
+        for p in procs:
+            p.start()
+        inicio = time.perf_counter()
+        partida.set()
+        parciais = [resultados.get() for _ in procs]
+        duracao = time.perf_counter() - inicio
+        for p in procs:
+            p.join()
+
+        conn = banco_do_sistema.conectar(caminho)
+        total, ocupadas = conn.execute(
+            "SELECT total_vagas, vagas_ocupadas FROM vagas WHERE curso=?", (CURSO,)).fetchone()
+        matriculas = conn.execute("SELECT COUNT(*) FROM matriculas WHERE curso=?", (CURSO,)).fetchone()[0]
+        conn.close()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    aceites = sum(p[0] for p in parciais)
+    return {
+        "processos": processos,
+        "tentativas": alunos,
+        "vagas": total,
+        "aceites": aceites,
+        "erros": sum(p[1] for p in parciais),
+        "matriculas": matriculas,
+        "vagas_ocupadas": ocupadas,
+        "segundos": round(duracao, 3),
+        "tentativas_por_segundo": round(alunos / duracao, 1),
+        "sem_sobrevenda": matriculas == ocupadas == aceites <= total and aceites == min(alunos, total),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=8)
+    parser.add_argument("--alunos", type=int, default=1000)
+    parser.add_argument("--vagas", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    r = executar(args.processos, args.alunos, args.vagas)
+    print(f"\n🏁 {r['tentativas']} inscrições em {r['processos']} processos: {r['segundos']}s "
+          f"({r['tentativas_por_segundo']} inscrições/s)")
+    print(f"- Vagas: {r['vagas']} | aceites: {r['aceites']} | matrículas: {r['matriculas']} | "
+          f"ocupadas: {r['vagas_ocupadas']} | erros: {r['erros']}")
+    if not r["sem_sobrevenda"]:
+        print("❌ Vagas vendidas a mais ou matrículas inconsistentes!")
+        return 1
+    print("✅ Nenhuma vaga vendida a mais.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Teste de carga do serviço HTTP em localhost: sobe o servidor numa thread, com
+um banco temporário, e dispara pedidos de vários clientes keep-alive (boletim,
+vagas, notas e presenças) autenticados por token. No fim encerra o servidor
+de forma ordenada, como faria um SIGTERM.
+
+    python -m benchmarks.servidor --clientes 16 --pedidos 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import banco_do_sistema
+from servidor import Servico, ServidorHttp
+from sistema import Auth, DatabaseManager
+
+
+def _preparar(caminho, alunos):
+    conn = banco_do_sistema.conectar(caminho)
+    banco_do_sistema.migrar(conn)
+    with conn:
+        conn.executemany("INSERT INTO alunos (nome, data_nascimento, turma, curso) VALUES (?, '2009-01-01', ?, 'Informatica')",
+                         [(f"Aluno {i}", "ABC"[i % 3]) for i in range(alunos)])
+        conn.executemany("INSERT INTO disciplinas (nome, curso, classe) VALUES (?, 'Informatica', '10')",
+                         [(n,) for n in ("Matemática", "Português", "Física", "Programação")])
+        conn.executemany("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, ?)",
+                         [(a, d, t, random.randint(5, 20))
+                          for a in range(1, alunos + 1) for d in range(1, 5) for t in ("1", "2", "3")])
+    conn.close()
+
+
+class _Cliente:
+    def __init__(self, porta, token):
+        self.conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+        self.token = token
+
+    def pedir(self, metodo, caminho, dados=None):
+        cabecalhos = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        self.conn.request(metodo, caminho, body=json.dumps(dados) if dados is not None else None,
+                          headers=cabecalhos)
+        resposta = self.conn.getresponse()
+        resposta.read()
+        return resposta.status
+
+
+def executar(clientes=16, pedidos=2000, alunos=500, pool=8):
+    pasta = tempfile.mkdtemp(prefix="servidor_")
+    caminho = os.path.join(pasta, "servidor.db")
+    _preparar(caminho, alunos)
+    db = DatabaseManager(caminho, tamanho_pool=pool)
+    with contextlib.redirect_stdout(io.StringIO()):
+        Auth(db).registrar_usuario("diretor", "senha-diretor", "diretor")
+
+    loop = asyncio.new_event_loop()
+    servico = Servico(db)
+    servidor = loop.run_until_complete(ServidorHttp(servico, porta=0).iniciar())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    login = http.client.HTTPConnection("127.0.0.1", servidor.porta)
+    login.request("POST", "/login", body=json.dumps({"username": "diretor", "senha": "senha-diretor"}))
+    token = json.loads(login.getresponse().read())["token"]
+    login.close()
+
+    def trabalho(n):
+        cliente = _Cliente(servidor.porta, token)
+        rnd = random.Random(n)
+        tempos, estados = [], Counter()
+        for i in range(pedidos // clientes):
+            aluno = rnd.randint(1, alunos)
+            escolha = rnd.random()
+            inicio = time.perf_counter()
+            if escolha < 0.5:
+                estado = cliente.pedir("GET", f"/boletim/{aluno}")
+            elif escolha < 0.7:
+                estado = cliente.pedir("GET", "/vagas")
+            elif escolha < 0.85:
+                estado = cliente.pedir("GET", f"/notas?aluno_id={aluno}&limite=20")
+            else:
+                estado = cliente.pedir("POST", "/presencas", {"aluno_id": aluno, "disciplina_id": rnd.randint(1, 4),
+                                                             "data": f"2025-03-{rnd.randint(1, 28):02d}",
+                                                             "presente": rnd.random() > 0.1})
+            tempos.append(time.perf_counter() - inicio)
+            estados[estado] += 1
+        cliente.conn.close()
+        return tempos, estados
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clientes) as executor:
+                resultados = list(executor.map(trabalho, range(clientes)))
+            duracao = time.perf_counter() - inicio
+    finally:
+        asyncio.run_coroutine_threadsafe(servidor.encerrar(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        servico.fechar()
+        db.fechar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    tempos = sorted(t for ts, _ in resultados for t in ts)
+    estados = sum((e for _, e in resultados), Counter())
+    return {
+        "pedidos": len(tempos),
+        "pedidos_s": round(len(tempos) / duracao, 1),
+        "p50_ms": round(tempos[len(tempos) // 2] * 1000, 2),
+        "p99_ms": round(tempos[int(len(tempos) * 0.99)] * 1000, 2),
+        "estados": dict(estados),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--pedidos", type=int, default=2000)
+    parser.add_argument("--alunos", type=int, default=500)
+    parser.add_argument("--pool", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    r = executar(args.clientes, args.pedidos, args.alunos, args.pool)
+    print(f"\n🌐 {r['pedidos']} pedidos de {args.clientes} clientes: {r['pedidos_s']} pedidos/s, "
+          f"p50={r['p50_ms']} ms, p99={r['p99_ms']} ms")
+    print(f"   Estados HTTP: {r['estados']}")
+    return 0 if set(r["estados"]) <= {200, 201} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+from dataclasses import dataclass, field
+
+import banco_do_sistema
+
+
+# -------------------------------
+# Estruturas do boletim
+# -------------------------------
+@dataclass
+class TrimestreBoletim:
+    trimestre: str
+    notas: list
+    media: float
+
+
+@dataclass
+class DisciplinaBoletim:
+    nome: str
+    trimestres: list = field(default_factory=list)
+    media_final: float = None
+
+
+@dataclass
+class Boletim:
+    aluno_id: int
+    nome: str
+    curso: str
+    turma: str
+    disciplinas: list = field(default_factory=list)
+    media_geral: float = None
+
+    @property
+    def aprovado(self):
+        return self.media_geral is not None and self.media_geral >= 10
+
+    @property
+    def situacao(self):
+        return "Aprovado" if self.aprovado else "Reprovado"
+
+
+# -------------------------------
+# Motor: uma única agregação em SQL
+# -------------------------------
+# Médias por aluno/disciplina/trimestre com GROUP BY e média da disciplina
+# (média das médias trimestrais) com uma função de janela. Tal como no boletim
+# original, as disciplinas são agrupadas pelo nome.
+_SQL_BOLETINS = """
+    WITH por_trimestre AS (
+        SELECT n.aluno_id, d.nome AS disciplina, n.trimestre,
+               GROUP_CONCAT(n.nota) AS notas, AVG(n.nota) AS media_t
+        FROM notas n
+        JOIN disciplinas d ON n.disciplina_id = d.id
+        {juncao}
+        {filtro}
+        GROUP BY n.aluno_id, d.nome, n.trimestre
+    )
+    SELECT por_trimestre.aluno_id, a.nome, a.curso, a.turma, disciplina, trimestre, notas, media_t,
+           AVG(media_t) OVER (PARTITION BY por_trimestre.aluno_id, disciplina) AS media_disc
+    FROM por_trimestre
+    LEFT JOIN alunos a ON a.id = por_trimestre.aluno_id
+    ORDER BY por_trimestre.aluno_id, disciplina, trimestre
+"""
+
+
+def _montar_consulta(aluno_id=None, curso=None, turma=None):
+    # Notas por lançar (NULL) não contam, como em resumo_notas; um trimestre só com
+    # NULLs daria GROUP_CONCAT NULL e média NULL
+    condicoes, parametros = ["n.nota IS NOT NULL"], []
+    juncao = ""
+    if aluno_id is not None:
+        condicoes.append("n.aluno_id = ?")
+        parametros.append(aluno_id)
+    if curso is not None or turma is not None:
+        juncao = "JOIN alunos f ON f.id = n.aluno_id"
+        if curso is not None:
+            condicoes.append("f.curso = ?")
+            parametros.append(curso)
+        if turma is not None:
+            condicoes.append("f.turma = ?")
+            parametros.append(turma)
+    filtro = "WHERE " + " AND ".join(condicoes)
+    return _SQL_BOLETINS.format(juncao=juncao, filtro=filtro), parametros
+
+
+# Verificadas por 'python banco_do_sistema.py verificar-planos'
+CONSULTAS_QUENTES = {
+    "boletim.aluno": _montar_consulta(aluno_id=1),
+    "boletim.turma": _montar_consulta(curso="Informatica", turma="A"),
+    "boletim.media_final": ("SELECT media_final FROM medias_alunos WHERE aluno_id=?", (1,)),
+}
+
+
+def _fechar(boletim):
+    # A média geral é a média das médias finais (já arredondadas) das disciplinas
+    medias = [d.media_final for d in boletim.disciplinas]
+    boletim.media_geral = round(sum(medias) / len(medias), 2)
+    return boletim
+
+
+def gerar_boletins(db_manager, aluno_id=None, curso=None, turma=None):
+    """
+    Gera os boletins (um Boletim por aluno com notas) de um aluno, de uma turma,
+    de um curso ou da escola inteira, numa única consulta.
+    """
+    with db_manager.conexao() as conn:
+        yield from _iterar_boletins(conn, aluno_id, curso, turma)
+
+
+def _iterar_boletins(conn, aluno_id=None, curso=None, turma=None):
+    sql, parametros = _montar_consulta(aluno_id, curso, turma)
+    atual = None
+    disciplina = None
+    for (aid, nome, curso_a, turma_a, disc, trimestre, notas, media_t,
+         media_disc) in conn.execute(sql, parametros):
+        if atual is None or atual.aluno_id != aid:
+            if atual is not None:
+                yield _fechar(atual)
+            atual = Boletim(aid, nome, curso_a, turma_a)
+            disciplina = None
+        if disciplina is None or disciplina.nome != disc:
+            disciplina = DisciplinaBoletim(disc, media_final=round(media_disc, 2))
+            atual.disciplinas.append(disciplina)
+        lista = [float(n) for n in str(notas).split(",")]
+        disciplina.trimestres.append(TrimestreBoletim(trimestre, lista, media_t))
+    if atual is not None:
+        yield _fechar(atual)
+
+
+def gerar_boletim(db_manager, aluno_id):
+    """Boletim de um aluno, ou None se ele ainda não tiver notas."""
+    return next(gerar_boletins(db_manager, aluno_id=aluno_id), None)
+
+
+# -------------------------------
+# Médias materializadas (resumo_notas / medias_alunos)
+# -------------------------------
+# A média de cada trimestre sai de resumo_notas (soma / quantidade, mantidas
+# pelos triggers), sem voltar às notas do aluno. As disciplinas são agrupadas
+# pelo nome e as médias arredondadas como no boletim, por isso o valor em
+# medias_alunos é o mesmo que o boletim impresso mostra.
+_SQL_MEDIAS_RESUMO = """
+    WITH por_trimestre AS (
+        SELECT d.nome AS disciplina, SUM(r.soma) / SUM(r.quantidade) AS media_t
+        FROM resumo_notas r
+        JOIN disciplinas d ON r.disciplina_id = d.id
+        WHERE r.aluno_id = ?
+        GROUP BY d.nome, r.trimestre
+    )
+    SELECT AVG(media_t) FROM por_trimestre GROUP BY disciplina
+"""
+
+
+def _media_do_resumo(conn, aluno_id):
+    """Média final do aluno calculada a partir de resumo_notas (None se não tiver notas)."""
+    medias = [round(media_disc, 2) for (media_disc,) in conn.execute(_SQL_MEDIAS_RESUMO, (aluno_id,))]
+    return round(sum(medias) / len(medias), 2) if medias else None
+
+
+def atualizar_medias(conn, aluno_ids):
+    """Recalcula medias_alunos dos alunos indicados a partir de resumo_notas, na transação do chamador."""
+    medias = {aid: _media_do_resumo(conn, aid) for aid in set(aluno_ids)}
+    conn.executemany("INSERT OR REPLACE INTO medias_alunos (aluno_id, media_final) VALUES (?, ?)",
+                     medias.items())
+    return medias
+
+
+def media_final(db_manager, aluno_id):
+    """
+    Média final do aluno por chave primária. Se não estiver em medias_alunos, é
+    calculada a partir de resumo_notas e guardada só se o lock de escrita estiver
+    livre nesse momento: uma leitura nunca fica na fila dos escritores.
+    """
+    with db_manager.conexao() as conn:
+        row = conn.execute("SELECT media_final FROM medias_alunos WHERE aluno_id=?", (aluno_id,)).fetchone()
+        if row:
+            return row[0]
+        if conn.in_transaction:
+            return _media_do_resumo(conn, aluno_id)
+        espera = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute("PRAGMA busy_timeout=0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not banco_do_sistema.banco_ocupado(e):
+                raise
+            return _media_do_resumo(conn, aluno_id)
+        finally:
+            conn.execute(f"PRAGMA busy_timeout={espera}")
+        try:
+            media = atualizar_medias(conn, [aluno_id])[aluno_id]
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return media
+
+
+def reconstruir_resumos(db_manager):
+    """Reconstrói resumo_notas e medias_alunos do zero. Devolve o número de alunos com média."""
+    with db_manager.transacao("IMMEDIATE") as conn:
+        banco_do_sistema.reconstruir_resumo_notas(conn.cursor())
+        medias = [(b.aluno_id, b.media_geral) for b in _iterar_boletins(conn)]
+        conn.executemany("INSERT INTO medias_alunos (aluno_id, media_final) VALUES (?, ?)", medias)
+    return len(medias)
+
+
+def verificar_resumos(db_manager):
+    """
+    Compara o resumo materializado com um recálculo a partir de notas e as médias
+    em cache com o motor de boletins. Devolve a lista de inconsistências.
+    """
+    problemas = []
+    with db_manager.conexao() as conn:
+        esperado = {
+            (a, d, t): (s, q) for a, d, t, s, q in conn.execute("""
+                SELECT aluno_id, disciplina_id, trimestre, SUM(nota), COUNT(nota)
+                FROM notas WHERE nota IS NOT NULL
+                GROUP BY aluno_id, disciplina_id, trimestre
+            """)
+        }
+        atual = {
+            (a, d, t): (s, q) for a, d, t, s, q in conn.execute(
+                "SELECT aluno_id, disciplina_id, trimestre, soma, quantidade FROM resumo_notas")
+        }
+        for chave in esperado.keys() | atual.keys():
+            e, a = esperado.get(chave), atual.get(chave)
+            if e is None or a is None or e[1] != a[1] or abs(e[0] - a[0]) > 1e-6:
+                problemas.append(("resumo_notas", chave, e, a))
+        medias = dict(conn.execute("SELECT aluno_id, media_final FROM medias_alunos"))
+
+    for b in gerar_boletins(db_manager):
+        if b.aluno_id in medias:
+            media = medias.pop(b.aluno_id)
+            if media != b.media_geral:
+                problemas.append(("medias_alunos", b.aluno_id, b.media_geral, media))
+    # O que sobrou são alunos sem notas: a média em cache tem de ser NULL
+    for aid, media in medias.items():
+        if media is not None:
+            problemas.append(("medias_alunos", aid, None, media))
+    return problemas
+
+
+# -------------------------------
+# Impressão na consola
+# -------------------------------
+def imprimir_boletim(boletim):
+    if boletim.nome:
+        print(f"\n👤 {boletim.nome} | Curso: {boletim.curso} | Turma: {boletim.turma}")
+    print("\n📊 BOLETIM ESCOLAR COMPLETO")
+    print("-" * 75)
+    print(f"{'Disciplina':20s} {'Trimestre':>10s} {'Notas':>20s} {'Média':>10s}")
+    print("-" * 75)
+
+    for disc in boletim.disciplinas:
+        for t in disc.trimestres:
+            notas_texto = ", ".join(f"{n:.1f}" for n in t.notas)
+            print(f"{disc.nome:20s} {str(t.trimestre):>10s} {notas_texto:>20s} {t.media:10.2f}")
+        print(f"{'':20s} {'':>10s} {'Média Final:':>20s} {disc.media_final:10.2f}")
+        print("-" * 75)
+
+    situacao = "🟢 Aprovado" if boletim.aprovado else "🔴 Reprovado"
+    print(f"{'Média Final Geral:':>55s} {boletim.media_geral:10.2f}")
+    print(f"{'Situação:':>55s} {situacao:>10s}")
+    print("-" * 75)
+
+
+# -------------------------------
+# Verificação contra o algoritmo original
+# -------------------------------
+def _boletim_legado(rows):
+    """Algoritmo original de Nota.gerar_boletim: rows = [(disciplina, trimestre, nota)]."""
+    boletim = {}
+    for disciplina, trimestre, nota in rows:
+        boletim.setdefault(disciplina, {}).setdefault(trimestre, []).append(nota)
+    medias_finais = {}
+    for disc, trimestres in boletim.items():
+        todas_medias = [sum(notas) / len(notas) for notas in trimestres.values()]
+        medias_finais[disc] = round(sum(todas_medias) / len(todas_medias), 2)
+    media_final_geral = round(sum(medias_finais.values()) / len(medias_finais), 2)
+    return medias_finais, media_final_geral
+
+
+def verificar_equivalencia(alunos=300, seed=None):
+    """
+    Teste de propriedade: gera dados aleatórios num banco temporário e compara,
+    aluno a aluno, as médias do motor SQL com as do algoritmo original.
+    Devolve a lista de divergências (vazia se tudo bate certo).
+    """
+    from sistema import DatabaseManager
+
+    rnd = random.Random(seed)
+    pasta = tempfile.mkdtemp(prefix="boletim_")
+    caminho = os.path.join(pasta, "verificacao.db")
+    conn = banco_do_sistema.conectar(caminho)
+    banco_do_sistema.migrar(conn)
+    nomes = ["Matemática", "Português", "Física", "Química", "Inglês", "Base De Dados"]
+    conn.executemany("INSERT INTO disciplinas (nome, curso, classe) VALUES (?, ?, ?)",
+                     [(n, rnd.choice(["Informatica", "Contabilidade"]), "10º") for n in nomes * 2])
+    for i in range(alunos):
+        aid = conn.execute(
+            "INSERT INTO alunos (nome, data_nascimento, genero, turma, curso) VALUES (?, '2009-01-01', 'M', ?, ?)",
+            (f"Aluno {i}", rnd.choice("ABC"), rnd.choice(["Informatica", "Contabilidade"]))).lastrowid
+        for _ in range(rnd.randint(0, 25)):
+            nota = rnd.choice([round(rnd.uniform(0, 20), rnd.choice([0, 1, 2])), rnd.randint(0, 20)])
+            conn.execute("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, ?)",
+                         (aid, rnd.randint(1, len(nomes) * 2), rnd.choice(["1º", "2º", "3º"]), nota))
+    conn.commit()
+
+    esperado = {}
+    for aid in range(1, alunos + 1):
+        rows = conn.execute("""
+            SELECT d.nome, n.trimestre, n.nota FROM notas n JOIN disciplinas d ON n.disciplina_id = d.id
+            WHERE n.aluno_id=? ORDER BY d.nome, n.trimestre
+        """, (aid,)).fetchall()
+        if rows:
+            esperado[aid] = _boletim_legado(rows)
+    conn.close()
+
+    db = DatabaseManager(caminho)
+    divergencias = []
+    try:
+        obtido = {b.aluno_id: b for b in gerar_boletins(db)}
+        if set(obtido) != set(esperado):
+            divergencias.append(("alunos", sorted(esperado), sorted(obtido)))
+        for aid, (finais, geral) in esperado.items():
+            b = obtido.get(aid)
+            if b is None:
+                continue
+            finais_sql = {d.nome: d.media_final for d in b.disciplinas}
+            if finais_sql != finais or b.media_geral != geral:
+                divergencias.append((aid, (finais, geral), (finais_sql, b.media_geral)))
+            materializada = media_final(db, aid)
+            if materializada != geral:
+                divergencias.append((aid, geral, ("medias_alunos", materializada)))
+    finally:
+        db.fechar()
+        shutil.rmtree(pasta, ignore_errors=True)
+    return divergencias
+
+
+def _cmd_verificar(args):
+    divergencias = verificar_equivalencia(args.alunos, args.seed)
+    if divergencias:
+        print(f"❌ {len(divergencias)} boletins diferentes do algoritmo original:")
+        for d in divergencias[:10]:
+            print(f"- {d}")
+        return 1
+    print(f"✅ Motor de boletins igual ao algoritmo original em {args.alunos} alunos aleatórios.")
+    return 0
+
+
+def _cmd_reconstruir(args):
+    from sistema import DatabaseManager
+    db = DatabaseManager(args.db)
+    try:
+        total = reconstruir_resumos(db)
+    finally:
+        db.fechar()
+    print(f"✅ Resumo de notas reconstruído ({total} alunos com média).")
+
+
+def _cmd_verificar_resumos(args):
+    from sistema import DatabaseManager
+    db = DatabaseManager(args.db)
+    try:
+        problemas = verificar_resumos(db)
+    finally:
+        db.fechar()
+    if problemas:
+        print(f"❌ {len(problemas)} inconsistências no resumo materializado (corra 'reconstruir'):")
+        for p in problemas[:20]:
+            print(f"- {p}")
+        return 1
+    print("✅ Resumo de notas e médias consistentes.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motor de boletins")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir", help="recalcula resumo_notas e medias_alunos").set_defaults(
+        func=_cmd_reconstruir)
+    sub.add_parser("verificar-resumos", help="confere o resumo materializado com as notas").set_defaults(
+        func=_cmd_verificar_resumos)
+    p = sub.add_parser("verificar", help="compara o motor SQL com o algoritmo original em dados aleatórios")
+    p.add_argument("--alunos", type=int, default=300)
+    p.add_argument("--seed", type=int)
+    p.set_defaults(func=_cmd_verificar)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+
+import banco_do_sistema
+
+# -------------------------------
+# Cache de dados de referência (disciplinas, vagas, professores)
+# -------------------------------
+# Estas tabelas mudam poucas vezes por ano mas são lidas a cada lançamento de
+# nota, presença e inscrição. A cache guarda o resultado de cada leitura junto
+# com a versão da tabela em que foi lido, e só o usa enquanto essa versão for
+# a atual. Para saber se a versão mudou:
+#   1. PRAGMA data_version numa conexão sentinela (só lê): não muda enquanto
+#      nenhuma outra conexão, deste ou de outro processo, fizer commit;
+#   2. se mudou, lê versoes_tabelas (mantida por triggers, migração 7) para
+#      descartar só as tabelas que foram de facto alteradas.
+# As escritas feitas pelos modelos invalidam também explicitamente, o que
+# cobre o caso de intervalo_verificacao > 0.
+
+
+class CacheReferencia:
+    def __init__(self, db_manager, intervalo_verificacao=0.0):
+        self.db_manager = db_manager
+        self.intervalo_verificacao = intervalo_verificacao
+        self.ativa = True
+        self._lock = threading.Lock()
+        self._sentinela = None
+        self._data_version = None
+        self._ultima_verificacao = 0.0
+        self._versoes = {t: -1 for t in banco_do_sistema.TABELAS_VERSIONADAS}
+        self._dados = {t: {} for t in banco_do_sistema.TABELAS_VERSIONADAS}  # tabela -> {chave: (versão, valor)}
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.mudancas_detetadas = 0
+
+    def _verificar(self):
+        """Atualiza self._versoes se houve commits desde a última verificação (com o lock)."""
+        agora = time.monotonic()
+        if self._data_version is not None and agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return
+        self._ultima_verificacao = agora
+        if self._sentinela is None:
+            self._sentinela = banco_do_sistema.conectar(self.db_manager.db_name, check_same_thread=False)
+        data_version = self._sentinela.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        for tabela, versao in self._sentinela.execute("SELECT tabela, versao FROM versoes_tabelas"):
+            if tabela in self._versoes and self._versoes[tabela] != versao:
+                if self._versoes[tabela] != -1:
+                    self.mudancas_detetadas += 1
+                self._versoes[tabela] = versao
+
+    def obter(self, tabela, chave, carregar):
+        """
+        Valor em cache para (tabela, chave) ou, se não houver ou estiver desatualizado,
+        carregar(conn) lido na mesma transação que a versão da tabela.
+        """
+        if self.ativa:
+            try:
+                with self._lock:
+                    self._verificar()
+                    entrada = self._dados[tabela].get(chave)
+                    if entrada is not None and entrada[0] == self._versoes[tabela]:
+                        self.acertos += 1
+                        return entrada[1]
+                    self.falhas += 1
+            except sqlite3.OperationalError:
+                # Banco sem a migração 7: funciona sem cache
+                self.ativa = False
+
+        with self.db_manager.transacao() as conn:
+            versao = None
+            if self.ativa:
+                versao = conn.execute("SELECT versao FROM versoes_tabelas WHERE tabela=?", (tabela,)).fetchone()[0]
+            valor = carregar(conn)
+        if versao is not None:
+            with self._lock:
+                self._dados[tabela][chave] = (versao, valor)
+        return valor
+
+    def invalidar(self, tabela=None):
+        with self._lock:
+            for t in ([tabela] if tabela else list(self._dados)):
+                self._dados[t].clear()
+            # Força a releitura das versões no próximo obter
+            self._data_version = None
+            self.invalidacoes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "ativa": self.ativa,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / total, 3) if total else None,
+                "invalidacoes": self.invalidacoes,
+                "mudancas_detetadas": self.mudancas_detetadas,
+                "entradas": {t: len(d) for t, d in self._dados.items()},
+            }
+
+    def fechar(self):
+        with self._lock:
+            if self._sentinela is not None:
+                self._sentinela.close()
+                self._sentinela = None
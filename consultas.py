@@ -0,0 +1,112 @@
+from collections import namedtuple
+from functools import lru_cache, partial
+
+# -------------------------------
+# Registo de consultas e tipos de linha
+# -------------------------------
+# Cada consulta dos modelos tem um nome, SQL com as colunas explícitas (nunca
+# SELECT *) e o tipo de linha que devolve. O texto do SQL é sempre o mesmo
+# objeto, por isso cada conexão o compila uma vez e depois reutiliza-o da sua
+# cache de statements (cached_statements, ver banco_do_sistema.PoolConexoes).
+#
+# As linhas são namedtuples: sem __dict__ (__slots__ vazio), com acesso por
+# nome e ainda compatíveis com quem as lê por posição. São construídas com
+# tuple.__new__ diretamente, sem passar pelo __new__ gerado em Python; como as
+# colunas do SQL são fixas, o número de campos bate sempre certo.
+
+# Listagens (uma linha por registo, como aparecem nos ecrãs)
+AlunoLinha = namedtuple("AlunoLinha", "id nome turma curso")
+ProfessorLinha = namedtuple("ProfessorLinha", "id nome especialidade")
+DisciplinaLinha = namedtuple("DisciplinaLinha", "id nome curso classe")
+MatriculaLinha = namedtuple("MatriculaLinha", "id aluno curso ano_letivo")
+NotaLinha = namedtuple("NotaLinha", "id aluno disciplina trimestre nota")
+PresencaLinha = namedtuple("PresencaLinha", "id aluno disciplina data presente")
+FaltasLinha = namedtuple("FaltasLinha", "aluno_id nome curso turma aulas faltas taxa")
+ResumoPresencaLinha = namedtuple("ResumoPresencaLinha", "inicio disciplina presencas faltas")
+
+# Fichas (o registo completo)
+AlunoFicha = namedtuple("AlunoFicha", "id nome data_nascimento genero bairro numero_bilhete turma curso")
+ProfessorFicha = namedtuple("ProfessorFicha", "id nome especialidade telefone email")
+
+# nome -> (select sem WHERE/ORDER BY, coluna da chave, tipo), para iterar_paginado
+LISTAGENS = {
+    "Aluno.iterar": ("SELECT id, nome, turma, curso FROM alunos", "id", AlunoLinha),
+    "Professor.iterar": ("SELECT id, nome, especialidade FROM professores", "id", ProfessorLinha),
+    "Disciplina.iterar": ("SELECT id, nome, curso, classe FROM disciplinas", "id", DisciplinaLinha),
+    "Matricula.iterar": ("""
+        SELECT m.id, a.nome, m.curso, m.ano_letivo
+        FROM matriculas m
+        JOIN alunos a ON m.aluno_id = a.id
+    """, "m.id", MatriculaLinha),
+    "Nota.iterar": ("""
+        SELECT n.id, a.nome, d.nome, n.trimestre, n.nota
+        FROM notas n
+        JOIN alunos a ON n.aluno_id = a.id
+        JOIN disciplinas d ON n.disciplina_id = d.id
+    """, "n.id", NotaLinha),
+    "Presenca.iterar": ("""
+        SELECT p.id, a.nome, d.nome, p.data, p.presente
+        FROM presencas p
+        JOIN alunos a ON p.aluno_id = a.id
+        JOIN disciplinas d ON p.disciplina_id = d.id
+    """, "p.id", PresencaLinha),
+}
+
+# nome -> (sql, tipo, parâmetros de exemplo ou None). As que têm exemplo entram
+# em CONSULTAS_QUENTES e são verificadas por 'banco_do_sistema.py verificar-planos'.
+CONSULTAS = {
+    "Aluno.obter_por_id": ("""
+        SELECT id, nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso
+        FROM alunos WHERE id=?
+    """, AlunoFicha, (1,)),
+    "Aluno.obter_por_bilhete": ("""
+        SELECT id, nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso
+        FROM alunos WHERE numero_bilhete=?
+    """, AlunoFicha, ("x",)),
+    "Aluno.pesquisar": ("""
+        SELECT a.id, a.nome, a.turma, a.curso
+        FROM alunos_fts
+        JOIN alunos a ON a.id = alunos_fts.rowid
+        WHERE alunos_fts MATCH ?
+        ORDER BY bm25(alunos_fts, 10.0, 1.0, 5.0, 2.0, 1.0)
+        LIMIT ?
+    """, AlunoLinha, None),
+    "Professor.obter_por_id": (
+        "SELECT id, nome, especialidade, telefone, email FROM professores WHERE id=?", ProfessorFicha, (1,)),
+    "Professor.todos": (
+        "SELECT id, nome, especialidade FROM professores ORDER BY id", ProfessorLinha, None),
+    "Professor.pesquisar": ("""
+        SELECT p.id, p.nome, p.especialidade
+        FROM professores_fts
+        JOIN professores p ON p.id = professores_fts.rowid
+        WHERE professores_fts MATCH ?
+        ORDER BY bm25(professores_fts, 10.0, 3.0, 1.0)
+        LIMIT ?
+    """, ProfessorLinha, None),
+    "Disciplina.todas": (
+        "SELECT id, nome, curso, classe FROM disciplinas ORDER BY id", DisciplinaLinha, None),
+    "Disciplina.por_curso": (
+        "SELECT id, nome, curso, classe FROM disciplinas WHERE curso=? ORDER BY classe, id", DisciplinaLinha,
+        ("Informatica",)),
+}
+
+CONSULTAS_QUENTES = {nome: (sql, exemplo) for nome, (sql, _, exemplo) in CONSULTAS.items() if exemplo is not None}
+
+
+@lru_cache(maxsize=None)
+def construtor(tipo):
+    """Função linha -> tipo, sem o __new__ em Python do namedtuple."""
+    return partial(tuple.__new__, tipo)
+
+
+def um(conn, nome, parametros=()):
+    """Primeira linha da consulta `nome` como o seu tipo, ou None."""
+    sql, tipo, _ = CONSULTAS[nome]
+    row = conn.execute(sql, parametros).fetchone()
+    return None if row is None else tuple.__new__(tipo, row)
+
+
+def todos(conn, nome, parametros=()):
+    """Todas as linhas da consulta `nome` como o seu tipo."""
+    sql, tipo, _ = CONSULTAS[nome]
+    return list(map(construtor(tipo), conn.execute(sql, parametros)))
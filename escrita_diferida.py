@@ -0,0 +1,203 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import banco_do_sistema
+
+# -------------------------------
+# Escrita diferida com group commit
+# -------------------------------
+# Os lançamentos de notas e presenças chegam uma linha de cada vez e cada
+# commit custa um fsync e uma passagem pelo lock de escrita. Com a escrita
+# diferida ligada, cada escrita vira uma operação numa fila limitada; uma
+# thread escritora junta as que estiverem na fila (até MAX_LOTE linhas) e
+# grava-as todas numa só transação. Enquanto um lote faz commit, o seguinte vai
+# enchendo, por isso quanto mais lento o fsync maiores os lotes. INTERVALO_MS
+# > 0 faz o escritor esperar ainda esse tempo por mais linhas antes do commit:
+# só compensa com muitas escritas que não esperam pela confirmação (com quem
+# espera, cada lote atrasa-se esse tempo; ver benchmarks/escrita_diferida.py).
+#
+# - Durabilidade: submeter() devolve um Future que só termina depois do commit
+#   do lote (resultado da operação ou a exceção dela). Os callbacks correm na
+#   thread escritora, por isso devem ser rápidos.
+# - Não esperar pelo Future dentro de uma transação de escrita do pool: o
+#   escritor fica à espera do lock que ela tem e ela à espera dele. Quem
+#   precisa do resultado usa DatabaseManager.escrever, que nesse caso grava
+#   na própria transação.
+# - Pressão de volta: com a fila cheia, submeter() espera até ESPERA_FILA
+#   segundos e depois levanta TimeoutError.
+# - Encerramento: fechar() (chamado por DatabaseManager.fechar e à saída do
+#   processo) grava tudo o que estiver na fila antes de parar.
+# - Uma operação que falhe (por exemplo, aluno inexistente) não desfaz as
+#   outras do lote: o lote é repetido com um SAVEPOINT por operação.
+
+MAX_FILA = 10000
+MAX_LOTE = 500
+INTERVALO_MS = 0
+ESPERA_FILA = 5.0
+
+_PARAR = object()
+
+
+class EscritaDiferida:
+    def __init__(self, db_manager, max_fila=MAX_FILA, max_lote=MAX_LOTE, intervalo_ms=INTERVALO_MS,
+                 espera_fila=ESPERA_FILA):
+        self.db_manager = db_manager
+        self.max_lote = max_lote
+        self.intervalo = intervalo_ms / 1000
+        self.espera_fila = espera_fila
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._lock = threading.Lock()
+        self._sem_submissoes = threading.Condition(self._lock)
+        self._a_submeter = 0  # submeter() a meio do put; fechar() espera por elas
+        self._fechada = False
+        self.submetidas = 0
+        self.gravadas = 0
+        self.falhadas = 0
+        self.lotes = 0
+        self.maior_lote = 0
+        self.esperas_fila_cheia = 0
+        # daemon: à saída, quem garante o esvaziamento é o atexit, não o join do interpretador
+        self._thread = threading.Thread(target=self._escritor, name="escrita-diferida", daemon=True)
+        self._thread.start()
+        atexit.register(self.fechar)
+
+    # ---- lado de quem escreve ----
+    def submeter(self, operacao, callback=None):
+        """
+        Põe operacao(conn) na fila; devolve um Future que termina depois do commit.
+        callback(futuro), se indicado, corre quando a escrita estiver gravada (ou falhar).
+        """
+        futuro = Future()
+        if callback is not None:
+            futuro.add_done_callback(callback)
+        with self._lock:
+            if self._fechada:
+                raise sqlite3.ProgrammingError("Escrita diferida fechada.")
+            self._a_submeter += 1
+        try:
+            try:
+                self._fila.put_nowait((operacao, futuro))
+            except queue.Full:
+                with self._lock:
+                    self.esperas_fila_cheia += 1
+                try:
+                    self._fila.put((operacao, futuro), timeout=self.espera_fila)
+                except queue.Full:
+                    raise TimeoutError("Fila de escrita diferida cheia.")
+            with self._lock:
+                self.submetidas += 1
+        finally:
+            with self._lock:
+                self._a_submeter -= 1
+                self._sem_submissoes.notify_all()
+        return futuro
+
+    def esvaziar(self, timeout=None):
+        """Espera até estar gravado tudo o que foi submetido antes desta chamada."""
+        self.submeter(None).result(timeout)
+
+    def fechar(self):
+        """Deixa de aceitar escritas, grava o que está na fila e para a thread escritora."""
+        with self._lock:
+            if self._fechada:
+                return
+            self._fechada = True
+            # _PARAR tem de ser o último item da fila
+            while self._a_submeter:
+                self._sem_submissoes.wait()
+        atexit.unregister(self.fechar)
+        self._fila.put(_PARAR)
+        self._thread.join()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "pendentes": self._fila.qsize(),
+                "submetidas": self.submetidas,
+                "gravadas": self.gravadas,
+                "falhadas": self.falhadas,
+                "lotes": self.lotes,
+                "media_lote": round(self.gravadas / self.lotes, 1) if self.lotes else 0.0,
+                "maior_lote": self.maior_lote,
+                "esperas_fila_cheia": self.esperas_fila_cheia,
+            }
+
+    # ---- thread escritora ----
+    def _escritor(self):
+        parar = False
+        while not parar:
+            item = self._fila.get()
+            if item is _PARAR:
+                break
+            lote = [item]
+            prazo = time.monotonic() + self.intervalo
+            while len(lote) < self.max_lote:
+                restante = prazo - time.monotonic()
+                try:
+                    item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                lote.append(item)
+            self._gravar(lote)
+
+    def _gravar(self, lote):
+        # Futures cancelados por quem submeteu já não são gravados
+        lote = [(operacao, futuro) for operacao, futuro in lote if futuro.set_running_or_notify_cancel()]
+        try:
+            try:
+                resultados = banco_do_sistema.com_retentativas(lambda: self._executar(lote, isolar=False))
+            except Exception:
+                resultados = banco_do_sistema.com_retentativas(lambda: self._executar(lote, isolar=True))
+        except Exception as e:
+            # Falhou o lote inteiro (disco, lock esgotado...): ninguém fica à espera para sempre
+            resultados = [(False, e)] * len(lote)
+
+        escritas = sum(1 for operacao, _ in lote if operacao is not None)
+        falhadas = sum(1 for ok, _ in resultados if not ok)
+        with self._lock:
+            self.lotes += 1
+            self.maior_lote = max(self.maior_lote, escritas)
+            self.gravadas += escritas - falhadas
+            self.falhadas += falhadas
+        for (_, futuro), (ok, valor) in zip(lote, resultados):
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+    def _executar(self, lote, isolar):
+        """Corre as operações numa transação. Sem isolar, a primeira exceção desfaz o lote todo."""
+        resultados = []
+        with self.db_manager.transacao("IMMEDIATE") as conn:
+            for operacao, _ in lote:
+                if operacao is None:  # marca de esvaziar()
+                    resultados.append((True, None))
+                elif not isolar:
+                    resultados.append((True, operacao(conn)))
+                else:
+                    conn.execute("SAVEPOINT operacao")
+                    try:
+                        resultados.append((True, operacao(conn)))
+                    except sqlite3.OperationalError:
+                        raise
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO operacao")
+                        resultados.append((False, e))
+                    conn.execute("RELEASE operacao")
+        return resultados
+
+
+def do_ambiente(db_manager):
+    """EscritaDiferida se BANCO_ESCOLAR_ESCRITA_DIFERIDA estiver ligada, ou None."""
+    valor = os.environ.get("BANCO_ESCOLAR_ESCRITA_DIFERIDA", "").strip().lower()
+    if valor not in ("1", "sim", "true"):
+        return None
+    return EscritaDiferida(db_manager)
@@ -0,0 +1,304 @@
+import argparse
+import functools
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import banco_do_sistema
+
+# -------------------------------
+# Estatísticas da escola (pandas/NumPy)
+# -------------------------------
+# Uma leitura em bloco de alunos, notas e presenças para DataFrames e todas as
+# agregações vetorizadas a partir daí: não há uma consulta por aluno nem por
+# turma. A aprovação segue a regra do boletim (boletim.py): média por
+# trimestre, média da disciplina = média das médias trimestrais (arredondada),
+# média geral = média das disciplinas (arredondada), aprovado se ≥ 10.
+
+APROVACAO = 10
+LIMIAR_FALTAS = 0.25   # alunos em risco: faltaram a 25% ou mais das aulas...
+MIN_AULAS = 10         # ...com pelo menos este número de aulas registadas
+NIVEIS = ("curso", "turma", "disciplina", "trimestre")
+
+
+@dataclass
+class Dados:
+    alunos: pd.DataFrame      # índice aluno_id: nome, curso, turma
+    notas: pd.DataFrame       # aluno_id, disciplina, trimestre, nota, curso, turma
+    presencas: pd.DataFrame   # aluno_id, presente, curso, turma
+    calculados: dict = field(default_factory=dict, repr=False)
+
+
+def _memorizado(funcao):
+    # As médias e a situação servem vários agregados: calculam-se uma vez por Dados
+    @functools.wraps(funcao)
+    def envolvida(dados):
+        if funcao.__name__ not in dados.calculados:
+            dados.calculados[funcao.__name__] = funcao(dados)
+        return dados.calculados[funcao.__name__]
+    return envolvida
+
+
+def _categorias(valores):
+    return pd.Categorical(valores) if len(valores) else pd.Categorical([], categories=[])
+
+
+def carregar(db_manager):
+    """Lê alunos, notas e presenças numa só transação (mesmo instantâneo) e monta os DataFrames."""
+    with db_manager.transacao() as conn:
+        alunos = conn.execute("SELECT id, nome, curso, turma FROM alunos").fetchall()
+        disciplinas = conn.execute("SELECT id, nome FROM disciplinas").fetchall()
+        notas = conn.execute(
+            "SELECT aluno_id, disciplina_id, trimestre, nota FROM notas WHERE nota IS NOT NULL").fetchall()
+        presencas = conn.execute("SELECT aluno_id, presente FROM presencas").fetchall()
+
+    # Arrays estruturados: o NumPy converte a lista de tuplos de uma vez, sem zip(*linhas) em Python
+    alunos = np.array(alunos, dtype=[("id", np.int64), ("nome", object), ("curso", object), ("turma", object)])
+    quadro_alunos = pd.DataFrame({"nome": alunos["nome"], "curso": _categorias(alunos["curso"]),
+                                  "turma": _categorias(alunos["turma"])},
+                                 index=pd.Index(alunos["id"], name="aluno_id"))
+
+    notas = np.array(notas, dtype=[("aluno_id", np.int64), ("disciplina_id", np.int64), ("trimestre", object),
+                                   ("nota", np.float64)])
+    # Como no boletim, as disciplinas contam pelo nome e notas de disciplinas apagadas ficam de fora
+    nomes_disciplinas = pd.Series(dict(disciplinas), dtype=object).reindex(notas["disciplina_id"]).to_numpy()
+    validas = pd.notna(nomes_disciplinas)
+    quadro_notas = pd.DataFrame({
+        "aluno_id": notas["aluno_id"][validas],
+        "disciplina": _categorias(nomes_disciplinas[validas]),
+        "trimestre": _categorias(notas["trimestre"][validas]),
+        "nota": notas["nota"][validas],
+    })
+
+    presencas = np.array(presencas, dtype=[("aluno_id", np.int64), ("presente", bool)])
+    quadro_presencas = pd.DataFrame({"aluno_id": presencas["aluno_id"], "presente": presencas["presente"]})
+
+    for quadro in (quadro_notas, quadro_presencas):
+        for coluna in ("curso", "turma"):
+            quadro[coluna] = quadro_alunos[coluna].reindex(quadro["aluno_id"]).array
+    return Dados(quadro_alunos, quadro_notas, quadro_presencas)
+
+
+# -------------------------------
+# Médias (mesma regra do boletim)
+# -------------------------------
+def _arredondar(serie):
+    # round() do Python, como no boletim: np.round pode diferir nos casos .xx5
+    return pd.Series([round(v, 2) for v in serie.to_numpy().tolist()], index=serie.index, dtype=np.float64)
+
+
+@_memorizado
+def medias_por_trimestre(dados):
+    """Média de cada aluno por disciplina e trimestre (Série com índice aluno_id, disciplina, trimestre)."""
+    return dados.notas.groupby(["aluno_id", "disciplina", "trimestre"], observed=True)["nota"].mean()
+
+
+@_memorizado
+def medias_por_disciplina(dados):
+    """Média final de cada aluno por disciplina: média das médias trimestrais, arredondada."""
+    return _arredondar(medias_por_trimestre(dados).groupby(level=["aluno_id", "disciplina"], observed=True).mean())
+
+
+@_memorizado
+def medias_gerais(dados):
+    """Média geral de cada aluno com notas (a do boletim)."""
+    por_disciplina = medias_por_disciplina(dados)
+    # Soma simples pela ordem das disciplinas, como boletim._fechar: a soma compensada
+    # do pandas muda o último bit e, com ele, o arredondamento de algumas médias
+    alunos = por_disciplina.index.get_level_values("aluno_id").to_numpy()
+    valores = por_disciplina.to_numpy().tolist()
+    inicios = np.flatnonzero(np.r_[True, alunos[1:] != alunos[:-1]]) if len(alunos) else np.array([], np.int64)
+    limites = inicios.tolist() + [len(valores)]
+    medias = [round(sum(valores[i:j]) / (j - i), 2) for i, j in zip(limites, limites[1:])]
+    return pd.Series(medias, index=pd.Index(alunos[inicios], name="aluno_id"), dtype=np.float64)
+
+
+@_memorizado
+def faltas_por_aluno(dados):
+    p = dados.presencas
+    quadro = p.groupby("aluno_id").agg(aulas=("presente", "size"), presencas=("presente", "sum"))
+    quadro["faltas"] = quadro["aulas"] - quadro["presencas"]
+    quadro["taxa_faltas"] = quadro["faltas"] / quadro["aulas"]
+    return quadro[["aulas", "faltas", "taxa_faltas"]]
+
+
+@_memorizado
+def situacao_alunos(dados):
+    """Um registo por aluno: curso, turma, média geral, aprovado, aulas, faltas e taxa de faltas."""
+    quadro = dados.alunos.join(medias_gerais(dados).rename("media_geral")).join(faltas_por_aluno(dados))
+    quadro["aprovado"] = quadro["media_geral"] >= APROVACAO
+    quadro[["aulas", "faltas"]] = quadro[["aulas", "faltas"]].fillna(0).astype(np.int64)
+    return quadro
+
+
+# -------------------------------
+# Agregados por curso, turma, disciplina e trimestre
+# -------------------------------
+def _chaves(nivel):
+    if nivel not in NIVEIS:
+        raise ValueError(f"nível inválido: {nivel} (use {', '.join(NIVEIS)})")
+    # Uma turma só tem sentido dentro do curso
+    return ["curso", "turma"] if nivel == "turma" else [nivel]
+
+
+def aprovacao(dados, nivel="curso"):
+    """
+    Alunos aprovados/reprovados por nível. Em curso e turma conta a média geral;
+    em disciplina a média final da disciplina; em trimestre a média das disciplinas nesse trimestre.
+    """
+    if nivel == "disciplina":
+        medias = medias_por_disciplina(dados).reset_index(name="media")
+    elif nivel == "trimestre":
+        medias = (medias_por_trimestre(dados).groupby(level=["aluno_id", "trimestre"], observed=True).mean()
+                  .reset_index(name="media"))
+    else:
+        _chaves(nivel)
+        medias = situacao_alunos(dados).dropna(subset=["media_geral"]).rename(columns={"media_geral": "media"})
+    medias["aprovado"] = medias["media"] >= APROVACAO
+    quadro = medias.groupby(_chaves(nivel), observed=True).agg(
+        alunos=("aprovado", "size"), aprovados=("aprovado", "sum"), media=("media", "mean"))
+    quadro["reprovados"] = quadro["alunos"] - quadro["aprovados"]
+    quadro["taxa_aprovacao"] = quadro["aprovados"] / quadro["alunos"]
+    return quadro[["alunos", "aprovados", "reprovados", "taxa_aprovacao", "media"]]
+
+
+def distribuicao(dados, nivel="curso", percentis=(0.1, 0.25, 0.5, 0.75, 0.9)):
+    """Contagem, média, desvio, mínimo, percentis e máximo das notas lançadas por nível."""
+    grupos = dados.notas.groupby(_chaves(nivel), observed=True)["nota"]
+    quadro = grupos.agg(["count", "mean", "std", "min", "max"])
+    quantis = grupos.quantile(list(percentis)).unstack()
+    quantis.columns = [f"p{int(p * 100)}" for p in percentis]
+    quadro = quadro.join(quantis)
+    quadro["positivas"] = (dados.notas["nota"] >= APROVACAO).groupby(
+        [dados.notas[c] for c in _chaves(nivel)], observed=True).mean()
+    return quadro[["count", "mean", "std", "min"] + list(quantis.columns) + ["max", "positivas"]]
+
+
+def histograma(dados, nivel="curso", largura=2):
+    """Número de notas por intervalo [0, largura), [largura, 2*largura), ... (o 20 fica no último)."""
+    intervalos = int(np.ceil(20 / largura))
+    classes = np.minimum((dados.notas["nota"].to_numpy() // largura).astype(np.int64), intervalos - 1)
+    rotulos = [f"{i * largura:g}-{min((i + 1) * largura, 20):g}" for i in range(intervalos)]
+    chaves = [dados.notas[c] for c in _chaves(nivel)]
+    quadro = pd.Series(classes).groupby(chaves + [classes], observed=True).size().unstack(fill_value=0)
+    quadro = quadro.reindex(columns=range(intervalos), fill_value=0)
+    quadro.columns = rotulos
+    return quadro
+
+
+def faltas_por_turma(dados):
+    """Aulas registadas, faltas e taxa de faltas por curso e turma."""
+    p = dados.presencas
+    quadro = p.groupby(["curso", "turma"], observed=True).agg(
+        alunos=("aluno_id", "nunique"), aulas=("presente", "size"), presencas=("presente", "sum"))
+    quadro["faltas"] = quadro["aulas"] - quadro["presencas"]
+    quadro["taxa_faltas"] = quadro["faltas"] / quadro["aulas"]
+    return quadro[["alunos", "aulas", "faltas", "taxa_faltas"]].sort_values("taxa_faltas", ascending=False)
+
+
+def alunos_em_risco(dados, limiar=LIMIAR_FALTAS, min_aulas=MIN_AULAS):
+    """Alunos com taxa de faltas ≥ limiar (e aulas suficientes), da maior para a menor taxa."""
+    s = situacao_alunos(dados)
+    risco = s[(s["taxa_faltas"] >= limiar) & (s["aulas"] >= min_aulas)]
+    return risco[["nome", "curso", "turma", "aulas", "faltas", "taxa_faltas", "media_geral"]].sort_values(
+        ["taxa_faltas", "media_geral"], ascending=[False, True])
+
+
+def correlacao_faltas_notas(dados):
+    """Correlação de Pearson entre taxa de faltas e média geral, na escola e por curso."""
+    s = situacao_alunos(dados).dropna(subset=["media_geral", "taxa_faltas"])
+    resultado = {"Escola": s["taxa_faltas"].corr(s["media_geral"])}
+    for curso, grupo in s.groupby("curso", observed=True):
+        resultado[curso] = grupo["taxa_faltas"].corr(grupo["media_geral"])
+    return pd.Series(resultado, name="correlacao")
+
+
+# -------------------------------
+# Relatório na consola
+# -------------------------------
+def imprimir_relatorio(dados, limiar=LIMIAR_FALTAS, min_aulas=MIN_AULAS, max_risco=20):
+    if dados.notas.empty and dados.presencas.empty:
+        print("⚠️ Ainda não há notas nem presenças registadas.")
+        return
+    pd.set_option("display.width", 120)
+    formato = {"taxa_aprovacao": "{:.1%}".format, "taxa_faltas": "{:.1%}".format, "positivas": "{:.1%}".format}
+
+    def tabela(quadro):
+        if quadro.empty:
+            return "(sem registos)"
+        return quadro.to_string(formatters={c: f for c, f in formato.items() if c in quadro.columns},
+                                float_format="{:.2f}".format)
+
+    print(f"\n📊 ESTATÍSTICAS DA ESCOLA — {len(dados.alunos)} alunos, {len(dados.notas)} notas, "
+          f"{len(dados.presencas)} presenças")
+    print("\n🎓 Aprovação por curso e turma (média geral ≥ 10):")
+    print(tabela(aprovacao(dados, "turma")))
+    print("\n📚 Aprovação por disciplina:")
+    print(tabela(aprovacao(dados, "disciplina")))
+    print("\n🗓️ Aprovação por trimestre:")
+    print(tabela(aprovacao(dados, "trimestre")))
+    print("\n📈 Distribuição das notas por curso:")
+    print(tabela(distribuicao(dados, "curso")))
+    print("\n📊 Histograma das notas por curso:")
+    print(tabela(histograma(dados, "curso")))
+    print("\n🚫 Faltas por turma:")
+    print(tabela(faltas_por_turma(dados)))
+    risco = alunos_em_risco(dados, limiar, min_aulas)
+    print(f"\n⚠️ Alunos em risco (faltas ≥ {limiar:.0%}, mínimo {min_aulas} aulas): {len(risco)}")
+    if not risco.empty:
+        print(tabela(risco.head(max_risco)))
+        if len(risco) > max_risco:
+            print(f"... e mais {len(risco) - max_risco}.")
+    print("\n🔗 Correlação entre taxa de faltas e média geral:")
+    for nome, valor in correlacao_faltas_notas(dados).items():
+        print(f"- {nome}: {'—' if pd.isna(valor) else f'{valor:+.3f}'}")
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+def verificar(db_manager, dados):
+    """Compara as médias gerais vetorizadas com as do motor de boletins; devolve as divergências."""
+    import boletim
+    calculadas = medias_gerais(dados).to_dict()
+    divergencias = []
+    for b in boletim.gerar_boletins(db_manager):
+        if calculadas.pop(b.aluno_id, None) != b.media_geral:
+            divergencias.append(b.aluno_id)
+    return divergencias + list(calculadas)
+
+
+def main(argv=None):
+    from sistema import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Estatísticas da escola")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_FALTAS, help="taxa de faltas dos alunos em risco")
+    parser.add_argument("--min-aulas", type=int, default=MIN_AULAS)
+    parser.add_argument("--verificar", action="store_true", help="confere as médias com o motor de boletins")
+    args = parser.parse_args(argv)
+
+    banco_do_sistema.criar_tabelas(args.db)
+    db = DatabaseManager(args.db)
+    try:
+        inicio = time.perf_counter()
+        dados = carregar(db)
+        leitura = time.perf_counter() - inicio
+        imprimir_relatorio(dados, args.limiar, args.min_aulas)
+        print(f"\n⏱️ Leitura {leitura:.2f}s, total {time.perf_counter() - inicio:.2f}s")
+        if args.verificar:
+            divergencias = verificar(db, dados)
+            if divergencias:
+                print(f"❌ {len(divergencias)} médias diferentes do boletim (ex.: alunos {divergencias[:10]})")
+                return 1
+            print("✅ Médias iguais às do motor de boletins.")
+    finally:
+        db.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
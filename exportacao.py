@@ -0,0 +1,323 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import banco_do_sistema
+from sistema import DatabaseManager
+
+# pyarrow e numpy são opcionais: Parquet se houver pyarrow, senão .npy, senão CSV
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# -------------------------------
+# Exportação colunar (notas, presenças, matrículas, alunos)
+# -------------------------------
+# Cada execução exporta só as linhas com id acima do último exportado, em
+# blocos lidos por keyset; cada bloco vira uma "parte" (um ficheiro .parquet,
+# uma pasta de .npy ou um .csv). As colunas categóricas (curso, turma,
+# trimestre, ...) são gravadas como códigos inteiros de um dicionário que é
+# guardado no manifesto e só cresce, por isso os códigos são estáveis entre
+# partes e entre execuções.
+#
+# Só entram linhas novas: alterações a linhas já exportadas (ex.: presença
+# corrigida pelo upsert, aluno atualizado) só aparecem com --completo.
+
+MANIFESTO = "manifesto.json"
+TAMANHO_BLOCO = 50000
+
+# tabela -> (SELECT sem WHERE, chave do keyset, [(coluna, tipo)])
+# tipos: int, float, bool, str, cat (codificada por dicionário)
+TABELAS = {
+    "notas": ("""
+        SELECT n.id, n.aluno_id, n.disciplina_id, d.nome, a.curso, a.turma, n.trimestre, n.nota
+        FROM notas n
+        LEFT JOIN disciplinas d ON d.id = n.disciplina_id
+        LEFT JOIN alunos a ON a.id = n.aluno_id
+    """, "n.id", [("id", "int"), ("aluno_id", "int"), ("disciplina_id", "int"), ("disciplina", "cat"),
+                  ("curso", "cat"), ("turma", "cat"), ("trimestre", "cat"), ("nota", "float")]),
+    "presencas": ("""
+        SELECT p.id, p.aluno_id, p.disciplina_id, a.curso, a.turma, p.data, p.presente
+        FROM presencas p
+        LEFT JOIN alunos a ON a.id = p.aluno_id
+    """, "p.id", [("id", "int"), ("aluno_id", "int"), ("disciplina_id", "int"), ("curso", "cat"),
+                  ("turma", "cat"), ("data", "cat"), ("presente", "bool")]),
+    "matriculas": ("SELECT id, aluno_id, curso, ano_letivo FROM matriculas", "id",
+                   [("id", "int"), ("aluno_id", "int"), ("curso", "cat"), ("ano_letivo", "cat")]),
+    "alunos": ("SELECT id, nome, data_nascimento, genero, bairro, turma, curso FROM alunos", "id",
+               [("id", "int"), ("nome", "str"), ("data_nascimento", "str"), ("genero", "cat"),
+                ("bairro", "cat"), ("turma", "cat"), ("curso", "cat")]),
+}
+
+
+def formato_disponivel():
+    if pa is not None:
+        return "parquet"
+    if np is not None:
+        return "npy"
+    return "csv"
+
+
+# -------------------------------
+# Manifesto
+# -------------------------------
+def ler_manifesto(destino):
+    caminho = os.path.join(destino, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"tabelas": {}}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_manifesto(destino, manifesto):
+    # Escrever ao lado e trocar: um manifesto meio escrito nunca é lido
+    caminho = os.path.join(destino, MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+
+
+# -------------------------------
+# Colunas
+# -------------------------------
+def _codificar(valores, dicionario):
+    """Códigos inteiros de `valores` no dicionário (lista), que cresce com valores novos. None -> -1."""
+    posicoes = {v: i for i, v in enumerate(dicionario)}
+    codigos = []
+    for v in valores:
+        if v is None:
+            codigos.append(-1)
+            continue
+        codigo = posicoes.get(v)
+        if codigo is None:
+            codigo = posicoes[v] = len(dicionario)
+            dicionario.append(v)
+        codigos.append(codigo)
+    return codigos
+
+
+def _colunas(linhas, esquema, dicionarios):
+    colunas = {}
+    for (nome, tipo), valores in zip(esquema, zip(*linhas)):
+        if tipo == "cat":
+            valores = _codificar(valores, dicionarios.setdefault(nome, []))
+        elif tipo == "bool":
+            valores = [bool(v) for v in valores]
+        colunas[nome] = list(valores)
+    return colunas
+
+
+def _escrever_parquet(caminho, colunas, esquema, dicionarios):
+    arrays = []
+    for nome, tipo in esquema:
+        valores = colunas[nome]
+        if tipo == "cat":
+            indices = pa.array([c if c >= 0 else None for c in valores], pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(dicionarios[nome], pa.string())))
+        else:
+            arrays.append(pa.array(valores, {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+                                             "str": pa.string()}[tipo]))
+    pq.write_table(pa.Table.from_arrays(arrays, names=[n for n, _ in esquema]), caminho, compression="zstd")
+
+
+def _escrever_npy(caminho, colunas, esquema):
+    os.makedirs(caminho, exist_ok=True)
+    for nome, tipo in esquema:
+        valores = colunas[nome]
+        if tipo == "cat":
+            array = np.array(valores, dtype=np.int32)
+        elif tipo == "int":
+            array = np.array([-1 if v is None else v for v in valores], dtype=np.int64)
+        elif tipo == "float":
+            array = np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+        elif tipo == "bool":
+            array = np.array(valores, dtype=np.bool_)
+        else:
+            array = np.array(["" if v is None else str(v) for v in valores], dtype=str)
+        np.save(os.path.join(caminho, f"{nome}.npy"), array)
+
+
+def _escrever_csv(caminho, colunas, esquema):
+    nomes = [n for n, _ in esquema]
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(nomes)
+        writer.writerows(zip(*(colunas[n] for n in nomes)))
+
+
+# -------------------------------
+# Exportação
+# -------------------------------
+def _blocos(db_manager, select, chave, depois, ate, tamanho_bloco):
+    """Blocos de linhas com depois < chave <= ate, por keyset; a conexão volta ao pool entre blocos."""
+    sql = f"{select} WHERE {chave} > ? AND {chave} <= ? ORDER BY {chave} LIMIT ?"
+    while True:
+        with db_manager.conexao() as conn:
+            linhas = conn.execute(sql, (depois, ate, tamanho_bloco)).fetchall()
+        if not linhas:
+            return
+        yield linhas
+        depois = linhas[-1][0]
+
+
+def exportar_tabela(db_manager, destino, tabela, manifesto, formato, tamanho_bloco=TAMANHO_BLOCO):
+    """Exporta as linhas novas de `tabela`; atualiza `manifesto` e devolve quantas linhas escreveu."""
+    select, chave, esquema = TABELAS[tabela]
+    estado = manifesto["tabelas"].setdefault(tabela, {"ultimo_id": 0, "partes": [], "dicionarios": {}})
+    nome_base = chave.split(".")[-1]
+    with db_manager.conexao() as conn:
+        # Limite fixado no início: o que for inserido durante a exportação fica para a próxima
+        ate = conn.execute(f"SELECT COALESCE(MAX({nome_base}), 0) FROM {tabela}").fetchone()[0]
+
+    pasta = os.path.join(destino, tabela)
+    os.makedirs(pasta, exist_ok=True)
+    total = 0
+    for linhas in _blocos(db_manager, select, chave, estado["ultimo_id"], ate, tamanho_bloco):
+        colunas = _colunas(linhas, esquema, estado["dicionarios"])
+        numero = len(estado["partes"]) + 1
+        ficheiro = f"parte-{numero:05d}" + {"parquet": ".parquet", "npy": "", "csv": ".csv"}[formato]
+        caminho = os.path.join(pasta, ficheiro)
+        if formato == "parquet":
+            _escrever_parquet(caminho, colunas, esquema, estado["dicionarios"])
+        elif formato == "npy":
+            _escrever_npy(caminho, colunas, esquema)
+        else:
+            _escrever_csv(caminho, colunas, esquema)
+
+        estado["partes"].append({"ficheiro": f"{tabela}/{ficheiro}", "formato": formato, "linhas": len(linhas),
+                                 "de_id": linhas[0][0], "ate_id": linhas[-1][0]})
+        estado["ultimo_id"] = linhas[-1][0]
+        total += len(linhas)
+        # Manifesto atualizado a cada parte: uma exportação interrompida retoma daqui
+        _gravar_manifesto(destino, manifesto)
+    return total
+
+
+def exportar(db_manager, destino, tabelas=None, formato="auto", completo=False, tamanho_bloco=TAMANHO_BLOCO):
+    """Exporta (incrementalmente) as tabelas pedidas para `destino`. Devolve {tabela: linhas}."""
+    formato = formato_disponivel() if formato == "auto" else formato
+    if formato == "parquet" and pa is None:
+        raise RuntimeError("pyarrow não está instalado")
+    if formato == "npy" and np is None:
+        raise RuntimeError("numpy não está instalado")
+
+    os.makedirs(destino, exist_ok=True)
+    manifesto = ler_manifesto(destino)
+    if completo:
+        for tabela in tabelas or TABELAS:
+            for parte in manifesto["tabelas"].pop(tabela, {}).get("partes", []):
+                _remover(os.path.join(destino, parte["ficheiro"]))
+    manifesto["formato"] = formato
+    relatorio = {}
+    for tabela in tabelas or TABELAS:
+        relatorio[tabela] = exportar_tabela(db_manager, destino, tabela, manifesto, formato, tamanho_bloco)
+    manifesto["exportado_em"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _gravar_manifesto(destino, manifesto)
+    return relatorio
+
+
+def _remover(caminho):
+    if os.path.isdir(caminho):
+        for nome in os.listdir(caminho):
+            os.remove(os.path.join(caminho, nome))
+        os.rmdir(caminho)
+    elif os.path.exists(caminho):
+        os.remove(caminho)
+
+
+# -------------------------------
+# Leitura de volta
+# -------------------------------
+def ler(destino, tabela, decodificar=True):
+    """
+    Junta as partes exportadas de `tabela` num dicionário {coluna: lista}.
+    Com decodificar=True as colunas categóricas voltam a ter os valores originais.
+    """
+    manifesto = ler_manifesto(destino)
+    estado = manifesto["tabelas"].get(tabela)
+    _, _, esquema = TABELAS[tabela]
+    colunas = {nome: [] for nome, _ in esquema}
+    if not estado:
+        return colunas
+    for parte in estado["partes"]:
+        caminho = os.path.join(destino, parte["ficheiro"])
+        if parte["formato"] == "parquet":
+            tabela_arrow = pq.read_table(caminho)
+            for nome, tipo in esquema:
+                coluna = tabela_arrow.column(nome)
+                if tipo == "cat":
+                    coluna = coluna.combine_chunks().indices.fill_null(-1)
+                colunas[nome].extend(coluna.to_pylist())
+        elif parte["formato"] == "npy":
+            for nome, _ in esquema:
+                colunas[nome].extend(np.load(os.path.join(caminho, f"{nome}.npy")).tolist())
+        else:
+            with open(caminho, newline="", encoding="utf-8") as f:
+                leitor = csv.reader(f)
+                next(leitor)
+                for linha in leitor:
+                    for (nome, tipo), valor in zip(esquema, linha):
+                        colunas[nome].append(_do_csv(valor, tipo))
+    if decodificar:
+        for nome, tipo in esquema:
+            if tipo == "cat":
+                dicionario = estado["dicionarios"].get(nome, [])
+                colunas[nome] = [dicionario[c] if c >= 0 else None for c in colunas[nome]]
+    return colunas
+
+
+def _do_csv(valor, tipo):
+    if tipo in ("int", "cat"):
+        return int(valor) if valor != "" else -1
+    if tipo == "float":
+        return float(valor) if valor != "" else None
+    if tipo == "bool":
+        return valor == "True"
+    return valor
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação colunar incremental do banco escolar")
+    parser.add_argument("tabelas", nargs="*", help=f"de entre {', '.join(TABELAS)} (padrão: todas)")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    parser.add_argument("--destino", default="exportacao", help="pasta de saída (padrão: exportacao)")
+    parser.add_argument("--formato", choices=["auto", "parquet", "npy", "csv"], default="auto")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas por parte")
+    parser.add_argument("--completo", action="store_true", help="apaga as partes anteriores e exporta tudo")
+    args = parser.parse_args(argv)
+    desconhecidas = [t for t in args.tabelas if t not in TABELAS]
+    if desconhecidas:
+        parser.error(f"tabelas desconhecidas: {', '.join(desconhecidas)}")
+
+    banco_do_sistema.criar_tabelas(args.db)
+    db = DatabaseManager(args.db)
+    inicio = time.perf_counter()
+    try:
+        relatorio = exportar(db, args.destino, args.tabelas or None, args.formato, args.completo, args.bloco)
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+        return 1
+    finally:
+        db.fechar()
+    formato = ler_manifesto(args.destino).get("formato")
+    print(f"✅ Exportação ({formato}) em {time.perf_counter() - inicio:.2f}s para {args.destino}/:")
+    for tabela, linhas in relatorio.items():
+        print(f"- {tabela}: {linhas} linhas novas" if linhas else f"- {tabela}: nada de novo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
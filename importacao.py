@@ -0,0 +1,483 @@
+import argparse
+import csv
+import json
+import os
+import secrets
+import sqlite3
+import time
+from datetime import date
+
+import admissoes
+import banco_do_sistema
+import senhas
+from sistema import DatabaseManager, Nota, Vagas, validar_idade_e_media
+
+
+# -------------------------------
+# Leitura de ficheiros (CSV ou JSONL)
+# -------------------------------
+def ler_registros(caminho):
+    """Gera dicionários, um por linha, a partir de um ficheiro .csv ou .jsonl."""
+    if caminho.lower().endswith((".jsonl", ".ndjson")):
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if linha:
+                    yield json.loads(linha)
+    else:
+        with open(caminho, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+
+class ArquivoRejeitados:
+    """Escreve as linhas rejeitadas (número da linha, motivo e conteúdo original) num CSV."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._f = None
+        self._writer = None
+        self.total = 0
+
+    def escrever(self, numero_linha, motivo, registro):
+        self.total += 1
+        if self.caminho is None:
+            return
+        if self._f is None:
+            self._f = open(self.caminho, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._f)
+            self._writer.writerow(["linha", "motivo", "registro"])
+        self._writer.writerow([numero_linha, motivo, json.dumps(registro, ensure_ascii=False)])
+
+    def fechar(self):
+        if self._f is not None:
+            self._f.close()
+
+
+# -------------------------------
+# Importação de notas
+# -------------------------------
+def _bilhete(texto):
+    # Bilhetes comparados sem espaços nas pontas e em maiúsculas, dos dois lados
+    return str(texto or "").strip().upper()
+
+
+def _carregar_referencias(db_manager):
+    with db_manager.conexao() as conn:
+        alunos = {r[0] for r in conn.execute("SELECT id FROM alunos")}
+        bilhetes = {_bilhete(b): aid for b, aid in conn.execute(
+            "SELECT numero_bilhete, id FROM alunos WHERE numero_bilhete IS NOT NULL")}
+        disciplinas = set()
+        nomes = {}
+        for did, nome in conn.execute("SELECT id, nome FROM disciplinas"):
+            disciplinas.add(did)
+            chave = (nome or "").strip().lower()
+            # Nome repetido entre cursos é ambíguo: essas só por id
+            nomes[chave] = None if chave in nomes else did
+    return alunos, bilhetes, disciplinas, nomes
+
+
+def _validar_nota(registro, alunos, bilhetes, disciplinas, nomes):
+    """Devolve (tupla_para_insert, None) ou (None, motivo)."""
+    aluno = str(registro.get("aluno_id") or "").strip()
+    if aluno:
+        try:
+            aluno_id = int(aluno)
+        except ValueError:
+            return None, f"aluno_id inválido: {aluno}"
+        if aluno_id not in alunos:
+            return None, f"aluno {aluno_id} não existe"
+    else:
+        bilhete = _bilhete(registro.get("numero_bilhete"))
+        if not bilhete:
+            return None, "falta aluno_id ou numero_bilhete"
+        aluno_id = bilhetes.get(bilhete)
+        if aluno_id is None:
+            return None, f"bilhete {bilhete} não existe"
+
+    disciplina = str(registro.get("disciplina_id") or "").strip()
+    if disciplina:
+        try:
+            disciplina_id = int(disciplina)
+        except ValueError:
+            return None, f"disciplina_id inválido: {disciplina}"
+        if disciplina_id not in disciplinas:
+            return None, f"disciplina {disciplina_id} não existe"
+    else:
+        disciplina = str(registro.get("disciplina") or "").strip()
+        disciplina_id = nomes.get(disciplina.lower())
+        if disciplina_id is None and disciplina.isdigit() and int(disciplina) in disciplinas:
+            disciplina_id = int(disciplina)
+        if disciplina_id is None:
+            return None, f"disciplina desconhecida ou ambígua: {disciplina}"
+
+    texto = str(registro.get("trimestre") or "").strip()
+    if not texto:
+        return None, "trimestre em falta"
+    trimestre = banco_do_sistema.trimestre_canonico(texto)
+    if trimestre is None:
+        return None, f"trimestre inválido: {texto} (use {', '.join(banco_do_sistema.TRIMESTRES)})"
+
+    try:
+        valor = float(str(registro.get("nota")).replace(",", "."))
+    except (TypeError, ValueError):
+        return None, f"nota inválida: {registro.get('nota')}"
+    if not 0 <= valor <= 20:
+        return None, f"nota fora do intervalo 0-20: {valor}"
+
+    return (aluno_id, disciplina_id, trimestre, valor), None
+
+
+def importar_notas(db_manager, caminho, tamanho_lote=5000, caminho_rejeitados=None, progresso=None):
+    """
+    Importa notas de um ficheiro CSV/JSONL em lotes de executemany, um lote por transação.
+    Colunas: aluno_id ou numero_bilhete, disciplina_id ou disciplina (nome), trimestre (1º, 2º ou 3º), nota.
+    Devolve um dicionário com o relatório da importação.
+    """
+    inicio = time.perf_counter()
+    nota_model = Nota(db_manager)
+    alunos, bilhetes, disciplinas, nomes = _carregar_referencias(db_manager)
+    rejeitados = ArquivoRejeitados(caminho_rejeitados)
+    relatorio = {"lidas": 0, "inseridas": 0, "rejeitadas": 0}
+
+    def gravar(lote):
+        try:
+            relatorio["inseridas"] += nota_model.adicionar_em_lote([r for _, r in lote])
+        except sqlite3.IntegrityError:
+            # Algum registo mudou entretanto (ex.: aluno apagado): isolar linha a linha
+            for numero_linha, registro in lote:
+                try:
+                    relatorio["inseridas"] += nota_model.adicionar_em_lote([registro])
+                except sqlite3.IntegrityError as e:
+                    rejeitados.escrever(numero_linha, str(e), registro)
+        if progresso:
+            progresso(relatorio["lidas"], relatorio["inseridas"], rejeitados.total)
+
+    lote = []
+    try:
+        for numero_linha, registro in enumerate(ler_registros(caminho), start=1):
+            relatorio["lidas"] += 1
+            valido, motivo = _validar_nota(registro, alunos, bilhetes, disciplinas, nomes)
+            if motivo:
+                rejeitados.escrever(numero_linha, motivo, registro)
+                continue
+            lote.append((numero_linha, valido))
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote = []
+        if lote:
+            gravar(lote)
+    finally:
+        rejeitados.fechar()
+
+    relatorio["rejeitadas"] = rejeitados.total
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 3)
+    return relatorio
+
+
+# -------------------------------
+# Admissão de candidatos (candidaturas seriadas pelo motor de admissões)
+# -------------------------------
+# Fluxo do auto-cadastro (main, opção 2) em massa: valida as candidaturas do
+# ficheiro e grava-as em lotes na tabela candidaturas, um lote por transação
+# (os hashes das senhas são calculados antes, fora da transação). Como no
+# auto-cadastro, ficam pendentes enquanto o curso estiver aberto e entram na
+# fila se o ano letivo já tiver sido fechado (e são admitidas se houver vaga).
+# Fechar é definitivo e seria também as candidaturas vindas do menu e do HTTP,
+# por isso só acontece a pedido (fechar=True / --fechar), com Admissoes.fechar.
+
+class ArquivoCsv:
+    """CSV de saída aberto só quando a primeira linha chega."""
+
+    def __init__(self, caminho, cabecalho):
+        self.caminho = caminho
+        self.cabecalho = cabecalho
+        self._f = None
+        self._writer = None
+
+    def escrever(self, linha):
+        if self.caminho is None:
+            return
+        if self._f is None:
+            self._f = open(self.caminho, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._f)
+            self._writer.writerow(self.cabecalho)
+        self._writer.writerow(linha)
+
+    def fechar(self):
+        if self._f is not None:
+            self._f.close()
+
+
+def _carregar_referencias_candidatos(db_manager, ano_letivo):
+    with db_manager.conexao() as conn:
+        bilhetes = {_bilhete(r[0]) for r in conn.execute("""
+            SELECT numero_bilhete FROM alunos WHERE numero_bilhete IS NOT NULL
+            UNION
+            SELECT numero_bilhete FROM candidaturas
+            WHERE ano_letivo=? AND estado IN ('pendente', 'em_espera', 'admitida')
+        """, (ano_letivo,))}
+        usernames = {r[0] for r in conn.execute("""
+            SELECT username FROM usuarios
+            UNION
+            SELECT username FROM candidaturas WHERE estado IN ('pendente', 'em_espera')
+        """)}
+    return bilhetes, usernames
+
+
+def _texto(registro, campo):
+    return str(registro.get(campo) or "").strip()
+
+
+def _validar_candidato(registro, cursos, bilhetes, usernames):
+    """Devolve (candidato, None) ou (None, motivo). candidato = dicionário pronto a gravar."""
+    nome = _texto(registro, "nome").title()
+    if not nome:
+        return None, "nome em falta"
+    data_nascimento = _texto(registro, "data_nascimento")
+    try:
+        nascimento = date.fromisoformat(data_nascimento)
+    except ValueError:
+        return None, f"data de nascimento inválida: {data_nascimento}"
+    genero = _texto(registro, "genero").upper()
+    if genero not in ("M", "F"):
+        return None, f"género inválido: {genero}"
+    bilhete = _bilhete(registro.get("numero_bilhete"))
+    if not bilhete:
+        return None, "número do bilhete em falta"
+    if bilhete in bilhetes:
+        return None, f"bilhete {bilhete} já registado"
+    username = _texto(registro, "username") or bilhete
+    if username in usernames:
+        return None, f"usuário {username} já existe"
+    curso = cursos.get(_texto(registro, "curso").lower())
+    if curso is None:
+        return None, f"curso sem vagas definidas: {_texto(registro, 'curso')}"
+    try:
+        media = float(_texto(registro, "media_certificado").replace(",", "."))
+    except ValueError:
+        return None, f"média inválida: {registro.get('media_certificado')}"
+
+    # Mesma regra do auto-cadastro
+    valido, idade = validar_idade_e_media(nascimento.year, media)
+    if not valido:
+        return None, f"idade={idade} e média={media} fora das regras (15-18 anos, média 12-20)"
+
+    bilhetes.add(bilhete)
+    usernames.add(username)
+    return {
+        "nome": nome, "data_nascimento": nascimento.isoformat(), "genero": genero,
+        "bairro": _texto(registro, "bairro").title(), "numero_bilhete": bilhete,
+        "turma": _texto(registro, "turma").upper(), "curso": curso, "media": media,
+        "username": username, "senha": _texto(registro, "senha"),
+    }, None
+
+
+def _gravar_candidaturas(conn, lote, ano_letivo):
+    agora = time.time()
+    fechados = {r[0] for r in conn.execute("SELECT curso FROM admissoes_fechadas WHERE ano_letivo=?", (ano_letivo,))}
+    for c in lote:
+        c["candidatura_id"] = conn.execute("""
+            INSERT INTO candidaturas (nome, data_nascimento, genero, bairro, numero_bilhete, turma, curso,
+                                      media_certificado, ano_letivo, username, senha, estado, criada_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (c["nome"], c["data_nascimento"], c["genero"], c["bairro"], c["numero_bilhete"], c["turma"],
+              c["curso"], c["media"], ano_letivo, c["username"], c["hash"],
+              "em_espera" if c["curso"] in fechados else "pendente", agora)).lastrowid
+
+
+def _estados_candidaturas(db_manager, ids, tamanho_lote=500):
+    """{candidatura_id: (estado, aluno_id, motivo)} das candidaturas indicadas."""
+    estados = {}
+    with db_manager.conexao() as conn:
+        for i in range(0, len(ids), tamanho_lote):
+            parte = ids[i:i + tamanho_lote]
+            estados.update((cid, (estado, aluno_id, motivo)) for cid, estado, aluno_id, motivo in conn.execute(
+                f"SELECT id, estado, aluno_id, motivo FROM candidaturas WHERE id IN ({','.join('?' * len(parte))})",
+                parte))
+    return estados
+
+
+def importar_candidatos(db_manager, caminho, ano_letivo, tamanho_lote=500, caminho_rejeitados=None,
+                        caminho_espera=None, caminho_credenciais=None, progresso=None, fechar=False):
+    """
+    Regista candidaturas de um ficheiro CSV/JSONL com as colunas nome, data_nascimento, genero,
+    bairro, numero_bilhete, turma, curso, media_certificado (e opcionalmente username e senha).
+    Com fechar=True fecha também as candidaturas dos cursos do ficheiro (Admissoes.fechar), que
+    admite por média; sem ele só entram na fila os cursos já fechados nesse ano letivo.
+    Sem senha, é gerada uma senha inicial, escrita em caminho_credenciais.
+    Devolve um dicionário com o relatório (aceites, pendentes, rejeitados e em espera por curso).
+    """
+    inicio = time.perf_counter()
+    vagas = Vagas(db_manager)
+    admissoes_model = admissoes.Admissoes(db_manager, vagas)
+    livres = {c: max(0, t - o) for c, t, o in vagas.obter_todas()}
+    cursos = {c.lower(): c for c in livres}
+    bilhetes, usernames = _carregar_referencias_candidatos(db_manager, ano_letivo)
+    rejeitados = ArquivoRejeitados(caminho_rejeitados)
+    espera = ArquivoCsv(caminho_espera, ["posicao", "candidatura_id", "linha", "numero_bilhete", "nome", "curso",
+                                         "media"])
+    credenciais = ArquivoCsv(caminho_credenciais, ["username", "senha", "candidatura_id", "estado", "aluno_id",
+                                                   "nome"])
+    relatorio = {"lidas": 0, "candidaturas": 0, "aceites": 0, "pendentes": 0, "rejeitadas": 0, "em_espera": 0,
+                 "senhas_geradas": 0,
+                 "por_curso": {c: {"vagas": v, "aceites": 0, "pendentes": 0, "em_espera": 0} for c, v in livres.items()}}
+
+    # 1. Validar tudo (o ficheiro é lido uma vez; só os válidos ficam em memória)
+    validos = []
+    for numero_linha, registro in enumerate(ler_registros(caminho), start=1):
+        relatorio["lidas"] += 1
+        candidato, motivo = _validar_candidato(registro, cursos, bilhetes, usernames)
+        if motivo:
+            rejeitados.escrever(numero_linha, motivo, registro)
+            continue
+        candidato["linha"] = numero_linha
+        validos.append(candidato)
+
+    # 2. Gravar as candidaturas em lotes, pela ordem do ficheiro (é o desempate de médias iguais)
+    gravados = []
+    try:
+        for i in range(0, len(validos), tamanho_lote):
+            lote = validos[i:i + tamanho_lote]
+            for c in lote:
+                if not c["senha"]:
+                    c["senha"], c["gerada"] = secrets.token_urlsafe(9), True
+            for c, senha_hash in zip(lote, senhas.gerar_hashes([c["senha"] for c in lote])):
+                c["hash"] = senha_hash
+            try:
+                with db_manager.transacao("IMMEDIATE") as conn:
+                    _gravar_candidaturas(conn, lote, ano_letivo)
+                gravados.extend(lote)
+            except sqlite3.IntegrityError:
+                # Alguém se candidatou entretanto com o mesmo bilhete ou usuário
+                gravados.extend(_gravar_um_a_um(db_manager, lote, ano_letivo, rejeitados))
+            relatorio["candidaturas"] = len(gravados)
+            if progresso:
+                progresso(relatorio["lidas"], len(gravados), rejeitados.total)
+
+        # 3. Seriar e admitir: o mesmo Admissoes.fechar do menu do diretor, só a pedido.
+        #    Sem fechar, os cursos já fechados admitem da fila se houver vagas livres
+        for curso in sorted({c["curso"] for c in gravados}):
+            if fechar:
+                admissoes_model.fechar(curso, ano_letivo, tamanho_lote)
+            else:
+                admissoes_model.promover(curso, ano_letivo, tamanho_lote=tamanho_lote)
+
+        estados = _estados_candidaturas(db_manager, [c["candidatura_id"] for c in gravados])
+        chaves = {"admitida": "aceites", "pendente": "pendentes", "em_espera": "em_espera"}
+        for c in gravados:
+            estado, aluno_id, motivo = estados[c["candidatura_id"]]
+            if estado in chaves:
+                relatorio[chaves[estado]] += 1
+                relatorio["por_curso"][c["curso"]][chaves[estado]] += 1
+            if estado == "rejeitada":
+                rejeitados.escrever(c["linha"], motivo, {k: c[k] for k in ("nome", "numero_bilhete", "curso")})
+            elif c.get("gerada"):
+                relatorio["senhas_geradas"] += 1
+                credenciais.escrever([c["username"], c["senha"], c["candidatura_id"], estado, aluno_id or "",
+                                      c["nome"]])
+
+        linhas = {c["candidatura_id"]: c["linha"] for c in gravados}
+        for curso in sorted({c["curso"] for c in gravados}):
+            for posicao, e in enumerate(admissoes_model.lista_espera(curso, ano_letivo, limite=-1), start=1):
+                espera.escrever([posicao, e.id, linhas.get(e.id, ""), e.numero_bilhete, e.nome, e.curso,
+                                 e.media_certificado])
+    finally:
+        rejeitados.fechar()
+        espera.fechar()
+        credenciais.fechar()
+
+    relatorio["rejeitadas"] = rejeitados.total
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 3)
+    return relatorio
+
+
+def _gravar_um_a_um(db_manager, lote, ano_letivo, rejeitados):
+    """Plano B de um lote que falhou: cada candidatura na sua transação."""
+    gravados = []
+    for c in lote:
+        try:
+            with db_manager.transacao("IMMEDIATE") as conn:
+                _gravar_candidaturas(conn, [c], ano_letivo)
+            gravados.append(c)
+        except sqlite3.IntegrityError as e:
+            rejeitados.escrever(c["linha"], str(e), {k: c[k] for k in ("nome", "numero_bilhete", "curso")})
+    return gravados
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+def _imprimir_progresso(lidas, inseridas, rejeitadas):
+    print(f"⏳ {lidas} linhas lidas | {inseridas} inseridas | {rejeitadas} rejeitadas")
+
+
+def _cmd_notas(args):
+    banco_do_sistema.criar_tabelas(args.db)
+    db = DatabaseManager(args.db, perfil="carga_em_massa")
+    rejeitados = args.rejeitados or os.path.splitext(args.arquivo)[0] + ".rejeitados.csv"
+    try:
+        rel = importar_notas(db, args.arquivo, args.lote, rejeitados, _imprimir_progresso)
+    finally:
+        db.fechar()
+    print(f"✅ Importação concluída em {rel['segundos']}s: {rel['inseridas']} notas inseridas, "
+          f"{rel['rejeitadas']} rejeitadas de {rel['lidas']} linhas.")
+    if rel["rejeitadas"]:
+        print(f"⚠️ Linhas rejeitadas em {rejeitados}")
+
+
+def _cmd_candidatos(args):
+    banco_do_sistema.criar_tabelas(args.db)
+    db = DatabaseManager(args.db, perfil="carga_em_massa")
+    base = os.path.splitext(args.arquivo)[0]
+    rejeitados = args.rejeitados or base + ".rejeitados.csv"
+    espera = base + ".espera.csv"
+    credenciais = base + ".credenciais.csv"
+    try:
+        rel = importar_candidatos(db, args.arquivo, args.ano_letivo, args.lote, rejeitados, espera, credenciais,
+                                  progresso=lambda lidas, gravadas, rej: print(
+                                      f"⏳ {lidas} candidaturas lidas | {gravadas} registadas | {rej} rejeitadas"),
+                                  fechar=args.fechar)
+    finally:
+        db.fechar()
+    print(f"✅ Importação concluída em {rel['segundos']}s: {rel['aceites']} admitidos, {rel['em_espera']} em espera, "
+          f"{rel['pendentes']} pendentes, {rel['rejeitadas']} rejeitados de {rel['lidas']} candidaturas.")
+    for curso, c in rel["por_curso"].items():
+        print(f"- {curso}: {c['aceites']} admitidos de {c['vagas']} vagas livres, {c['em_espera']} em espera, "
+              f"{c['pendentes']} pendentes")
+    if rel["pendentes"]:
+        print("ℹ️ Candidaturas pendentes: são seriadas quando o diretor fechar o curso (ou com --fechar).")
+    if rel["rejeitadas"]:
+        print(f"⚠️ Candidaturas rejeitadas em {rejeitados}")
+    if rel["em_espera"]:
+        print(f"📋 Lista de espera em {espera}")
+    if rel["senhas_geradas"]:
+        print(f"🔐 Senhas iniciais geradas em {credenciais} (guardar em lugar seguro)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importação em massa para o banco escolar")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("notas", help="importa notas de um ficheiro CSV ou JSONL")
+    p.add_argument("arquivo")
+    p.add_argument("--lote", type=int, default=5000, help="linhas por transação (padrão: 5000)")
+    p.add_argument("--rejeitados", help="CSV para as linhas rejeitadas (padrão: <arquivo>.rejeitados.csv)")
+    p.set_defaults(func=_cmd_notas)
+
+    p = sub.add_parser("candidatos", help="regista candidaturas (e, com --fechar, admite por média)")
+    p.add_argument("arquivo")
+    p.add_argument("--ano-letivo", default=str(date.today().year), help="ano letivo das matrículas")
+    p.add_argument("--lote", type=int, default=500, help="candidatos por transação (padrão: 500)")
+    p.add_argument("--rejeitados", help="CSV para as candidaturas rejeitadas (padrão: <arquivo>.rejeitados.csv)")
+    p.add_argument("--fechar", action="store_true",
+                   help="fecha as candidaturas dos cursos do ficheiro e admite por média (definitivo; inclui as "
+                        "candidaturas já pendentes)")
+    p.set_defaults(func=_cmd_candidatos)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+# -------------------------------
+# Rastreio de consultas (tempo, linhas, quem chamou)
+# -------------------------------
+# Ativa-se por DatabaseManager(rastreador=Rastreador(...)) ou pelas variáveis de ambiente
+# BANCO_ESCOLAR_RASTREIO (fração amostrada, ex.: 0.05) e BANCO_ESCOLAR_LENTO_MS.
+# A amostragem é por checkout do pool: uma conexão não amostrada usa o cursor
+# normal do sqlite3 e não paga nada além de um random() ao ser obtida.
+
+LIMIAR_LENTO_MS = float(os.environ.get("BANCO_ESCOLAR_LENTO_MS", 100))
+
+# Frames que não contam como "quem chamou": infraestrutura e utilitários genéricos
+_FICHEIROS_IGNORADOS = {os.path.abspath(__file__), os.path.abspath(sys.modules["contextlib"].__file__)}
+_FUNCOES_GENERICAS = {"iterar_paginado", "imprimir_paginado", "pesquisar_fts", "pedir_id", "com_retentativas",
+                      "PoolConexoes.obter", "PoolConexoes.conexao", "PoolConexoes.transacao",
+                      "DatabaseManager.connect", "DatabaseManager.conexao", "DatabaseManager.transacao",
+                      "ConexaoPooled.cursor", "ConexaoPooled.execute", "ConexaoPooled.executemany",
+                      "ConexaoPooled.commit", "ConexaoPooled.rollback",
+                      "_iterar_boletins", "gerar_boletins", "gerar_boletim", "media_final"}
+
+
+def chamador():
+    """Nome qualificado (ex.: 'Nota.gerar_boletim') da primeira função de negócio na pilha."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        codigo = frame.f_code
+        nome = codigo.co_qualname
+        if (codigo.co_filename not in _FICHEIROS_IGNORADOS and nome not in _FUNCOES_GENERICAS
+                and not nome.endswith(("<lambda>", "<genexpr>", "<listcomp>"))):
+            # Funções internas contam como a função que as define
+            return nome.split(".<locals>.", 1)[0]
+        frame = frame.f_back
+    return "?"
+
+
+def normalizar(sql):
+    return " ".join(sql.split())
+
+
+class CursorRastreado(sqlite3.Cursor):
+    """
+    Cursor usado nas conexões amostradas. Mede execute + leitura das linhas
+    e regista a instrução quando o resultado se esgota, o cursor é reutilizado
+    ou fechado.
+    """
+    _medida = None  # [sql, parâmetros, segundos, linhas, chamador]
+
+    def _fechar_medida(self):
+        medida, self._medida = self._medida, None
+        pool = self.connection.pool
+        if medida is not None and pool is not None and pool.rastreador is not None:
+            pool.rastreador.registrar(self.connection, *medida)
+
+    def _executar(self, metodo, sql, parametros, explicar):
+        self._fechar_medida()
+        conn = self.connection
+        em_transacao = conn.in_transaction
+        quem = chamador()
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, parametros)
+        finally:
+            duracao = time.perf_counter() - inicio
+            if not em_transacao and conn.in_transaction:
+                conn._inicio_transacao = (inicio, quem)
+            self._medida = [sql, parametros if explicar else None, duracao, 0, quem]
+            if self.description is None:
+                self._medida[3] = max(self.rowcount, 0)
+                self._fechar_medida()
+
+    def execute(self, sql, parametros=()):
+        return self._executar(super().execute, sql, parametros, True)
+
+    def executemany(self, sql, sequencia):
+        return self._executar(super().executemany, sql, sequencia, False)
+
+    def _ler(self, leitura, *args):
+        inicio = time.perf_counter()
+        resultado = leitura(*args)
+        if self._medida is not None:
+            self._medida[2] += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        row = self._ler(super().fetchone)
+        if self._medida is not None:
+            if row is None:
+                self._fechar_medida()
+            else:
+                self._medida[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._ler(super().fetchmany, size or self.arraysize)
+        if self._medida is not None:
+            self._medida[3] += len(rows)
+            if len(rows) < (size or self.arraysize):
+                self._fechar_medida()
+        return rows
+
+    def fetchall(self):
+        rows = self._ler(super().fetchall)
+        if self._medida is not None:
+            self._medida[3] += len(rows)
+            self._fechar_medida()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._fechar_medida()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._fechar_medida()
+        except Exception:
+            pass
+
+
+class _Agregado:
+    __slots__ = ("execucoes", "total", "maximo", "linhas", "chamadores")
+
+    def __init__(self):
+        self.execucoes = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.linhas = 0
+        self.chamadores = {}
+
+
+class Rastreador:
+    """Agrega tempos por instrução e escreve as lentas (com EXPLAIN QUERY PLAN) em `saida`."""
+
+    Cursor = CursorRastreado
+
+    def __init__(self, amostragem=1.0, limiar_lento_ms=LIMIAR_LENTO_MS, saida=None):
+        self.amostragem = amostragem
+        self.limiar_lento = limiar_lento_ms / 1000
+        self.saida = saida or sys.stderr
+        self._lock = threading.Lock()
+        self._instrucoes = {}
+        self._transacoes = {}   # chamador -> _Agregado
+        self._aquisicoes = _Agregado()
+        self.lentas = 0
+
+    # ---- chamados pelo pool e pelas conexões ----
+    def aquisicao(self, conn, espera):
+        """Decide se este checkout é amostrado e regista o tempo de espera pela conexão."""
+        conn._rastrear = self.amostragem >= 1 or random.random() < self.amostragem
+        if conn._rastrear:
+            with self._lock:
+                self._somar(self._aquisicoes, espera, 0, chamador())
+
+    def registrar(self, conn, sql, parametros, duracao, linhas, quem):
+        chave = normalizar(sql)
+        with self._lock:
+            agregado = self._instrucoes.get(chave)
+            if agregado is None:
+                agregado = self._instrucoes[chave] = _Agregado()
+            self._somar(agregado, duracao, linhas, quem)
+        if duracao >= self.limiar_lento:
+            self._registrar_lenta(conn, chave, parametros, duracao, linhas, quem)
+
+    def transacao(self, duracao, quem, confirmada):
+        with self._lock:
+            agregado = self._transacoes.get(quem)
+            if agregado is None:
+                agregado = self._transacoes[quem] = _Agregado()
+            self._somar(agregado, duracao, int(confirmada), quem)
+
+    @staticmethod
+    def _somar(agregado, duracao, linhas, quem):
+        agregado.execucoes += 1
+        agregado.total += duracao
+        agregado.maximo = max(agregado.maximo, duracao)
+        agregado.linhas += linhas
+        agregado.chamadores[quem] = agregado.chamadores.get(quem, 0) + 1
+
+    def _registrar_lenta(self, conn, sql, parametros, duracao, linhas, quem):
+        plano = []
+        if parametros is not None and sql.split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+            # Sem rastrear o próprio EXPLAIN
+            conn._rastrear, anterior = False, conn._rastrear
+            try:
+                plano = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+            except sqlite3.Error as e:
+                plano = [f"(sem plano: {e})"]
+            finally:
+                conn._rastrear = anterior
+        with self._lock:
+            self.lentas += 1
+            print(f"🐢 [{duracao * 1000:.1f} ms, {linhas} linhas] {quem}: {sql}", file=self.saida)
+            for passo in plano:
+                print(f"      plano: {passo}", file=self.saida)
+            self.saida.flush()
+
+    # ---- relatórios ----
+    def estatisticas(self, n=10):
+        """Top `n` instruções por tempo total, transações e espera por conexões."""
+        def resumo(chave, a):
+            return {"chave": chave, "execucoes": a.execucoes, "total_ms": round(a.total * 1000, 2),
+                    "media_ms": round(a.total / a.execucoes * 1000, 3), "max_ms": round(a.maximo * 1000, 2),
+                    "linhas": a.linhas,
+                    "chamadores": sorted(a.chamadores, key=a.chamadores.get, reverse=True)[:3]}
+
+        with self._lock:
+            instrucoes = sorted(self._instrucoes.items(), key=lambda kv: kv[1].total, reverse=True)[:n]
+            transacoes = sorted(self._transacoes.items(), key=lambda kv: kv[1].total, reverse=True)[:n]
+            return {
+                "amostragem": self.amostragem,
+                "lentas": self.lentas,
+                "instrucoes": [resumo(k, a) for k, a in instrucoes],
+                "transacoes": [resumo(k, a) for k, a in transacoes],
+                "aquisicoes": resumo("pool", self._aquisicoes) if self._aquisicoes.execucoes else None,
+            }
+
+    def relatorio(self, n=10):
+        e = self.estatisticas(n)
+        linhas = [f"\n📊 Top {n} instruções por tempo total (amostragem {e['amostragem']:.0%}, "
+                  f"{e['lentas']} lentas):"]
+        for i in e["instrucoes"]:
+            sql = i["chave"] if len(i["chave"]) <= 90 else i["chave"][:87] + "..."
+            linhas.append(f"- {i['total_ms']:9.1f} ms | {i['execucoes']:6d}x | média {i['media_ms']:.3f} ms | "
+                          f"máx {i['max_ms']:.1f} ms | {i['linhas']} linhas | {', '.join(i['chamadores'])}")
+            linhas.append(f"    {sql}")
+        if e["transacoes"]:
+            linhas.append("\n🔒 Transações:")
+            for t in e["transacoes"]:
+                linhas.append(f"- {t['chave']}: {t['execucoes']}x, média {t['media_ms']:.3f} ms, "
+                              f"máx {t['max_ms']:.1f} ms")
+        if e["aquisicoes"]:
+            a = e["aquisicoes"]
+            linhas.append(f"\n⏳ Espera por conexão: {a['execucoes']} checkouts, média {a['media_ms']:.3f} ms, "
+                          f"máx {a['max_ms']:.1f} ms")
+        return "\n".join(linhas)
+
+    def limpar(self):
+        with self._lock:
+            self._instrucoes.clear()
+            self._transacoes.clear()
+            self._aquisicoes = _Agregado()
+            self.lentas = 0
+
+
+def do_ambiente():
+    """Rastreador configurado por BANCO_ESCOLAR_RASTREIO, ou None se desligado."""
+    valor = os.environ.get("BANCO_ESCOLAR_RASTREIO", "").strip()
+    if not valor or valor == "0":
+        return None
+    return Rastreador(amostragem=1.0 if valor.lower() in ("1", "sim", "true") else float(valor))
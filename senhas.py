@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------
+# Parâmetros do scrypt (custo)
+# -------------------------------
+# N dobra o tempo e a memória (128 * N * r bytes) de cada verificação.
+# Escolher com 'python -m benchmarks.login' no hardware da escola.
+SCRYPT_N = int(os.environ.get("SENHA_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("SENHA_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("SENHA_SCRYPT_P", 1))
+TAMANHO_SAL = 16
+TAMANHO_HASH = 32
+
+# O scrypt liberta o GIL; o pool limita quantos correm ao mesmo tempo
+# (e a memória que usam) quando muitos logins chegam juntos.
+_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="kdf")
+
+
+def _b64(dados):
+    return base64.b64encode(dados).decode("ascii")
+
+
+def _scrypt(senha, sal, n, r, p):
+    return hashlib.scrypt(senha.encode(), salt=sal, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=TAMANHO_HASH)
+
+
+def _gerar(senha, n, r, p):
+    sal = secrets.token_bytes(TAMANHO_SAL)
+    derivada = _scrypt(senha, sal, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64(sal)}${_b64(derivada)}"
+
+
+def _verificar(senha, armazenado):
+    if armazenado.startswith("scrypt$"):
+        _, n, r, p, sal, esperado = armazenado.split("$")
+        n, r, p = int(n), int(r), int(p)
+        derivada = _scrypt(senha, base64.b64decode(sal), n, r, p)
+        ok = hmac.compare_digest(derivada, base64.b64decode(esperado))
+        return ok, ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    # Formato antigo: SHA-256 sem sal, em hexadecimal
+    legado = hashlib.sha256(senha.encode()).hexdigest()
+    ok = hmac.compare_digest(legado, armazenado)
+    return ok, ok
+
+
+def gerar_hash(senha, n=None, r=None, p=None):
+    """Hash scrypt com sal aleatório, calculado no pool de KDF."""
+    return _executor.submit(_gerar, senha, n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P).result()
+
+
+def gerar_hashes(lista_senhas, n=None, r=None, p=None):
+    """Hashes de várias senhas, em paralelo no pool de KDF (para registos em massa)."""
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    return list(_executor.map(lambda senha: _gerar(senha, n, r, p), lista_senhas))
+
+
+def verificar_senha(senha, armazenado):
+    """
+    Devolve (ok, precisa_rehash). precisa_rehash é True para hashes SHA-256
+    antigos e para hashes scrypt com parâmetros diferentes dos atuais.
+    """
+    return _executor.submit(_verificar, senha, armazenado).result()
+
+
+_hash_ficticio = None
+
+
+def verificar_ficticio(senha):
+    """Gasta o mesmo tempo de uma verificação real (para utilizadores inexistentes)."""
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = gerar_hash(secrets.token_hex(8))
+    verificar_senha(senha, _hash_ficticio)
+    return False
+
+
+# -------------------------------
+# Cache de verificações recentes
+# -------------------------------
+class CacheVerificacoes:
+    """
+    LRU limitado de logins bem-sucedidos recentes: (username, hash armazenado) ->
+    HMAC da senha com uma chave aleatória do processo. Um login repetido com a
+    mesma senha, enquanto o hash na base não mudar, dispensa o scrypt.
+    A senha em claro nunca é guardada.
+    """
+
+    def __init__(self, max_entradas=10000, ttl=300.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._chave = secrets.token_bytes(32)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def _digest(self, senha):
+        return hmac.new(self._chave, senha.encode(), hashlib.sha256).digest()
+
+    def confere(self, username, armazenado, senha):
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get((username, armazenado))
+            if entrada is None or entrada[1] < agora:
+                self.falhas += 1
+                return False
+            self._entradas.move_to_end((username, armazenado))
+        ok = hmac.compare_digest(entrada[0], self._digest(senha))
+        with self._lock:
+            if ok:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+        return ok
+
+    def guardar(self, username, armazenado, senha):
+        valor = (self._digest(senha), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entradas[(username, armazenado)] = valor
+            self._entradas.move_to_end((username, armazenado))
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"entradas": len(self._entradas), "acertos": self.acertos, "falhas": self.falhas}
+
+
+# Partilhado por todas as instâncias de Auth do processo
+cache_verificacoes = CacheVerificacoes()
@@ -0,0 +1,456 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from itertools import islice
+from urllib.parse import parse_qsl, urlsplit
+
+import banco_do_sistema
+import boletim
+from admissoes import Admissoes
+from sistema import (Auth, DatabaseManager, Matricula, Nota, Presenca, Vagas,
+                     validar_idade_e_media)
+
+# -------------------------------
+# Serviço HTTP/JSON (asyncio, só biblioteca padrão)
+# -------------------------------
+# O loop asyncio só lê e escreve sockets. Todo o trabalho com a base corre num
+# ThreadPoolExecutor com tantas threads quantas conexões no pool, por isso uma
+# thread nunca fica à espera de conexão. Um semáforo limita os pedidos em curso;
+# quem espera mais do que `espera_fila` recebe 503 em vez de encher a memória.
+
+MAX_CORPO = 1024 * 1024
+MAX_CABECALHO = 16 * 1024
+LIMITE_LISTAGEM = 500
+
+ESTADOS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class ErroHttp(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+class Pedido:
+    __slots__ = ("parametros", "query", "dados", "token", "usuario")
+
+    def __init__(self, parametros, query, dados, token):
+        self.parametros = parametros
+        self.query = query
+        self.dados = dados
+        self.token = token
+        self.usuario = None
+
+
+def _campos(dados, *nomes):
+    faltam = [n for n in nomes if dados.get(n) in (None, "")]
+    if faltam:
+        raise ErroHttp(400, f"campos em falta: {', '.join(faltam)}")
+    return [dados[n] for n in nomes]
+
+
+def _inteiro(valor, nome):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroHttp(400, f"{nome} inválido: {valor}")
+
+
+def _so_o_proprio(pedido, aluno_id):
+    # Um aluno só vê os seus próprios dados
+    if pedido.usuario["tipo"] == "aluno" and pedido.usuario["ref"] != aluno_id:
+        raise ErroHttp(403, "acesso negado")
+
+
+class Servico:
+    """Operações do sistema escolar expostas como rotas JSON."""
+
+    def __init__(self, db_manager, max_pedidos=64, espera_fila=5.0):
+        self.db = db_manager
+        self.auth = Auth(db_manager)
+        self.vagas = Vagas(db_manager)
+        # Regista-se em self.vagas: liberar_vaga e ajustar_vagas promovem da lista de espera
+        self.admissoes = Admissoes(db_manager, self.vagas)
+        self.matriculas = Matricula(db_manager, self.vagas)
+        self.notas = Nota(db_manager)
+        self.presencas = Presenca(db_manager)
+        self.executor = ThreadPoolExecutor(max_workers=db_manager.pool.tamanho_max, thread_name_prefix="db")
+        self.max_pedidos = max_pedidos
+        self.espera_fila = espera_fila
+        self._limite = None  # criado dentro do loop
+        self.em_curso = 0
+
+        # (método, caminho, função, tipos autorizados; None = público)
+        diretor, professor, todos = ("diretor",), ("diretor", "professor"), ("diretor", "professor", "aluno")
+        self.rotas = [
+            ("GET", r"/saude", self.saude, None),
+            ("POST", r"/login", self.login, None),
+            ("POST", r"/logout", self.logout, todos),
+            ("GET", r"/vagas", self.listar_vagas, None),
+            ("POST", r"/alunos", self.cadastrar_aluno, None),
+            ("POST", r"/admissoes/fechar", self.fechar_candidaturas, diretor),
+            ("POST", r"/matriculas", self.matricular, diretor),
+            ("POST", r"/notas", self.lancar_nota, professor),
+            ("GET", r"/notas", self.listar_notas, todos),
+            ("POST", r"/presencas", self.registrar_presenca, professor),
+            ("POST", r"/presencas/turma", self.registrar_chamada, professor),
+            ("GET", r"/presencas", self.listar_presencas, todos),
+            ("GET", r"/boletim/(\d+)", self.boletim, todos),
+            ("GET", r"/estado", self.estado, diretor),
+        ]
+        self.rotas = [(m, re.compile(c + "$"), f, t) for m, c, f, t in self.rotas]
+
+    # ---- rotas (correm no executor) ----
+    def saude(self, pedido):
+        return 200, {"ok": True, "em_curso": self.em_curso}
+
+    def login(self, pedido):
+        username, senha = _campos(pedido.dados, "username", "senha")
+        token, usuario = self.auth.iniciar_sessao(username, senha)
+        if not token:
+            raise ErroHttp(401, "usuário ou senha incorretos")
+        return 200, {"token": token, "tipo": usuario["tipo"], "ref": usuario["ref"]}
+
+    def logout(self, pedido):
+        self.auth.encerrar_sessao(pedido.token)
+        return 200, {"ok": True}
+
+    def listar_vagas(self, pedido):
+        return 200, [{"curso": c, "total": t, "ocupadas": o, "disponiveis": max(0, t - o)}
+                     for c, t, o in self.vagas.obter_todas()]
+
+    def cadastrar_aluno(self, pedido):
+        """
+        Candidatura com as mesmas regras do menu. É seriada por média quando o diretor
+        fechar o curso; num curso já fechado entra logo na fila (e é admitida se houver vaga).
+        """
+        d = pedido.dados
+        nome, data_nasc, curso, turma, username, senha = _campos(
+            d, "nome", "data_nascimento", "curso", "turma", "username", "senha")
+        try:
+            ano = int(str(data_nasc).split("-")[0])
+            media = float(d.get("media_certificado"))
+        except (TypeError, ValueError):
+            raise ErroHttp(400, "data de nascimento ou média inválida")
+        valido, idade = validar_idade_e_media(ano, media)
+        if not valido:
+            raise ErroHttp(400, f"rejeitado: idade={idade} e média={media} (regras: 15-18 anos e média 12-20)")
+        if d.get("genero") not in (None, "", "M", "F"):
+            raise ErroHttp(400, "gênero inválido (M/F)")
+        if curso not in {c for c, _, _ in self.vagas.obter_todas()}:
+            raise ErroHttp(400, f"o curso {curso} não tem vagas definidas")
+        ano_letivo = str(d.get("ano_letivo") or date.today().year)
+
+        candidatura_id, estado = self.admissoes.candidatar(
+            nome, data_nasc, d.get("genero"), d.get("bairro"), d.get("numero_bilhete"), turma, curso, media,
+            username, senha, ano_letivo)
+        if candidatura_id is None:
+            raise ErroHttp(409, "candidatura recusada (nome de usuário ou bilhete já registados)")
+        resposta = {"candidatura": candidatura_id, "estado": estado}
+        if estado == "em_espera":
+            resposta["posicao"] = self.admissoes.posicao(candidatura_id)
+        return (201 if estado == "admitida" else 202), resposta
+
+    def fechar_candidaturas(self, pedido):
+        curso, = _campos(pedido.dados, "curso")
+        ano_letivo = str(pedido.dados.get("ano_letivo") or date.today().year)
+        admitidas, em_espera = self.admissoes.fechar(curso, ano_letivo)
+        return 200, {"admitidas": len(admitidas), "em_espera": em_espera}
+
+    def matricular(self, pedido):
+        aluno_id, curso = _campos(pedido.dados, "aluno_id", "curso")
+        ano_letivo = str(pedido.dados.get("ano_letivo") or date.today().year)
+        if not self.matriculas.adicionar(_inteiro(aluno_id, "aluno_id"), curso, ano_letivo):
+            raise ErroHttp(409, f"sem vagas no curso {curso} ou aluno inexistente")
+        return 201, {"ok": True}
+
+    def lancar_nota(self, pedido):
+        aluno_id, disciplina_id, trimestre, valor = _campos(
+            pedido.dados, "aluno_id", "disciplina_id", "trimestre", "nota")
+        try:
+            valor = float(valor)
+        except (TypeError, ValueError):
+            raise ErroHttp(400, f"nota inválida: {valor}")
+        if not 0 <= valor <= 20:
+            raise ErroHttp(400, "nota fora do intervalo 0-20")
+        canonico = banco_do_sistema.trimestre_canonico(trimestre)
+        if canonico is None:
+            raise ErroHttp(400, f"trimestre inválido: {trimestre} (use {', '.join(banco_do_sistema.TRIMESTRES)})")
+        gravada = self.notas.adicionar(_inteiro(aluno_id, "aluno_id"), _inteiro(disciplina_id, "disciplina_id"),
+                                       canonico, valor)
+        if gravada is None:
+            raise ErroHttp(503, "sistema ocupado, tente novamente")
+        if not gravada:
+            raise ErroHttp(409, "aluno ou disciplina inexistente")
+        return 201, {"ok": True}
+
+    def _listagem(self, pedido, iterar):
+        aluno_id = pedido.query.get("aluno_id")
+        aluno_id = _inteiro(aluno_id, "aluno_id") if aluno_id else None
+        if pedido.usuario["tipo"] == "aluno":
+            aluno_id = pedido.usuario["ref"]
+        limite = _inteiro(pedido.query.get("limite", 100), "limite")
+        if limite < 1:
+            raise ErroHttp(400, f"limite inválido: {limite} (mínimo 1)")
+        limite = min(limite, LIMITE_LISTAGEM)
+        depois = _inteiro(pedido.query.get("depois", -1), "depois")
+        linhas = [r._asdict() for r in islice(iterar(aluno_id=aluno_id, tamanho_pagina=limite, depois=depois), limite)]
+        # Keyset: o cliente pede a página seguinte com ?depois=<proximo>
+        proximo = linhas[-1]["id"] if len(linhas) == limite else None
+        return 200, {"linhas": linhas, "proximo": proximo}
+
+    def listar_notas(self, pedido):
+        return self._listagem(pedido, self.notas.iterar)
+
+    def registrar_presenca(self, pedido):
+        aluno_id, disciplina_id, data_aula = _campos(pedido.dados, "aluno_id", "disciplina_id", "data")
+        presente = bool(pedido.dados.get("presente", True))
+        gravada = self.presencas.registrar(_inteiro(aluno_id, "aluno_id"), _inteiro(disciplina_id, "disciplina_id"),
+                                           data_aula, presente)
+        if gravada is None:
+            raise ErroHttp(503, "sistema ocupado, tente novamente")
+        if not gravada:
+            raise ErroHttp(409, "aluno ou disciplina inexistente")
+        return 201, {"ok": True}
+
+    def registrar_chamada(self, pedido):
+        disciplina_id, data_aula, curso, turma = _campos(pedido.dados, "disciplina_id", "data", "curso", "turma")
+        ausentes = pedido.dados.get("ausentes") or []
+        if not isinstance(ausentes, list) or not all(type(a) is int for a in ausentes):
+            raise ErroHttp(400, "ausentes deve ser uma lista de ids de alunos")
+        total, faltas = self.presencas.registrar_turma(_inteiro(disciplina_id, "disciplina_id"), data_aula,
+                                                       curso, turma, ausentes)
+        return 201, {"alunos": total, "faltas": faltas}
+
+    def listar_presencas(self, pedido):
+        return self._listagem(pedido, self.presencas.iterar)
+
+    def boletim(self, pedido):
+        aluno_id = int(pedido.parametros[0])
+        _so_o_proprio(pedido, aluno_id)
+        b = boletim.gerar_boletim(self.db, aluno_id)
+        if not b:
+            raise ErroHttp(404, "nenhuma nota encontrada")
+        return 200, dict(asdict(b), situacao=b.situacao)
+
+    def estado(self, pedido):
+        return 200, {"pool": self.db.estatisticas(), "sessoes": self.auth.sessoes.estatisticas(),
+                     "em_curso": self.em_curso, "referencia": self.db.referencia.estatisticas(),
+                     "escrita_diferida": self.db.escrita.estatisticas() if self.db.escrita else None,
+                     "consultas": self.db.rastreador.estatisticas() if self.db.rastreador else None}
+
+    # ---- despacho ----
+    def _executar(self, funcao, tipos, pedido):
+        if tipos is not None:
+            # Token em cache: só uma consulta a um dicionário
+            pedido.usuario = self.auth.autorizar(pedido.token)
+            if not pedido.usuario:
+                raise ErroHttp(401, "sessão inválida ou expirada")
+            if pedido.usuario["tipo"] not in tipos:
+                raise ErroHttp(403, "acesso negado")
+        return funcao(pedido)
+
+    async def despachar(self, metodo, alvo, cabecalhos, corpo):
+        url = urlsplit(alvo)
+        metodos_do_caminho = False
+        for m, padrao, funcao, tipos in self.rotas:
+            encontrado = padrao.match(url.path)
+            if not encontrado:
+                continue
+            metodos_do_caminho = True
+            if m == metodo:
+                break
+        else:
+            raise ErroHttp(405 if metodos_do_caminho else 404, "rota não encontrada")
+
+        try:
+            dados = json.loads(corpo) if corpo else {}
+        except ValueError:
+            raise ErroHttp(400, "JSON inválido")
+        if not isinstance(dados, dict):
+            raise ErroHttp(400, "o corpo deve ser um objeto JSON")
+        autorizacao = cabecalhos.get("authorization", "")
+        token = autorizacao[7:].strip() if autorizacao.lower().startswith("bearer ") else None
+        pedido = Pedido(encontrado.groups(), dict(parse_qsl(url.query)), dados, token)
+
+        if self._limite is None:
+            self._limite = asyncio.Semaphore(self.max_pedidos)
+        try:
+            await asyncio.wait_for(self._limite.acquire(), self.espera_fila)
+        except asyncio.TimeoutError:
+            raise ErroHttp(503, "servidor ocupado, tente novamente")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._executar, funcao, tipos, pedido)
+        finally:
+            self._limite.release()
+
+    def fechar(self):
+        self.executor.shutdown(wait=True)
+
+
+# -------------------------------
+# HTTP/1.1 mínimo sobre asyncio.start_server
+# -------------------------------
+class ServidorHttp:
+    def __init__(self, servico, host="127.0.0.1", porta=8080, tempo_ocioso=30.0):
+        self.servico = servico
+        self.host = host
+        self.porta = porta
+        self.tempo_ocioso = tempo_ocioso
+        self._servidor = None
+        self._ociosas = set()      # conexões keep-alive à espera do próximo pedido
+        self._a_encerrar = False
+        self._sem_pedidos = None
+
+    async def iniciar(self):
+        self._sem_pedidos = asyncio.Event()
+        self._sem_pedidos.set()
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta, limit=MAX_CABECALHO)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def _ler_pedido(self, reader):
+        bruto = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.tempo_ocioso)
+        linhas = bruto.decode("latin-1").split("\r\n")
+        partes = linhas[0].split(" ")
+        if len(partes) != 3:
+            raise ErroHttp(400, "linha de pedido inválida")
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            if ":" in linha:
+                nome, valor = linha.split(":", 1)
+                cabecalhos[nome.strip().lower()] = valor.strip()
+        tamanho = int(cabecalhos.get("content-length") or 0)
+        if tamanho > MAX_CORPO:
+            raise ErroHttp(413, "corpo demasiado grande")
+        corpo = await reader.readexactly(tamanho) if tamanho else b""
+        return partes[0].upper(), partes[1], partes[2], cabecalhos, corpo
+
+    def _responder(self, writer, status, resposta, manter):
+        corpo = json.dumps(resposta, ensure_ascii=False, default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {ESTADOS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode() + corpo)
+
+    async def _atender(self, reader, writer):
+        try:
+            while not self._a_encerrar:
+                self._ociosas.add(writer)
+                try:
+                    metodo, alvo, versao, cabecalhos, corpo = await self._ler_pedido(reader)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    self._responder(writer, 431, {"erro": "cabeçalho demasiado grande"}, False)
+                    break
+                except (ErroHttp, ValueError) as e:
+                    erro = e if isinstance(e, ErroHttp) else ErroHttp(400, "pedido inválido")
+                    self._responder(writer, erro.status, {"erro": erro.mensagem}, False)
+                    break
+                finally:
+                    self._ociosas.discard(writer)
+
+                conexao = cabecalhos.get("connection", "").lower()
+                manter = conexao == "keep-alive" or (versao == "HTTP/1.1" and conexao != "close")
+                self.servico.em_curso += 1
+                self._sem_pedidos.clear()
+                try:
+                    status, resposta = await self.servico.despachar(metodo, alvo, cabecalhos, corpo)
+                except ErroHttp as e:
+                    status, resposta = e.status, {"erro": e.mensagem}
+                except Exception:
+                    # O detalhe (SQL, caminhos) fica no log do servidor, não vai para o cliente
+                    print(f"❌ Erro em {metodo} {alvo}:", file=sys.stderr)
+                    traceback.print_exc(file=sys.stderr)
+                    status, resposta = 500, {"erro": "erro interno do servidor"}
+                finally:
+                    self.servico.em_curso -= 1
+                    if self.servico.em_curso == 0:
+                        self._sem_pedidos.set()
+                manter = manter and not self._a_encerrar
+                self._responder(writer, status, resposta, manter)
+                await writer.drain()
+                if not manter:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._ociosas.discard(writer)
+            writer.close()
+
+    async def encerrar(self, prazo=10.0):
+        """Deixa de aceitar conexões, fecha as ociosas e espera pelos pedidos em curso."""
+        self._a_encerrar = True
+        self._servidor.close()
+        for writer in list(self._ociosas):
+            writer.close()
+        try:
+            await asyncio.wait_for(self._sem_pedidos.wait(), prazo)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.servico.em_curso} pedidos ainda em curso ao fim de {prazo}s.", file=sys.stderr)
+        await self._servidor.wait_closed()
+
+
+# -------------------------------
+# Linha de comando
+# -------------------------------
+async def servir(args):
+    banco_do_sistema.criar_tabelas(args.db)
+    db = DatabaseManager(args.db, tamanho_pool=args.pool, diferir_escritas=args.escrita_diferida or None)
+    servico = Servico(db, max_pedidos=args.max_pedidos, espera_fila=args.espera_fila)
+    servidor = await ServidorHttp(servico, args.host, args.porta).iniciar()
+    print(f"🌐 A servir em http://{servidor.host}:{servidor.porta} "
+          f"(pool={args.pool}, max_pedidos={args.max_pedidos}). Ctrl+C para parar.", file=sys.stderr)
+
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, parar.set)
+        except NotImplementedError:  # Windows
+            signal.signal(sinal, lambda *_: loop.call_soon_threadsafe(parar.set))
+    await parar.wait()
+
+    print("🛑 A encerrar...", file=sys.stderr)
+    await servidor.encerrar(args.prazo)
+    servico.fechar()
+    db.fechar()
+    print("✅ Servidor parado.", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON do sistema escolar")
+    parser.add_argument("--db", help="caminho do banco (padrão: BANCO_ESCOLAR_DB ou banco_escolar.db)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--pool", type=int, default=8, help="conexões no pool e threads de base de dados")
+    parser.add_argument("--max-pedidos", type=int, default=64, help="pedidos em curso ao mesmo tempo")
+    parser.add_argument("--espera-fila", type=float, default=5.0, help="segundos na fila antes de 503")
+    parser.add_argument("--prazo", type=float, default=10.0, help="segundos para terminar pedidos ao encerrar")
+    parser.add_argument("--escrita-diferida", action="store_true",
+                        help="grava notas e presenças com group commit (ver escrita_diferida.py)")
+    parser.add_argument("--silencioso", action="store_true",
+                        help="descarta as mensagens dos modelos (print) para não pesar sob carga")
+    args = parser.parse_args(argv)
+    if args.silencioso:
+        sys.stdout = open(os.devnull, "w")
+    asyncio.run(servir(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import secrets
+import threading
+import time
+
+# -------------------------------
+# Sessões com token opaco
+# -------------------------------
+DURACAO_SESSAO = 8 * 3600      # segundos até a sessão expirar
+TTL_CACHE = 300                # máximo que uma sessão revogada noutro processo continua aceite
+INTERVALO_VARREDURA = 60       # segundos entre limpezas das sessões expiradas
+LOTE_VARREDURA = 500           # linhas apagadas por transação na limpeza
+
+CONSULTAS_QUENTES = {
+    "GestorSessoes.validar": (
+        "SELECT usuario_id, tipo, referencia_id, expira_em FROM sessoes WHERE token_hash=? AND expira_em > ?",
+        ("x", 0)),
+    "GestorSessoes.varrer": (
+        "SELECT token_hash FROM sessoes WHERE expira_em <= ? LIMIT ?", (0, 1)),
+}
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class GestorSessoes:
+    """
+    Emite e valida tokens de sessão. A tabela sessoes é a fonte de verdade; por cima
+    dela há uma cache em memória token -> {id, tipo, ref}, de modo que validar um
+    token conhecido é uma consulta a um dicionário, sem base nem hash de senha.
+    """
+
+    def __init__(self, db_manager, duracao=DURACAO_SESSAO, ttl_cache=TTL_CACHE, max_entradas=10000,
+                 intervalo_varredura=INTERVALO_VARREDURA):
+        self.db_manager = db_manager
+        self.duracao = duracao
+        self.ttl_cache = ttl_cache
+        self.max_entradas = max_entradas
+        self.intervalo_varredura = intervalo_varredura
+        self._cache = {}  # token -> (contexto, válido_até)
+        self._lock = threading.Lock()
+        self._lock_varredura = threading.Lock()
+        self._proxima_varredura = time.time() + intervalo_varredura
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas_removidas = 0
+
+    # ---- cache em memória ----
+    def _guardar(self, token, contexto, expira_em, agora):
+        with self._lock:
+            if len(self._cache) >= self.max_entradas:
+                self._descartar_expiradas(agora)
+                while len(self._cache) >= self.max_entradas:
+                    # dict mantém a ordem de inserção: sai a entrada mais antiga
+                    del self._cache[next(iter(self._cache))]
+            self._cache[token] = (contexto, min(expira_em, agora + self.ttl_cache))
+
+    def _descartar_expiradas(self, agora):
+        for token in [t for t, (_, limite) in self._cache.items() if limite <= agora]:
+            del self._cache[token]
+
+    # ---- API ----
+    def criar(self, usuario):
+        """Abre uma sessão para usuario ({id, tipo, ref}) e devolve o token (só existe em memória)."""
+        token = secrets.token_urlsafe(32)
+        agora = time.time()
+        expira_em = agora + self.duracao
+        with self.db_manager.transacao() as conn:
+            conn.execute("""
+                INSERT INTO sessoes (token_hash, usuario_id, tipo, referencia_id, criada_em, expira_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (hash_token(token), usuario["id"], usuario["tipo"], usuario["ref"], agora, expira_em))
+        self._guardar(token, dict(usuario), expira_em, agora)
+        self._talvez_varrer(agora)
+        return token
+
+    def validar(self, token):
+        """Devolve {id, tipo, ref} da sessão, ou None se o token não existe ou expirou."""
+        if not token:
+            return None
+        agora = time.time()
+        entrada = self._cache.get(token)
+        if entrada is not None and entrada[1] > agora:
+            self.acertos += 1
+            self._talvez_varrer(agora)
+            return entrada[0]
+
+        self.falhas += 1
+        with self.db_manager.conexao() as conn:
+            row = conn.execute(CONSULTAS_QUENTES["GestorSessoes.validar"][0], (hash_token(token), agora)).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(token, None)
+            return None
+        contexto = {"id": row[0], "tipo": row[1], "ref": row[2]}
+        self._guardar(token, contexto, row[3], agora)
+        self._talvez_varrer(agora)
+        return contexto
+
+    def encerrar(self, token):
+        with self._lock:
+            self._cache.pop(token, None)
+        with self.db_manager.transacao() as conn:
+            conn.execute("DELETE FROM sessoes WHERE token_hash=?", (hash_token(token),))
+
+    def encerrar_do_usuario(self, usuario_id):
+        """Revoga todas as sessões de um utilizador (ex.: mudança de senha)."""
+        with self._lock:
+            for token in [t for t, (c, _) in self._cache.items() if c["id"] == usuario_id]:
+                del self._cache[token]
+        with self.db_manager.transacao() as conn:
+            return conn.execute("DELETE FROM sessoes WHERE usuario_id=?", (usuario_id,)).rowcount
+
+    # ---- limpeza das expiradas ----
+    def _talvez_varrer(self, agora):
+        # Só uma thread varre; as outras seguem sem esperar
+        if agora < self._proxima_varredura or not self._lock_varredura.acquire(blocking=False):
+            return
+        try:
+            self._proxima_varredura = agora + self.intervalo_varredura
+            self.varrer(agora)
+        finally:
+            self._lock_varredura.release()
+
+    def varrer(self, agora=None):
+        """Apaga as sessões expiradas em lotes curtos (uma transação por lote). Devolve quantas."""
+        agora = agora or time.time()
+        with self._lock:
+            self._descartar_expiradas(agora)
+        total = 0
+        while True:
+            with self.db_manager.transacao("IMMEDIATE") as conn:
+                apagadas = conn.execute("""
+                    DELETE FROM sessoes WHERE token_hash IN
+                        (SELECT token_hash FROM sessoes WHERE expira_em <= ? LIMIT ?)
+                """, (agora, LOTE_VARREDURA)).rowcount
+            total += apagadas
+            if apagadas < LOTE_VARREDURA:
+                break
+        self.expiradas_removidas += total
+        return total
+
+    def estatisticas(self):
+        with self._lock:
+            return {"em_cache": len(self._cache), "acertos": self.acertos, "falhas": self.falhas,
+                    "expiradas_removidas": self.expiradas_removidas}
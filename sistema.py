@@ -1,33 +1,181 @@
+import admissoes
 import banco_do_sistema
+import boletim
+import cache_referencia
+import consultas
+import escrita_diferida
+import rastreamento
+import senhas
+import sessoes
 import sqlite3
-import hashlib
+import re
 from datetime import date
+from functools import lru_cache
 
 # -------------------------------
 # Classe para gerenciar o Banco
 # -------------------------------
 class DatabaseManager:
-    def __init__(self):
-        self.db_name = banco_do_sistema
+    def __init__(self, caminho=None, tamanho_pool=5, timeout=30.0, perfil=None, rastreador=None,
+                 diferir_escritas=None):
+        # Sem rastreador explícito, BANCO_ESCOLAR_RASTREIO decide (ver rastreamento.py)
+        self.rastreador = rastreador or rastreamento.do_ambiente()
+        self.pool = banco_do_sistema.PoolConexoes(caminho, tamanho_max=tamanho_pool, timeout=timeout, perfil=perfil,
+                                                  rastreador=self.rastreador)
+        self.db_name = self.pool.caminho
+        # Disciplinas, vagas e professores lidos em memória (ver cache_referencia.py)
+        self.referencia = cache_referencia.CacheReferencia(self)
+        # Notas e presenças com group commit (ver escrita_diferida.py); None = BANCO_ESCOLAR_ESCRITA_DIFERIDA decide
+        if diferir_escritas is None:
+            self.escrita = escrita_diferida.do_ambiente(self)
+        else:
+            self.escrita = escrita_diferida.EscritaDiferida(self) if diferir_escritas else None
 
     def connect(self):
-        return banco_do_sistema.conectar()
+        # conn.close() devolve a conexão ao pool
+        return self.pool.obter()
+
+    def conexao(self):
+        return self.pool.conexao()
+
+    def transacao(self, modo="DEFERRED"):
+        return self.pool.transacao(modo)
+
+    def escrever(self, operacao):
+        """
+        Corre operacao(conn) numa transação e devolve o resultado. Com a escrita diferida vai para
+        a fila e volta depois do commit do lote. Se esta thread já estiver numa transação do pool,
+        corre nela: esperar pelo escritor seria um deadlock (ele precisa do lock que ela tem).
+        """
+        if self.escrita is not None and not self.pool.em_transacao():
+            return self.escrita.submeter(operacao).result()
+        with self.transacao() as conn:
+            return operacao(conn)
+
+    def estatisticas(self):
+        return self.pool.estatisticas()
+
+    def diagnostico(self):
+        with self.conexao() as conn:
+            return banco_do_sistema.diagnostico(conn)
+
+    def fechar(self):
+        # Primeiro gravar o que estiver na fila da escrita diferida
+        if self.escrita is not None:
+            self.escrita.fechar()
+        self.referencia.fechar()
+        self.pool.fechar()
+
+# -------------------------------
+# Listagens paginadas (keyset por id)
+# -------------------------------
+# Tipos de linha e SQL dos modelos vêm do registo em consultas.py
+from consultas import FaltasLinha, ResumoPresencaLinha
+
+TAMANHO_PAGINA = 500
+
+
+@lru_cache(maxsize=256)
+def _sql_pagina(select, chave, colunas):
+    # O mesmo objeto str para a mesma listagem: acerta sempre na cache de statements da conexão
+    condicoes = [f"{chave} > ?"] + [f"{coluna} = ?" for coluna in colunas]
+    return f"{select} WHERE {' AND '.join(condicoes)} ORDER BY {chave} LIMIT ?"
+
+
+def iterar_paginado(db_manager, nome, filtros=None, tamanho_pagina=TAMANHO_PAGINA, depois=-1):
+    """
+    Percorre a listagem `nome` de consultas.LISTAGENS por páginas da chave > último id visto
+    (a começar em `depois`), devolvendo linhas do tipo registado. Só uma página de cada vez fica em memória
+    e a conexão é devolvida ao pool entre páginas.
+    filtros: {coluna: valor}; valores None são ignorados. As colunas vêm do código, nunca do utilizador.
+    """
+    select, chave, tipo = consultas.LISTAGENS[nome]
+    filtros = {c: v for c, v in (filtros or {}).items() if v is not None}
+    sql = _sql_pagina(select, chave, tuple(filtros))
+    linha = consultas.construtor(tipo)
+    ultimo = depois
+    while True:
+        with db_manager.conexao() as conn:
+            pagina = conn.execute(sql, (ultimo, *filtros.values(), tamanho_pagina)).fetchall()
+        yield from map(linha, pagina)
+        if len(pagina) < tamanho_pagina:
+            return
+        ultimo = pagina[-1][0]
+
+
+def imprimir_paginado(linhas, formatar, titulo, vazio, pagina=50):
+    """Imprime as linhas; a cada `pagina` linhas pergunta se continua (pagina=None imprime tudo)."""
+    total = 0
+    for linha in linhas:
+        if total == 0:
+            print(titulo)
+        print(formatar(linha))
+        total += 1
+        if pagina and total % pagina == 0:
+            if input("-- Enter para continuar, q para parar: ").strip().lower() == "q":
+                break
+    if total == 0:
+        print(vazio)
+    return total
+
+
+def pedir_id(mensagem, listar, pesquisar=None):
+    """
+    Pede um id; com '?' mostra a listagem paginada e, se houver `pesquisar`,
+    qualquer texto é usado como pesquisa antes de voltar a perguntar.
+    """
+    dica = "? para listar, ou texto para pesquisar" if pesquisar else "? para listar"
+    while True:
+        valor = input(f"{mensagem} ({dica}): ").strip()
+        if valor == "?":
+            listar()
+        elif valor.lstrip("-").isdigit():
+            return int(valor)
+        elif pesquisar and valor:
+            pesquisar(valor)
+        else:
+            print("⚠️ Id inválido.")
+
+
+# -------------------------------
+# Pesquisa de texto (FTS5)
+# -------------------------------
+def termo_fts(texto):
+    """
+    Converte o texto digitado numa expressão FTS5: cada palavra vira um prefixo
+    entre aspas e todas têm de aparecer ("ana conc" -> "ana"* "conc"*).
+    """
+    palavras = re.findall(r"\w+", texto)
+    return " ".join(f'"{p}"*' for p in palavras)
+
+
+def pesquisar_fts(db_manager, nome, texto, limite):
+    termo = termo_fts(texto)
+    if not termo:
+        return []
+    with db_manager.conexao() as conn:
+        return consultas.todos(conn, nome, (termo, limite))
+
 
 # -------------------------------
 # Auth: registro e login
 # -------------------------------
 class Auth:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, cache=None, gestor_sessoes=None):
         self.db_manager = db_manager
+        self.cache = cache or senhas.cache_verificacoes
+        self.sessoes = gestor_sessoes or sessoes.GestorSessoes(db_manager)
         self.usuario_logado = None  # dict: {id, tipo, ref}
+        self.token = None
 
     def hash_senha(self, senha):
-        return hashlib.sha256(senha.encode()).hexdigest()
+        # scrypt com sal (ver senhas.py); calculado fora de qualquer conexão
+        return senhas.gerar_hash(senha)
 
     def registrar_usuario(self, username, senha, tipo, referencia_id=None):
+        senha_hash = self.hash_senha(senha)
         conn = self.db_manager.connect()
         cursor = conn.cursor()
-        senha_hash = self.hash_senha(senha)
         try:
             cursor.execute("""
                 INSERT INTO usuarios (username, senha, tipo, referencia_id)
@@ -35,29 +183,71 @@ class Auth:
             """, (username, senha_hash, tipo, referencia_id))
             conn.commit()
             print(f"✅ Usuário '{username}' cadastrado como {tipo}.")
+            return True
         except sqlite3.IntegrityError:
             print("⚠️ Nome de usuário já existe.")
+            return False
         finally:
             conn.close()
 
-    def login(self, username, senha):
+    def verificar_credenciais(self, username, senha):
+        """Devolve {id, tipo, ref} se a senha confere, senão None. Não altera usuario_logado."""
         conn = self.db_manager.connect()
         cursor = conn.cursor()
-        senha_hash = self.hash_senha(senha)
-        cursor.execute("SELECT id, tipo, referencia_id FROM usuarios WHERE username=? AND senha=?",
-                       (username, senha_hash))
+        cursor.execute("SELECT id, tipo, referencia_id, senha FROM usuarios WHERE username=?", (username,))
         result = cursor.fetchone()
         conn.close()
-        if result:
-            self.usuario_logado = {"id": result[0], "tipo": result[1], "ref": result[2]}
-            print(f"🔐 Logado como {result[1].upper()}.")
+        if not result:
+            # Mesmo custo que uma senha errada, para não revelar que o utilizador não existe
+            senhas.verificar_ficticio(senha)
+            return None
+
+        armazenado = result[3]
+        if not self.cache.confere(username, armazenado, senha):
+            ok, precisa_rehash = senhas.verificar_senha(senha, armazenado)
+            if not ok:
+                return None
+            if precisa_rehash:
+                novo = self.hash_senha(senha)
+                conn = self.db_manager.connect()
+                # Só substitui se ninguém mudou a senha entretanto
+                conn.execute("UPDATE usuarios SET senha=? WHERE id=? AND senha=?", (novo, result[0], armazenado))
+                conn.commit()
+                conn.close()
+                armazenado = novo
+            self.cache.guardar(username, armazenado, senha)
+        return {"id": result[0], "tipo": result[1], "ref": result[2]}
+
+    def iniciar_sessao(self, username, senha):
+        """Verifica a senha uma vez e devolve (token, {id, tipo, ref}), ou (None, None)."""
+        usuario = self.verificar_credenciais(username, senha)
+        if not usuario:
+            return None, None
+        return self.sessoes.criar(usuario), usuario
+
+    def autorizar(self, token):
+        """{id, tipo, ref} da sessão do token, ou None. Sem senha nem base para tokens em cache."""
+        return self.sessoes.validar(token)
+
+    def encerrar_sessao(self, token):
+        self.sessoes.encerrar(token)
+
+    def login(self, username, senha):
+        token, usuario = self.iniciar_sessao(username, senha)
+        if usuario:
+            self.usuario_logado = usuario
+            self.token = token
+            print(f"🔐 Logado como {usuario['tipo'].upper()}.")
             return True
         else:
             print("❌ Usuário ou senha incorretos.")
             return False
 
     def logout(self):
+        if self.token:
+            self.encerrar_sessao(self.token)
         self.usuario_logado = None
+        self.token = None
         print("🚪 Sessão encerrada.")
 
 
@@ -67,53 +257,75 @@ class Auth:
 class Vagas:
     def __init__(self, db_manager):
         self.db_manager = db_manager
+        # Admissoes regista-se aqui para preencher da lista de espera as vagas que abrirem
+        self.admissoes = None
+
+    def _por_curso(self):
+        # {curso: (total_vagas, vagas_ocupadas)}, da cache de referência
+        return self.db_manager.referencia.obter("vagas", "por_curso", lambda conn: {
+            c: (t, o) for c, t, o in conn.execute("SELECT curso, total_vagas, vagas_ocupadas FROM vagas")
+        })
+
+    def invalidar_cache(self):
+        self.db_manager.referencia.invalidar("vagas")
 
     def vagas_disponiveis(self, curso):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT total_vagas, vagas_ocupadas FROM vagas WHERE curso=?", (curso,))
-        row = cursor.fetchone()
-        conn.close()
+        row = self._por_curso().get(curso)
         if row:
             return max(0, row[0] - row[1])
         return 0
 
-    def ocupar_vaga(self, curso):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE vagas SET vagas_ocupadas = vagas_ocupadas + 1 WHERE curso=? AND vagas_ocupadas < total_vagas",
-                       (curso,))
-        conn.commit()
-        affected = cursor.rowcount
-        conn.close()
-        return affected == 1  # True se vaga ocupada
+    def reservar(self, conn, curso, quantidade=1):
+        """Ocupa `quantidade` vagas dentro da transação do chamador (sem commit). True se havia vagas para todas."""
+        cursor = conn.execute("""
+            UPDATE vagas SET vagas_ocupadas = vagas_ocupadas + ?
+            WHERE curso=? AND vagas_ocupadas + ? <= total_vagas
+        """, (quantidade, curso, quantidade))
+        return cursor.rowcount == 1
 
-    def liberar_vaga(self, curso):
+    def ocupar_vaga(self, curso):
         conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE vagas SET vagas_ocupadas = vagas_ocupadas - 1 WHERE curso=? AND vagas_ocupadas > 0",
-                       (curso,))
+        affected = self.reservar(conn, curso)
         conn.commit()
         conn.close()
+        self.invalidar_cache()
+        return affected  # True se vaga ocupada
+
+    def _promover(self, conn, curso, ano_letivo):
+        # Na mesma transação que abriu a vaga: ninguém a ocupa antes do primeiro da fila
+        if self.admissoes is not None:
+            return self.admissoes.promover(curso, ano_letivo, conn)
+        return []
+
+    def liberar_vaga(self, curso, ano_letivo=None):
+        """Liberta uma vaga e admite o primeiro da fila do ano letivo (por omissão, o último fechado)."""
+        with self.db_manager.transacao("IMMEDIATE") as conn:
+            conn.execute("UPDATE vagas SET vagas_ocupadas = vagas_ocupadas - 1 WHERE curso=? AND vagas_ocupadas > 0",
+                         (curso,))
+            admitidas = self._promover(conn, curso, ano_letivo)
+        self.invalidar_cache()
+        return admitidas
+
+    def obter_todas(self):
+        """Lista de (curso, total_vagas, vagas_ocupadas)."""
+        return [(c, t, o) for c, (t, o) in self._por_curso().items()]
 
     def listar_vagas(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT curso, total_vagas, vagas_ocupadas FROM vagas")
-        dados = cursor.fetchall()
-        conn.close()
+        dados = self.obter_todas()
         print("\n📊 Vagas por curso:")
         for c in dados:
             disponiveis = c[1] - c[2]
             print(f"- {c[0]}: {disponiveis} vagas disponíveis de {c[1]} (ocupadas: {c[2]})")
 
-    def ajustar_vagas(self, curso, novo_total):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE vagas SET total_vagas=? WHERE curso=?", (novo_total, curso))
-        conn.commit()
-        conn.close()
+    def ajustar_vagas(self, curso, novo_total, ano_letivo=None):
+        with self.db_manager.transacao("IMMEDIATE") as conn:
+            conn.execute("UPDATE vagas SET total_vagas=? WHERE curso=?", (novo_total, curso))
+            admitidas = self._promover(conn, curso, ano_letivo)
+        self.invalidar_cache()
         print(f"✅ Total de vagas para {curso} atualizado para {novo_total}.")
+        if admitidas:
+            print(f"🎓 {len(admitidas)} candidato(s) admitido(s) da lista de espera.")
+        return admitidas
 
 # -------------------------------
 # Aluno: cadastro, listagens, etc.
@@ -145,55 +357,47 @@ class Aluno:
         finally:
             conn.close()
 
-    def listar(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, turma, curso FROM alunos")
-        rows = cursor.fetchall()
-        conn.close()
-        if not rows:
-            print("📭 Nenhum aluno cadastrado.")
-            return
-        print("\n📋 Lista de alunos:")
-        for r in rows:
-            print(f"Id: {r[0]} | Nome: {r[1]} | Turma: {r[2]} | Curso: {r[3]}")
+    def iterar(self, curso=None, turma=None, tamanho_pagina=TAMANHO_PAGINA):
+        return iterar_paginado(self.db_manager, "Aluno.iterar", {"curso": curso, "turma": turma}, tamanho_pagina)
+
+    def listar(self, curso=None, turma=None, pagina=50):
+        imprimir_paginado(self.iterar(curso, turma),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Turma: {r.turma} | Curso: {r.curso}",
+                          "\n📋 Lista de alunos:", "📭 Nenhum aluno cadastrado.", pagina)
+
+    def pesquisar(self, texto, limite=20):
+        """Pesquisa por nome, bairro, bilhete, turma ou curso (prefixos, sem acentos), por relevância."""
+        return pesquisar_fts(self.db_manager, "Aluno.pesquisar", texto, limite)
+
+    def imprimir_pesquisa(self, texto):
+        imprimir_paginado(self.pesquisar(texto),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Turma: {r.turma} | Curso: {r.curso}",
+                          f"\n🔎 Alunos para '{texto}':", "📭 Nenhum aluno encontrado.", None)
 
     def obter_por_id(self, aluno_id):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM alunos WHERE id=?", (aluno_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return row
+        """AlunoFicha do aluno, ou None."""
+        with self.db_manager.conexao() as conn:
+            return consultas.um(conn, "Aluno.obter_por_id", (aluno_id,))
 
     def obter_por_bilhete(self, numero_bilhete):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM alunos WHERE numero_bilhete=?", (numero_bilhete,))
-        row = cursor.fetchone()
-        conn.close()
-        return row
+        """AlunoFicha do aluno com este bilhete, ou None."""
+        with self.db_manager.conexao() as conn:
+            return consultas.um(conn, "Aluno.obter_por_bilhete", (numero_bilhete,))
 
     def ver_meus_dados(self, aluno_id):
         a = self.obter_por_id(aluno_id)
         if a:
             print("\n📌 Meus dados:")
-            print(f"Id: {a[0]} | Nome: {a[1]} | Nascimento: {a[2]} | Gênero: {a[3]} | Bairro: {a[4]} | Bilhete: {a[5]} | Turma: {a[6]} | Curso: {a[7]}")
+            print(f"Id: {a.id} | Nome: {a.nome} | Nascimento: {a.data_nascimento} | Gênero: {a.genero} | Bairro: {a.bairro} | Bilhete: {a.numero_bilhete} | Turma: {a.turma} | Curso: {a.curso}")
         else:
             print("⚠️ Aluno não encontrado.")
 
 
-    def listar_alunos_de_um_curso(self,curso_id,turma_id):
-        conn=self.db_manager.connect()
-        cursor=conn.cursor()
-
-        cursor.execute("SELECT id,nome FROM alunos WHERE curso=? AND turma=?",(curso_id,turma_id))
-        registro=cursor.fetchall()
-
-        print(f"📌Lista dos alunos da turma de {turma_id} no curso de {curso_id}")
-        for i in registro:
-            print(f"Id: {i[0]}| Nome: {i[1]}")
-        conn.close()
+    def listar_alunos_de_um_curso(self, curso_id, turma_id, pagina=50):
+        imprimir_paginado(self.iterar(curso_id, turma_id),
+                          lambda r: f"Id: {r.id}| Nome: {r.nome}",
+                          f"📌Lista dos alunos da turma de {turma_id} no curso de {curso_id}",
+                          "📭 Nenhum aluno nesta turma.", pagina)
 
 
     def atualizar(self,opcao):
@@ -247,44 +451,45 @@ class Professor:
                 VALUES (?, ?, ?, ?)
             """, (nome, especialidade, telefone, email))
             conn.commit()
+            self.db_manager.referencia.invalidar("professores")
             print("✅ Professor cadastrado.")
         except sqlite3.IntegrityError as e:
             print(f"⚠️ Erro: {e}")
         finally:
             conn.close()
 
-    def listar(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, especialidade FROM professores")
-        rows = cursor.fetchall()
-        conn.close()
-        if not rows:
-            print("📭 Nenhum professor cadastrado.")
-            return
-        print("\n📋 Professores:")
-        for r in rows:
-            print(f"Id: {r[0]} | Nome: {r[1]} | Especialidade: {r[2]}")
+    def iterar(self, especialidade=None, tamanho_pagina=TAMANHO_PAGINA):
+        return iterar_paginado(self.db_manager, "Professor.iterar", {"especialidade": especialidade}, tamanho_pagina)
 
-    def obter_por_id(self, id_prof):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM professores WHERE id=?", (id_prof,))
-        r = cursor.fetchone()
-        conn.close()
-        return r
+    def todos(self):
+        """Todos os professores (ProfessorLinha), da cache de referência."""
+        return self.db_manager.referencia.obter("professores", "todos", lambda conn: tuple(
+            consultas.todos(conn, "Professor.todos")))
 
-    def listar_por_especialidade(self, especialidade_id):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
+    def listar(self, especialidade=None, pagina=50):
+        imprimir_paginado((p for p in self.todos() if especialidade is None or p.especialidade == especialidade),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Especialidade: {r.especialidade}",
+                          "\n📋 Professores:", "📭 Nenhum professor cadastrado.", pagina)
 
-        cursor.execute("SELECT nome FROM professores WHERE especialidade=?", (especialidade_id,))
-        registro = cursor.fetchall()
+    def pesquisar(self, texto, limite=20):
+        """Pesquisa por nome, especialidade ou email (prefixos, sem acentos), por relevância."""
+        return pesquisar_fts(self.db_manager, "Professor.pesquisar", texto, limite)
 
-        print(f"📌Lista do professores da disciplina de {especialidade_id}")
-        for i in registro:
-            print(f"Nome: {i}")
-        conn.close()
+    def imprimir_pesquisa(self, texto):
+        imprimir_paginado(self.pesquisar(texto),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Especialidade: {r.especialidade}",
+                          f"\n🔎 Professores para '{texto}':", "📭 Nenhum professor encontrado.", None)
+
+    def obter_por_id(self, id_prof):
+        """ProfessorFicha do professor, ou None."""
+        with self.db_manager.conexao() as conn:
+            return consultas.um(conn, "Professor.obter_por_id", (id_prof,))
+
+    def listar_por_especialidade(self, especialidade_id, pagina=50):
+        imprimir_paginado((p for p in self.todos() if p.especialidade == especialidade_id),
+                          lambda r: f"Nome: {r.nome}",
+                          f"📌Lista do professores da disciplina de {especialidade_id}",
+                          "📭 Nenhum professor com esta especialidade.", pagina)
 
     def deletar(self, id_prof):
         conn = self.db_manager.connect()
@@ -293,6 +498,7 @@ class Professor:
         cursor.execute("DELETE FROM professores WHERE id=?", (id_prof,))
         conn.commit()
         conn.close()
+        self.db_manager.referencia.invalidar("professores")
         print("🗑️ Aluno removido!")
 
 
@@ -310,42 +516,51 @@ class Disciplina:
         cursor.execute("INSERT INTO disciplinas (nome, curso, classe) VALUES (?, ?, ?)", (nome, curso, classe))
         conn.commit()
         conn.close()
+        self.db_manager.referencia.invalidar("disciplinas")
         print("✅ Disciplina adicionada.")
 
-    def listar(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome, curso, classe FROM disciplinas")
-        rows = cursor.fetchall()
-        conn.close()
-        if not rows:
-            print("📭 Nenhuma disciplina cadastrada.")
-            return
-        print("\n📚 Disciplinas:")
-        for r in rows:
-            print(f"Id: {r[0]} | Nome: {r[1]} | Curso: {r[2]} | Classe: {r[3]}")
-
-    def listar_informatica(self, ):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM disciplinas WHERE curso== 'Informatica' ")
-        disciplinas = cursor.fetchall()
-        print("📌 Lista das Disciplinas do curso de Informatica")
-        for i in disciplinas:
-            print(f"Id: {i[0]}| Nome: {i[1]}| Curso: {i[2]}")
-        conn.close()
-
-    def listar_contabilidade(self, ):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM disciplinas WHERE curso== 'Contabilidade' ")
-        disciplinas = cursor.fetchall()
-        print("📌 Lista das Disciplinas do curso de Contabilidade")
-        for i in disciplinas:
-            print(f"Id: {i[0]}| Nome: {i[1]}| Curso: {i[2]}")
-        conn.close()
+    def iterar(self, curso=None, classe=None, tamanho_pagina=TAMANHO_PAGINA):
+        return iterar_paginado(self.db_manager, "Disciplina.iterar", {"curso": curso, "classe": classe}, tamanho_pagina)
+
+    def todas(self):
+        """Todas as disciplinas (DisciplinaLinha), da cache de referência."""
+        return self.db_manager.referencia.obter("disciplinas", "todas", lambda conn: tuple(
+            consultas.todos(conn, "Disciplina.todas")))
+
+    def listar(self, curso=None, classe=None, pagina=50):
+        imprimir_paginado((d for d in self.todas()
+                           if (curso is None or d.curso == curso) and (classe is None or d.classe == classe)),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Curso: {r.curso} | Classe: {r.classe}",
+                          "\n📚 Disciplinas:", "📭 Nenhuma disciplina cadastrada.", pagina)
+
+    def _indice_do_curso(self, curso):
+        # {classe: (DisciplinaLinha, ...)} de um curso; lido uma vez e refeito quando disciplinas muda
+        def carregar(conn):
+            # Uma só consulta para qualquer curso, servida por idx_disciplinas_curso(curso, classe)
+            indice = {}
+            for d in consultas.todos(conn, "Disciplina.por_curso", (curso,)):
+                indice.setdefault(d.classe, []).append(d)
+            return {classe: tuple(linhas) for classe, linhas in indice.items()}
+        return self.db_manager.referencia.obter("disciplinas", ("curso", curso), carregar)
+
+    def por_curso(self, curso, classe=None):
+        """Disciplinas de um curso (e classe, se dada), ordenadas por classe e id."""
+        indice = self._indice_do_curso(curso)
+        if classe is not None:
+            return indice.get(classe, ())
+        return tuple(d for c in sorted(indice, key=str) for d in indice[c])
+
+    def cursos(self):
+        """Cursos conhecidos (os que têm vagas), para os ecrãs de currículo."""
+        return self.db_manager.referencia.obter("vagas", "cursos", lambda conn: tuple(
+            r[0] for r in conn.execute("SELECT curso FROM vagas ORDER BY curso")
+        ))
+
+    def listar_por_curso(self, curso, classe=None, pagina=50):
+        titulo = f"\n📌 Disciplinas de {curso}" + (f" ({classe} classe)" if classe else "") + ":"
+        imprimir_paginado(self.por_curso(curso, classe),
+                          lambda r: f"Id: {r.id} | Nome: {r.nome} | Classe: {r.classe}",
+                          titulo, "📭 Nenhuma disciplina neste curso.", pagina)
 
 
 # -------------------------------
@@ -357,58 +572,43 @@ class Matricula:
         self.vagas_manager = vagas_manager
 
     def adicionar(self, aluno_id, curso, ano_letivo):
-        # Verificar vaga antes
-        if self.vagas_manager:
-            disponiveis = self.vagas_manager.vagas_disponiveis(curso)
-            if disponiveis <= 0:
-                print(f"⚠️ Não há vagas disponíveis no curso {curso}.")
-                return False
+        """
+        Reserva a vaga e insere a matrícula numa única transação BEGIN IMMEDIATE,
+        para que inscrições simultâneas nunca ultrapassem o total de vagas.
+        """
+        def transacao():
+            with self.db_manager.transacao("IMMEDIATE") as conn:
+                if self.vagas_manager and not self.vagas_manager.reservar(conn, curso):
+                    return False
+                conn.execute("INSERT INTO matriculas (aluno_id, curso, ano_letivo) VALUES (?, ?, ?)",
+                             (aluno_id, curso, ano_letivo))
+                return True
 
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO matriculas (aluno_id, curso, ano_letivo) VALUES (?, ?, ?)",
-                       (aluno_id, curso, ano_letivo))
-        conn.commit()
-        conn.close()
-        # ocupar vaga
+        try:
+            ok = banco_do_sistema.com_retentativas(transacao)
+        except sqlite3.IntegrityError as e:
+            print(f"⚠️ Erro ao matricular: {e}")
+            return False
+        if not ok:
+            print(f"⚠️ Não há vagas disponíveis no curso {curso}.")
+            return False
         if self.vagas_manager:
-            ok = self.vagas_manager.ocupar_vaga(curso)
-            if ok:
-                print("✅ Matrícula feita e vaga reservada.")
-            else:
-                print("⚠️ Matrícula feita, mas não foi possível ocupar a vaga (concorrência).")
-        else:
-            print("✅ Matrícula feita.")
+            self.vagas_manager.invalidar_cache()
+        print("✅ Matrícula feita e vaga reservada." if self.vagas_manager else "✅ Matrícula feita.")
         return True
 
-    def listar(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT m.id, a.nome, m.curso, m.ano_letivo
-            FROM matriculas m
-            JOIN alunos a ON m.aluno_id = a.id
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        print("\n📋 Matrículas:")
-        for r in rows:
-            print(f"Id: {r[0]} | Aluno: {r[1]} | Curso: {r[2]} | Ano: {r[3]}")
+    def iterar(self, curso=None, ano_letivo=None, tamanho_pagina=TAMANHO_PAGINA):
+        return iterar_paginado(self.db_manager, "Matricula.iterar", {"m.curso": curso, "m.ano_letivo": ano_letivo},
+                               tamanho_pagina)
 
-    def listar_por_curso(self, curso):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT m.id, a.nome, m.curso
-            FROM matriculas m
-            JOIN alunos a ON m.aluno_id = a.id
-            WHERE m.curso = ?
-        """, (curso,))
-        rows = cursor.fetchall()
-        conn.close()
-        print(f"\n📋 Matrículas em {curso}:")
-        for r in rows:
-            print(f"Id: {r[0]} | Aluno: {r[1]} | Curso: {r[2]}")
+    def listar(self, curso=None, ano_letivo=None, pagina=50):
+        titulo = f"\n📋 Matrículas em {curso}:" if curso else "\n📋 Matrículas:"
+        imprimir_paginado(self.iterar(curso, ano_letivo),
+                          lambda r: f"Id: {r.id} | Aluno: {r.aluno} | Curso: {r.curso} | Ano: {r.ano_letivo}",
+                          titulo, "📭 Nenhuma matrícula encontrada.", pagina)
+
+    def listar_por_curso(self, curso, pagina=50):
+        self.listar(curso=curso, pagina=pagina)
 
 
 # -------------------------------
@@ -418,132 +618,270 @@ class Nota:
     def __init__(self, db_manager):
         self.db_manager = db_manager
 
-    def adicionar(self, aluno_id, disciplina_id, trimestre, nota_valor):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
+    @staticmethod
+    def _trimestre(texto):
+        """Nome canónico do trimestre ("1º Trimestre"...); ValueError se não for um trimestre."""
+        trimestre = banco_do_sistema.trimestre_canonico(texto)
+        if trimestre is None:
+            raise ValueError(f"trimestre inválido: {texto} (use {', '.join(banco_do_sistema.TRIMESTRES)})")
+        return trimestre
+
+    @staticmethod
+    def _inserir(conn, aluno_id, disciplina_id, trimestre, nota_valor):
+        conn.execute("""
             INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota)
             VALUES (?, ?, ?, ?)
-        """, (aluno_id, disciplina_id, trimestre, nota_valor))
-        conn.commit()
-        conn.close()
+        """, (aluno_id, disciplina_id, Nota._trimestre(trimestre), nota_valor))
+        # O trigger já atualizou resumo_notas; a média do aluno sai dele, já pronta a ler
+        boletim.atualizar_medias(conn, [aluno_id])
+        return True
+
+    def adicionar(self, aluno_id, disciplina_id, trimestre, nota_valor):
+        """True se a nota foi gravada, False se foi recusada, None se o sistema estiver ocupado."""
+        try:
+            trimestre = self._trimestre(trimestre)
+        except ValueError as e:
+            print(f"⚠️ Erro ao registrar nota: {e}")
+            return False
+        try:
+            # Volta só depois do commit (do lote da escrita diferida, se estiver ligada)
+            self.db_manager.escrever(
+                lambda conn: self._inserir(conn, aluno_id, disciplina_id, trimestre, nota_valor))
+        except sqlite3.IntegrityError as e:
+            print(f"⚠️ Erro ao registrar nota: {e}")
+            return False
+        except (TimeoutError, sqlite3.OperationalError) as e:
+            # Fila da escrita diferida cheia (TimeoutError) ou banco bloqueado; outros erros sobem
+            if isinstance(e, sqlite3.OperationalError) and not banco_do_sistema.banco_ocupado(e):
+                raise
+            print("⚠️ Sistema ocupado: a nota não foi registrada, tente novamente.")
+            return None
         print("✅ Nota registrada.")
+        return True
+
+    def adicionar_em_lote(self, registros):
+        """
+        Insere várias notas numa só transação com executemany.
+        registros: iterável de (aluno_id, disciplina_id, trimestre, nota) já validados.
+        Devolve o número de notas inseridas; em caso de erro nada é gravado
+        (ValueError se algum trimestre for inválido).
+        """
+        registros = [(aluno_id, disciplina_id, self._trimestre(trimestre), nota)
+                     for aluno_id, disciplina_id, trimestre, nota in registros]
+        with self.db_manager.transacao() as conn:
+            cursor = conn.executemany("""
+                INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota)
+                VALUES (?, ?, ?, ?)
+            """, registros)
+            return cursor.rowcount
 
     def calcular_media_final(self, aluno_id):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT AVG(n.nota)
-            FROM notas n
-            WHERE n.aluno_id=?
-        """, (aluno_id,))
-        media = cursor.fetchone()[0]
-        conn.close()
-        return round(media, 2) if media else None
+        # Mesma regra do boletim, lida de medias_alunos (calculada a partir de resumo_notas)
+        return boletim.media_final(self.db_manager, aluno_id)
 
     def gerar_boletim(self, aluno_id):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT d.nome, n.trimestre, n.nota
-            FROM notas n
-            JOIN disciplinas d ON n.disciplina_id = d.id
-            WHERE n.aluno_id=?
-            ORDER BY d.nome, n.trimestre
-        """, (aluno_id,))
-        rows = cursor.fetchall()
-        conn.close()
-
-        if not rows:
+        b = boletim.gerar_boletim(self.db_manager, aluno_id)
+        if not b:
             print("\n📘 Nenhuma nota encontrada.")
-            return
-
-        # Agrupar as notas por disciplina e trimestre
-        boletim = {}
-        for disciplina, trimestre, nota in rows:
-            boletim.setdefault(disciplina, {}).setdefault(trimestre, []).append(nota)
-
-        print("\n📊 BOLETIM ESCOLAR COMPLETO")
-        print("-" * 75)
-        print(f"{'Disciplina':20s} {'Trimestre':>10s} {'Notas':>20s} {'Média':>10s}")
-        print("-" * 75)
-
-        medias_finais = []
-
-        for disc, trimestres in boletim.items():
-            for trimestre, notas in trimestres.items():
-                media_t = sum(notas) / len(notas)
-                notas_texto = ", ".join(f"{n:.1f}" for n in notas)
-                print(f"{disc:20s} {trimestre:>10s} {notas_texto:>20s} {media_t:10.2f}")
-            # média final da disciplina (média dos trimestres)
-            todas_medias = [sum(notas) / len(notas) for notas in trimestres.values()]
-            media_final_disc = round(sum(todas_medias) / len(todas_medias), 2)
-            medias_finais.append(media_final_disc)
-            print(f"{'':20s} {'':>10s} {'Média Final:':>20s} {media_final_disc:10.2f}")
-            print("-" * 75)
-
-        # Média final geral
-        media_final_geral = round(sum(medias_finais) / len(medias_finais), 2)
-        situacao = "🟢 Aprovado" if media_final_geral >= 10 else "🔴 Reprovado"
-
-        print(f"{'Média Final Geral:':>55s} {media_final_geral:10.2f}")
-        print(f"{'Situação:':>55s} {situacao:>10s}")
-        print("-" * 75)
+            return None
+        boletim.imprimir_boletim(b)
+        return b
+
+    def gerar_boletins(self, curso=None, turma=None):
+        """Imprime os boletins de uma turma, de um curso ou da escola inteira."""
+        total = 0
+        for b in boletim.gerar_boletins(self.db_manager, curso=curso, turma=turma):
+            boletim.imprimir_boletim(b)
+            total += 1
+        if not total:
+            print("\n📘 Nenhuma nota encontrada.")
+        return total
 
     def listar_por_aluno(self, aluno_id):
         self.gerar_boletim(aluno_id)
 
+    def iterar(self, aluno_id=None, disciplina_id=None, tamanho_pagina=TAMANHO_PAGINA, depois=-1):
+        return iterar_paginado(self.db_manager, "Nota.iterar", {"n.aluno_id": aluno_id, "n.disciplina_id": disciplina_id},
+                               tamanho_pagina, depois)
+
+    def listar_todas(self, pagina=50):
+        imprimir_paginado(self.iterar(),
+                          lambda r: f"Aluno: {r.aluno} | Disciplina: {r.disciplina} | Trimestre: {r.trimestre} | Nota: {r.nota}",
+                          "\n📘 Notas:", "📭 Nenhuma nota registrada.", pagina)
+
 
 
 # -------------------------------
 # Presenças
 # -------------------------------
 class Presenca:
+    # Chave (aluno_id, disciplina_id, data): repetir o registo só atualiza se mudou
+    SQL_UPSERT = """
+        INSERT INTO presencas (aluno_id, disciplina_id, data, presente)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (aluno_id, disciplina_id, data)
+        DO UPDATE SET presente = excluded.presente
+        WHERE presencas.presente <> excluded.presente
+    """
+
+    # Taxas de faltas lidas dos resumos mantidos por triggers (migração 8), nunca de presencas
+    LIMITE_FALTAS = 0.25
+    MIN_AULAS = 10
+    SQL_FALTAS_ALUNO = """
+        SELECT COALESCE(SUM(presencas), 0), COALESCE(SUM(faltas), 0)
+        FROM presencas_dia
+        WHERE aluno_id=? AND data BETWEEN ? AND ?
+    """
+    SQL_FALTAS_POR_ALUNO = """
+        SELECT a.id, a.nome, a.curso, a.turma, SUM(r.presencas) + SUM(r.faltas) AS aulas, SUM(r.faltas) AS faltas
+        FROM presencas_dia r
+        JOIN alunos a ON a.id = r.aluno_id
+        WHERE r.data BETWEEN ? AND ? {filtro}
+        GROUP BY a.id
+    """
+    PERIODOS = {"dia": ("presencas_dia", "data"), "semana": ("presencas_semana", "semana"),
+                "mes": ("presencas_mes", "mes")}
+
     def __init__(self, db_manager):
         self.db_manager = db_manager
 
     def registrar(self, aluno_id, disciplina_id, data_aula, presente_bool):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO presencas (aluno_id, disciplina_id, data, presente)
-            VALUES (?, ?, ?, ?)
-        """, (aluno_id, disciplina_id, data_aula, int(bool(presente_bool))))
-        conn.commit()
-        conn.close()
+        """True se a presença foi gravada, False se foi recusada, None se o sistema estiver ocupado."""
+        parametros = (aluno_id, disciplina_id, data_aula, int(bool(presente_bool)))
+        try:
+            # Volta só depois do commit (do lote da escrita diferida, se estiver ligada)
+            self.db_manager.escrever(lambda conn: conn.execute(self.SQL_UPSERT, parametros).rowcount)
+        except sqlite3.IntegrityError as e:
+            print(f"⚠️ Erro ao registrar presença: {e}")
+            return False
+        except (TimeoutError, sqlite3.OperationalError) as e:
+            # Fila da escrita diferida cheia (TimeoutError) ou banco bloqueado; outros erros sobem
+            if isinstance(e, sqlite3.OperationalError) and not banco_do_sistema.banco_ocupado(e):
+                raise
+            print("⚠️ Sistema ocupado: a presença não foi registrada, tente novamente.")
+            return None
         print("✅ Presença registrada.")
+        return True
 
-    def listar_todas(self):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.nome, d.nome, p.data, p.presente
-            FROM presencas p
-            JOIN alunos a ON p.aluno_id = a.id
-            JOIN disciplinas d ON p.disciplina_id = d.id
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        print("\n📗 Presenças:")
-        for r in rows:
-            status = "Presente" if r[3] else "Faltou"
-            print(f"Aluno: {r[0]} | Disciplina: {r[1]} | Data: {r[2]} | {status}")
+    def registrar_turma(self, disciplina_id, data_aula, curso, turma, ausentes=()):
+        """
+        Regista a chamada de uma turma inteira numa só transação.
+        Todos os alunos do curso/turma ficam presentes, exceto os ids em `ausentes`.
+        Reenviar a mesma chamada não altera nada; só as linhas que mudaram são escritas.
+        Devolve (total de alunos, número de faltas).
+        """
+        ausentes = {int(a) for a in ausentes}
+        # IMMEDIATE: lê e depois escreve; com DEFERRED duas chamadas em paralelo falham ao subir o lock
+        with self.db_manager.transacao("IMMEDIATE") as conn:
+            ids = [r[0] for r in conn.execute("SELECT id FROM alunos WHERE curso=? AND turma=?", (curso, turma))]
+            conn.executemany(self.SQL_UPSERT, (
+                (aid, disciplina_id, data_aula, 0 if aid in ausentes else 1) for aid in ids
+            ))
+        faltas = len(ausentes.intersection(ids))
+        print(f"✅ Chamada registrada: {len(ids) - faltas} presentes, {faltas} faltas.")
+        return len(ids), faltas
+
+    def iterar(self, aluno_id=None, disciplina_id=None, tamanho_pagina=TAMANHO_PAGINA, depois=-1):
+        return iterar_paginado(self.db_manager, "Presenca.iterar",
+                               {"p.aluno_id": aluno_id, "p.disciplina_id": disciplina_id}, tamanho_pagina, depois)
+
+    # ---- taxas de faltas (resumos) ----
+    @staticmethod
+    def _intervalo(desde, ate):
+        return desde or "0000-01-01", ate or "9999-12-31"
+
+    def taxa_faltas(self, aluno_id, desde=None, ate=None):
+        """(aulas, faltas, taxa) do aluno entre as datas indicadas (inclusive); taxa None sem aulas."""
+        with self.db_manager.conexao() as conn:
+            presencas, faltas = conn.execute(self.SQL_FALTAS_ALUNO, (aluno_id, *self._intervalo(desde, ate))).fetchone()
+        aulas = presencas + faltas
+        return aulas, faltas, (faltas / aulas if aulas else None)
+
+    def _faltas_por_aluno(self, filtros, parametros, desde, ate, having=""):
+        filtro = "".join(f" AND {f}" for f in filtros)
+        with self.db_manager.conexao() as conn:
+            rows = conn.execute(self.SQL_FALTAS_POR_ALUNO.format(filtro=filtro) + having,
+                                (*self._intervalo(desde, ate), *parametros)).fetchall()
+        return [FaltasLinha(*r, r[5] / r[4] if r[4] else None) for r in rows]
+
+    def faltas_da_turma(self, curso, turma, desde=None, ate=None):
+        """Uma FaltasLinha por aluno da turma com aulas registadas, por id."""
+        return self._faltas_por_aluno(["a.curso = ?", "a.turma = ?"], [curso, turma], desde, ate)
+
+    def alertas(self, limite=None, min_aulas=None, curso=None, turma=None, desde=None, ate=None):
+        """Alunos com taxa de faltas ≥ limite (e pelo menos min_aulas aulas), da maior taxa para a menor."""
+        limite = self.LIMITE_FALTAS if limite is None else limite
+        min_aulas = self.MIN_AULAS if min_aulas is None else min_aulas
+        filtros, parametros = [], []
+        for coluna, valor in (("a.curso", curso), ("a.turma", turma)):
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                parametros.append(valor)
+        linhas = self._faltas_por_aluno(filtros, parametros + [min_aulas, limite], desde, ate,
+                                        " HAVING aulas >= ? AND faltas >= ? * aulas")
+        return sorted(linhas, key=lambda r: (-r.taxa, r.aluno_id))
+
+    def resumo(self, aluno_id, periodo="mes", desde=None, ate=None):
+        """Presenças e faltas do aluno por dia, semana ou mês (semana e mês também por disciplina)."""
+        tabela, coluna = self.PERIODOS[periodo]
+        disciplina = "d.nome" if tabela != "presencas_dia" else "NULL"
+        juncao = "LEFT JOIN disciplinas d ON d.id = r.disciplina_id" if tabela != "presencas_dia" else ""
+        with self.db_manager.conexao() as conn:
+            rows = conn.execute(f"""
+                SELECT r.{coluna}, {disciplina}, r.presencas, r.faltas
+                FROM {tabela} r {juncao}
+                WHERE r.aluno_id = ? AND r.{coluna} BETWEEN ? AND ?
+                ORDER BY r.{coluna}, 2
+            """, (aluno_id, *self._intervalo(desde, ate))).fetchall()
+        return [ResumoPresencaLinha(*r) for r in rows]
+
+    def imprimir_taxa(self, aluno_id):
+        aulas, faltas, taxa = self.taxa_faltas(aluno_id)
+        if not aulas:
+            print("📭 Nenhuma aula registrada.")
+            return
+        alerta = " ⚠️ acima do limite" if taxa >= self.LIMITE_FALTAS else ""
+        print(f"📊 Faltas: {faltas} de {aulas} aulas ({taxa:.1%}){alerta}")
+        por_disciplina = {}
+        for r in self.resumo(aluno_id, "mes"):
+            p, f = por_disciplina.get(r.disciplina, (0, 0))
+            por_disciplina[r.disciplina] = (p + r.presencas, f + r.faltas)
+        for disciplina, (p, f) in sorted(por_disciplina.items(), key=lambda kv: kv[0] or ""):
+            print(f"   {disciplina or '?'}: {f} faltas em {p + f} aulas")
+
+    def imprimir_faltas_da_turma(self, curso, turma):
+        linhas = self.faltas_da_turma(curso, turma)
+        if not linhas:
+            print("📭 Nenhuma presença registrada nesta turma.")
+            return
+        aulas = sum(r.aulas for r in linhas)
+        faltas = sum(r.faltas for r in linhas)
+        print(f"\n📊 Faltas da turma {curso} {turma}: {faltas} em {aulas} aulas ({faltas / aulas:.1%})")
+        for r in linhas:
+            alerta = " ⚠️" if r.taxa >= self.LIMITE_FALTAS else ""
+            print(f"ID: {r.aluno_id} | {r.nome} | {r.faltas}/{r.aulas} faltas ({r.taxa:.1%}){alerta}")
+
+    def imprimir_alertas(self, limite=None, min_aulas=None, curso=None, turma=None):
+        limite = self.LIMITE_FALTAS if limite is None else limite
+        linhas = self.alertas(limite, min_aulas, curso, turma)
+        if not linhas:
+            print(f"✅ Nenhum aluno com {limite:.0%} ou mais de faltas.")
+            return
+        print(f"\n⚠️ {len(linhas)} alunos com {limite:.0%} ou mais de faltas:")
+        for r in linhas:
+            print(f"ID: {r.aluno_id} | {r.nome} | {r.curso} {r.turma} | {r.faltas}/{r.aulas} faltas ({r.taxa:.1%})")
 
-    def listar_por_aluno(self, aluno_id):
-        conn = self.db_manager.connect()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT d.nome, p.data, p.presente
-            FROM presencas p
-            JOIN disciplinas d ON p.disciplina_id = d.id
-            WHERE p.aluno_id=?
-        """, (aluno_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        print("\n📗 Minhas presenças:")
-        for r in rows:
-            status = "Presente" if r[2] else "Faltou"
-            print(f"Disciplina: {r[0]} | Data: {r[1]} | {status}")
+    def listar_todas(self, pagina=50):
+        imprimir_paginado(self.iterar(),
+                          lambda r: f"Aluno: {r.aluno} | Disciplina: {r.disciplina} | Data: {r.data} | "
+                                    f"{'Presente' if r.presente else 'Faltou'}",
+                          "\n📗 Presenças:", "📭 Nenhuma presença registrada.", pagina)
+
+    def listar_por_aluno(self, aluno_id, pagina=50):
+        imprimir_paginado(self.iterar(aluno_id=aluno_id),
+                          lambda r: f"Disciplina: {r.disciplina} | Data: {r.data} | "
+                                    f"{'Presente' if r.presente else 'Faltou'}",
+                          "\n📗 Minhas presenças:", "📭 Nenhuma presença registrada.", pagina)
 
 
 
@@ -565,6 +903,15 @@ def main():
     banco_do_sistema.criar_tabelas()
 
     db = DatabaseManager()
+    try:
+        _menu(db)
+    finally:
+        db.fechar()
+        if db.rastreador:
+            print(db.rastreador.relatorio())
+
+
+def _menu(db):
     vagas = Vagas(db)
     auth = Auth(db)
 
@@ -574,6 +921,7 @@ def main():
     matricula_model = Matricula(db, vagas)
     nota_model = Nota(db)
     presenca_model = Presenca(db)
+    admissoes_model = admissoes.Admissoes(db, vagas)
 
     print("===== SISTEMA ESCOLAR =====")
     print("1. Login")
@@ -588,8 +936,8 @@ def main():
             return
 
     elif opc == "2":
-        # Auto-cadastro do aluno com validações e controle de vagas
-        print("\n--- Cadastro de Aluno (auto) ---")
+        # Candidatura do aluno: seriada por média quando o diretor fechar o curso
+        print("\n--- Candidatura de Aluno ---")
         nome = input("Nome completo: ").title()
         data_nasc = input("Data de nascimento (AAAA-MM-DD): ").strip()
         genero = input("Gênero (M/F): ").upper().strip()
@@ -597,43 +945,25 @@ def main():
         bilhete = input("Número do bilhete: ").upper().strip()
         turma = input("Turma desejada: ").upper().strip()
         curso = input("Curso (Informatica/Contabilidade/Finanças): ").capitalize().strip()
-        try:
-            ano = int(data_nasc.split("-")[0])
-        except Exception:
-            print("⚠️ Data inválida.")
-            return
         try:
             media = float(input("Média do certificado: ").strip())
         except Exception:
             print("⚠️ Média inválida.")
             return
 
-        valido, idade = validar_idade_e_media(ano, media)
-        if not valido:
-            print(f"⚠️ Rejeitado: idade={idade} e média={media}. Regras: 15-18 anos e média 12-20.")
-            return
-
-        # Verificar vagas
-        disponiveis = vagas.vagas_disponiveis(curso)
-        if disponiveis <= 0:
-            print(f"⚠️ Sem vagas no curso {curso}. Tente outro curso mais tarde.")
-            return
-
-        # Cadastrar aluno
-        aluno_id = aluno_model.cadastrar_aluno(nome, data_nasc, genero, bairro, bilhete, turma, curso, media)
-        if not aluno_id:
-            return
-
-        # Criar credenciais para o aluno (username = bilhete, senha definida pelo aluno)
+        # Credenciais ficam guardadas (em hash) até a candidatura ser admitida
         username = input("Escolha um nome de usuário (ex: seu bilhete): ").strip()
         senha = input("Escolha uma senha segura: ").strip()
-        auth.registrar_usuario(username, senha, "aluno", referencia_id=aluno_id)
-
-        # Matricular aluno automaticamente e ocupar vaga
         ano_letivo = input("Ano letivo para matrícula (ex: 2025): ").strip()
-        matricula_ok = matricula_model.adicionar(aluno_id, curso, ano_letivo)
-        if matricula_ok:
-            print("🎉 Cadastro e matrícula concluídos! Faça login com seu usuário.")
+
+        candidatura_id, estado = admissoes_model.candidatar(nome, data_nasc, genero, bairro, bilhete, turma, curso,
+                                                            media, username, senha, ano_letivo)
+        if estado == "admitida":
+            print("🎉 Admitido e matriculado! Faça login com seu usuário.")
+        elif estado == "em_espera":
+            print(f"⏳ Sem vagas em {curso}: está na posição {admissoes_model.posicao(candidatura_id)} da lista de espera.")
+        elif estado == "pendente":
+            print(f"📨 Candidatura nº {candidatura_id} registada. A seriação por média é feita quando fecharem as candidaturas.")
         return
 
     elif opc == "3":
@@ -665,7 +995,8 @@ def main():
             print("6. Gerenciar Presenças")
             print("7. Gerenciar Vagas")
             print("8. Criar usuário (professor/aluno)")
-            print("9. Sair")
+            print("9. Estatísticas da escola")
+            print("10. Sair")
             escolha = input("Escolha: ").strip()
 
             if escolha == "1":
@@ -674,7 +1005,8 @@ def main():
                     print("1. Listar alunos")
                     print("2. Ver dados do aluno por ID")
                     print("3. Atualizar alunos")
-                    print("4.Voltar")
+                    print("4. Pesquisar aluno")
+                    print("5. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
                         aluno_model.listar()
@@ -686,7 +1018,9 @@ def main():
                         opcao = int(input("Digite a sua opção: "))
                         aluno_model.listar()
                         aluno_model.atualizar(opcao)
-                    elif s==4:
+                    elif s == "4":
+                        aluno_model.imprimir_pesquisa(input("Nome, bairro, bilhete, turma ou curso: "))
+                    elif s == "5":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -696,7 +1030,8 @@ def main():
                     print("\n-- Professores --")
                     print("1. Cadastrar professor")
                     print("2. Listar professores")
-                    print("3. Voltar")
+                    print("3. Pesquisar professor")
+                    print("4. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
                         nome = input("Nome: ").title()
@@ -707,6 +1042,8 @@ def main():
                     elif s == "2":
                         professor_model.listar()
                     elif s == "3":
+                        professor_model.imprimir_pesquisa(input("Nome, especialidade ou email: "))
+                    elif s == "4":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -716,7 +1053,8 @@ def main():
                     print("\n-- Disciplinas --")
                     print("1. Cadastrar disciplina")
                     print("2. Listar disciplinas")
-                    print("3. Voltar")
+                    print("3. Currículo de um curso")
+                    print("4. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
                         nome = input("Nome da disciplina: ").title()
@@ -726,6 +1064,10 @@ def main():
                     elif s == "2":
                         disciplina_model.listar()
                     elif s == "3":
+                        curso = input(f"Curso ({'/'.join(disciplina_model.cursos())}): ").strip().title()
+                        classe = input("Classe (Enter para todas): ").strip().upper() or None
+                        disciplina_model.listar_por_curso(curso, classe)
+                    elif s == "4":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -740,8 +1082,7 @@ def main():
                     if s == "1":
                         matricula_model.listar()
                     elif s == "2":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
                         curso = input("Curso: ").title()
                         ano = input("Ano letivo: ").strip()
                         matricula_model.adicionar(aid, curso, ano)
@@ -755,21 +1096,23 @@ def main():
                     print("\n-- Notas --")
                     print("1. Adicionar nota")
                     print("2. Listar todas as notas")
-                    print("3. Voltar")
+                    print("3. Boletins de uma turma")
+                    print("4. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
-                        disciplina_model.listar()
-                        did = int(input("ID da disciplina: "))
-                        tri = input("Trimestre: ")
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
+                        did = pedir_id("ID da disciplina", disciplina_model.listar)
+                        tri = input("Trimestre (1º, 2º ou 3º): ")
                         val = float(input("Nota (0-20): "))
                         nota_model.adicionar(aid, did, tri, val)
                     elif s == "2":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
                         nota_model.listar_por_aluno(aid)
                     elif s == "3":
+                        curso = input("Curso: ").title()
+                        turma = input("Turma: ").upper()
+                        nota_model.gerar_boletins(curso, turma)
+                    elif s == "4":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -779,19 +1122,36 @@ def main():
                     print("\n-- Presenças --")
                     print("1. Registrar presença")
                     print("2. Listar presenças")
-                    print("3. Voltar")
+                    print("3. Registrar chamada da turma")
+                    print("4. Faltas de uma turma")
+                    print("5. Alunos acima do limite de faltas")
+                    print("6. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
-                        disciplina_model.listar()
-                        did = int(input("ID da disciplina: "))
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
+                        did = pedir_id("ID da disciplina", disciplina_model.listar)
                         data_aula = input("Data (AAAA-MM-DD): ")
                         falta = input("Faltou? (S/N): ").upper()
                         presenca_model.registrar(aid, did, data_aula, False if falta == "S" else True)
                     elif s == "2":
                         presenca_model.listar_todas()
                     elif s == "3":
+                        curso = input("Curso: ").title()
+                        turma = input("Turma: ").upper()
+                        aluno_model.listar_alunos_de_um_curso(curso, turma)
+                        did = pedir_id("ID da disciplina", lambda: disciplina_model.listar_por_curso(curso))
+                        data_aula = input("Data (AAAA-MM-DD): ")
+                        faltas = input("IDs dos alunos que faltaram (separados por vírgula): ")
+                        ausentes = [int(x) for x in faltas.replace(" ", "").split(",") if x]
+                        presenca_model.registrar_turma(did, data_aula, curso, turma, ausentes)
+                    elif s == "4":
+                        curso = input("Curso: ").title()
+                        turma = input("Turma: ").upper()
+                        presenca_model.imprimir_faltas_da_turma(curso, turma)
+                    elif s == "5":
+                        limite = input(f"Limite de faltas em % (Enter para {presenca_model.LIMITE_FALTAS:.0%}): ").strip()
+                        presenca_model.imprimir_alertas(float(limite.rstrip("%")) / 100 if limite else None)
+                    elif s == "6":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -801,7 +1161,9 @@ def main():
                     print("\n-- Vagas --")
                     print("1. Listar vagas")
                     print("2. Ajustar total de vagas por curso")
-                    print("3. Voltar")
+                    print("3. Fechar candidaturas e admitir por média")
+                    print("4. Lista de espera")
+                    print("5. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
                         vagas.listar_vagas()
@@ -810,6 +1172,15 @@ def main():
                         novo = int(input("Novo total de vagas: "))
                         vagas.ajustar_vagas(curso, novo)
                     elif s == "3":
+                        curso = input("Curso: ").title()
+                        ano_letivo = input("Ano letivo: ").strip()
+                        admitidas, em_espera = admissoes_model.fechar(curso, ano_letivo)
+                        print(f"✅ Candidaturas de {curso} fechadas: {len(admitidas)} admitido(s), {em_espera} em lista de espera.")
+                    elif s == "4":
+                        curso = input("Curso: ").title()
+                        ano_letivo = input("Ano letivo (Enter = último fechado): ").strip() or None
+                        admissoes_model.imprimir_lista_espera(curso, ano_letivo)
+                    elif s == "5":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -823,8 +1194,7 @@ def main():
                 else:
                     if tipo_u == "aluno":
                         # deve existir aluno previamente (ou criar)
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno (ou 0 para cancelar): "))
+                        aid = pedir_id("ID do aluno (ou 0 para cancelar)", aluno_model.listar, aluno_model.imprimir_pesquisa)
                         if aid == 0:
                             continue
                         username = input("Username: ").strip()
@@ -836,6 +1206,14 @@ def main():
                         senha = input("Senha: ").strip()
                         auth.registrar_usuario(username, senha, "professor")
             elif escolha == "9":
+                # pandas/NumPy só são precisos para esta opção
+                try:
+                    import estatisticas
+                except ImportError as e:
+                    print(f"⚠️ Estatísticas indisponíveis: falta o pacote {e.name}.")
+                    continue
+                estatisticas.imprimir_relatorio(estatisticas.carregar(db))
+            elif escolha == "10":
                 print("👋 Saindo...")
                 auth.logout()
                 break
@@ -863,11 +1241,9 @@ def main():
                     print("3. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
-                        disciplina_model.listar()
-                        did = int(input("ID da disciplina: "))
-                        tri = input("Trimestre: ")
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
+                        did = pedir_id("ID da disciplina", disciplina_model.listar)
+                        tri = input("Trimestre (1º, 2º ou 3º): ")
                         val = float(input("Nota (0-20): "))
                         nota_model.adicionar(aid, did, tri, val)
                     elif s == "2":
@@ -882,19 +1258,27 @@ def main():
                     print("\n-- Presenças (Professor) --")
                     print("1. Registrar presença")
                     print("2. Listar presenças")
-                    print("3. Voltar")
+                    print("3. Registrar chamada da turma")
+                    print("4. Voltar")
                     s = input("Escolha: ").strip()
                     if s == "1":
-                        aluno_model.listar()
-                        aid = int(input("ID do aluno: "))
-                        disciplina_model.listar()
-                        did = int(input("ID da disciplina: "))
+                        aid = pedir_id("ID do aluno", aluno_model.listar, aluno_model.imprimir_pesquisa)
+                        did = pedir_id("ID da disciplina", disciplina_model.listar)
                         data_aula = input("Data (AAAA-MM-DD): ")
                         falta = input("Faltou? (S/N): ").upper()
                         presenca_model.registrar(aid, did, data_aula, False if falta == "S" else True)
                     elif s == "2":
                         presenca_model.listar_todas()
                     elif s == "3":
+                        curso = input("Curso: ").title()
+                        turma = input("Turma: ").upper()
+                        aluno_model.listar_alunos_de_um_curso(curso, turma)
+                        did = pedir_id("ID da disciplina", lambda: disciplina_model.listar_por_curso(curso))
+                        data_aula = input("Data (AAAA-MM-DD): ")
+                        faltas = input("IDs dos alunos que faltaram (separados por vírgula): ")
+                        ausentes = [int(x) for x in faltas.replace(" ", "").split(",") if x]
+                        presenca_model.registrar_turma(did, data_aula, curso, turma, ausentes)
+                    elif s == "4":
                         break
                     else:
                         print("⚠️ Opção inválida.")
@@ -926,6 +1310,7 @@ def main():
             elif escolha == "2":
                 nota_model.listar_por_aluno(aluno_id)
             elif escolha == "3":
+                presenca_model.imprimir_taxa(aluno_id)
                 presenca_model.listar_por_aluno(aluno_id)
             elif escolha == "4":
                 auth.logout()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do sistema estão na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import banco_do_sistema  # noqa: E402
+import senhas  # noqa: E402
+from sistema import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def scrypt_barato(monkeypatch):
+    # Hashes com custo baixo: os testes criam muitos usuários
+    monkeypatch.setattr(senhas, "SCRYPT_N", 2 ** 10)
+
+
+@pytest.fixture
+def caminho_db(tmp_path):
+    """Banco vazio com as tabelas do sistema."""
+    caminho = str(tmp_path / "escola.db")
+    banco_do_sistema.criar_tabelas(caminho)
+    return caminho
+
+
+@pytest.fixture
+def db(caminho_db):
+    db = DatabaseManager(caminho_db, tamanho_pool=2, diferir_escritas=False)
+    yield db
+    db.fechar()
@@ -0,0 +1,147 @@
+from datetime import date
+
+import pytest
+
+import importacao
+from admissoes import Admissoes
+from sistema import Vagas
+
+NASCIMENTO = f"{date.today().year - 16}-03-01"
+
+
+@pytest.fixture
+def admissoes(db):
+    vagas = Vagas(db)
+    vagas.ajustar_vagas("Informatica", 2)
+    return Admissoes(db, vagas)
+
+
+def _candidatar(admissoes, nome, media, ano_letivo="2026", curso="Informatica", username=None):
+    username = username or nome.lower()
+    return admissoes.candidatar(nome, NASCIMENTO, "F", "Centro", f"BI-{nome}", "A", curso, media,
+                                username, "senha-" + username, ano_letivo)
+
+
+def _estado(db, cid):
+    with db.conexao() as conn:
+        return conn.execute("SELECT estado FROM candidaturas WHERE id=?", (cid,)).fetchone()[0]
+
+
+def test_fechar_admite_por_media_e_desempata_pela_ordem_de_chegada(db, admissoes):
+    ids = {nome: _candidatar(admissoes, nome, media)[0]
+           for nome, media in [("Bia", 14), ("Caio", 18), ("Dora", 16), ("Edu", 18)]}
+    assert all(_estado(db, cid) == "pendente" for cid in ids.values())
+
+    admitidas, em_espera = admissoes.fechar("Informatica", "2026")
+    assert admitidas == [ids["Caio"], ids["Edu"]]
+    assert em_espera == 2
+    assert [c.nome for c in admissoes.lista_espera("Informatica")] == ["Dora", "Bia"]
+    assert admissoes.posicao(ids["Dora"]) == 1
+    assert admissoes.posicao(ids["Bia"]) == 2
+    assert admissoes.posicao(ids["Caio"]) is None
+
+    with db.conexao() as conn:
+        assert conn.execute("SELECT vagas_ocupadas FROM vagas WHERE curso='Informatica'").fetchone()[0] == 2
+        assert conn.execute("""
+            SELECT COUNT(*) FROM candidaturas c
+            JOIN alunos a ON a.id = c.aluno_id
+            JOIN usuarios u ON u.referencia_id = a.id AND u.username = c.username
+            JOIN matriculas m ON m.aluno_id = a.id AND m.ano_letivo = '2026'
+            WHERE c.estado = 'admitida'
+        """).fetchone()[0] == 2
+
+
+def test_vaga_libertada_promove_o_primeiro_da_fila_do_ano_fechado(db, admissoes):
+    ids = {nome: _candidatar(admissoes, nome, media)[0] for nome, media in [("Bia", 14), ("Caio", 18), ("Dora", 16)]}
+    admissoes.fechar("Informatica", "2026")
+    # Candidatura do ano seguinte, ainda aberta: não entra na fila de 2026
+    futuro, estado = _candidatar(admissoes, "Zeca", 20, ano_letivo="2027")
+    assert estado == "pendente"
+
+    assert admissoes.vagas_manager.ajustar_vagas("Informatica", 3) == [ids["Bia"]]
+    assert admissoes.lista_espera("Informatica") == []
+    assert _estado(db, futuro) == "pendente"
+
+    # Com o ano fechado, quem chega entra direto na fila (ou é admitido se houver vaga)
+    cid, estado = _candidatar(admissoes, "Gil", 13)
+    assert estado == "em_espera"
+    assert admissoes.posicao(cid) == 1
+    assert admissoes.vagas_manager.liberar_vaga("Informatica") == [cid]
+    assert admissoes.vagas_manager.ajustar_vagas("Informatica", 4) == []
+    assert _candidatar(admissoes, "Hugo", 12)[1] == "admitida"
+    assert _estado(db, ids["Dora"]) == "admitida"
+
+
+def test_candidaturas_recusadas(admissoes):
+    bia, _ = _candidatar(admissoes, "Bia", 14)
+    assert bia is not None
+    # Usuário já usado por uma candidatura ativa
+    assert _candidatar(admissoes, "Outra", 15, username="bia") == (None, None)
+    # Mesmo bilhete no mesmo ano letivo
+    assert admissoes.candidatar("Bia 2", NASCIMENTO, "F", "Centro", "BI-Bia", "A", "Informatica", 15,
+                                "bia2", "x", "2026") == (None, None)
+    # Gênero, média e curso inválidos
+    assert admissoes.candidatar("Rui", NASCIMENTO, "X", "Centro", "BI-Rui", "A", "Informatica", 15,
+                                "rui", "x", "2026") == (None, None)
+    assert _candidatar(admissoes, "Ana", 11) == (None, None)
+    assert _candidatar(admissoes, "Ivo", 15, curso="Medicina") == (None, None)
+    # Desistir tira da fila; não se desiste duas vezes
+    assert admissoes.desistir(bia)
+    assert not admissoes.desistir(bia)
+
+
+def _arquivo_candidatos(tmp_path, candidatos):
+    arquivo = tmp_path / "candidatos.csv"
+    linhas = ["nome,data_nascimento,genero,bairro,numero_bilhete,turma,curso,media_certificado,senha"]
+    linhas += [f"{nome},{NASCIMENTO},M,Centro,BI-{nome},A,Informatica,{media},senha-{nome}" for nome, media in candidatos]
+    arquivo.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(arquivo)
+
+
+def test_importar_candidatos_so_fecha_a_pedido(db, admissoes, tmp_path):
+    menu, _ = _candidatar(admissoes, "Bia", 19)
+    arquivo = _arquivo_candidatos(tmp_path, [("Caio", 18), ("Dora", 16)])
+
+    rel = importacao.importar_candidatos(db, arquivo, "2026")
+    assert (rel["candidaturas"], rel["pendentes"], rel["aceites"]) == (2, 2, 0)
+    # A candidatura feita pelo menu continua pendente e o curso aberto
+    assert _estado(db, menu) == "pendente"
+    assert admissoes.lista_espera("Informatica", "2026") == []
+
+    # Com fechar=True é seriado o curso inteiro, incluindo a candidatura do menu
+    rel = importacao.importar_candidatos(db, _arquivo_candidatos(tmp_path, [("Edu", 17)]), "2026", fechar=True)
+    assert (rel["aceites"], rel["em_espera"]) == (0, 1)
+    assert _estado(db, menu) == "admitida"
+    assert [c.nome for c in admissoes.lista_espera("Informatica")] == ["Edu", "Dora"]
+
+
+def test_importar_candidatos_num_curso_fechado_entra_na_fila(db, admissoes, tmp_path):
+    admissoes.fechar("Informatica", "2026")
+    rel = importacao.importar_candidatos(db, _arquivo_candidatos(tmp_path, [("Caio", 14), ("Dora", 16), ("Edu", 15)]),
+                                         "2026")
+    assert (rel["aceites"], rel["em_espera"], rel["pendentes"]) == (2, 1, 0)
+    assert [c.nome for c in admissoes.lista_espera("Informatica")] == ["Caio"]
+
+
+def test_fechar_admite_em_lotes_e_isola_o_conflito(db, admissoes, tmp_path):
+    admissoes.vagas_manager.ajustar_vagas("Informatica", 5)
+    candidatos = [("Caio", 18), ("Dora", 17), ("Edu", 16), ("Fabio", 15), ("Gil", 14), ("Hugo", 13)]
+    importacao.importar_candidatos(db, _arquivo_candidatos(tmp_path, candidatos), "2026", tamanho_lote=2)
+    # Usuário criado entretanto com o nome de uma candidatura: o lote dela é refeito um a um
+    with db.transacao() as conn:
+        conn.execute("INSERT INTO usuarios (username, senha, tipo) VALUES ('BI-EDU', 'x', 'diretor')")
+
+    admitidas, em_espera = admissoes.fechar("Informatica", "2026", tamanho_lote=2)
+    assert (len(admitidas), em_espera) == (5, 0)
+    with db.conexao() as conn:
+        admitidos = conn.execute("""
+            SELECT a.nome FROM candidaturas c
+            JOIN alunos a ON a.id = c.aluno_id
+            JOIN usuarios u ON u.referencia_id = a.id AND u.username = c.username AND u.tipo = 'aluno'
+            JOIN matriculas m ON m.aluno_id = a.id AND m.ano_letivo = '2026'
+            WHERE c.estado = 'admitida'
+            ORDER BY a.id
+        """).fetchall()
+        assert [n for (n,) in admitidos] == ["Caio", "Dora", "Fabio", "Gil", "Hugo"]
+        assert conn.execute("SELECT estado FROM candidaturas WHERE nome='Edu'").fetchone()[0] == "rejeitada"
+        assert conn.execute("SELECT vagas_ocupadas FROM vagas WHERE curso='Informatica'").fetchone()[0] == 5
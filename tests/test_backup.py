@@ -0,0 +1,71 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+import backup
+import banco_do_sistema
+
+
+def _alunos(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return [r[0] for r in conn.execute("SELECT nome FROM alunos ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _inserir_aluno(caminho, nome):
+    conn = banco_do_sistema.conectar(caminho)
+    conn.execute("INSERT INTO alunos (nome, data_nascimento, curso) VALUES (?, '2009-01-01', 'Informatica')", (nome,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("comprimir", [True, False])
+def test_criar_verificar_e_restaurar(caminho_db, tmp_path, comprimir):
+    pasta = str(tmp_path / "backups")
+    _inserir_aluno(caminho_db, "Ana")
+    snapshot = backup.criar(caminho_db, pasta, comprimir=comprimir, pausa=0)
+    assert backup.verificar(snapshot) == []
+    assert backup.listar(pasta) == [snapshot]
+
+    _inserir_aluno(caminho_db, "Beto")
+    anterior = backup.restaurar(snapshot, caminho_db, pasta)
+    assert _alunos(caminho_db) == ["Ana"]
+    # O estado de antes do restauro ficou guardado e pode ser reposto
+    assert anterior is not None and backup.verificar(anterior) == []
+    backup.restaurar(anterior, caminho_db, pasta, guardar_atual=False)
+    assert _alunos(caminho_db) == ["Ana", "Beto"]
+    assert len(backup.listar(pasta)) == 2
+
+
+def test_snapshots_seguidos_nao_se_sobrescrevem(caminho_db, tmp_path):
+    pasta = str(tmp_path / "backups")
+    criados = [backup.criar(caminho_db, pasta, pausa=0) for _ in range(3)]
+    assert len({s.caminho for s in criados}) == 3
+    assert backup.listar(pasta) == sorted(criados, key=lambda s: s.momento)
+    assert backup.escolher(pasta, ate=criados[1].momento) == criados[1]
+
+
+def test_snapshot_corrompido_nao_e_restaurado(caminho_db, tmp_path):
+    pasta = str(tmp_path / "backups")
+    _inserir_aluno(caminho_db, "Ana")
+    snapshot = backup.criar(caminho_db, pasta, pausa=0)
+    with open(snapshot.caminho, "r+b") as f:
+        f.seek(os.path.getsize(snapshot.caminho) // 2)
+        f.write(b"\0" * 64)
+    assert backup.verificar(snapshot) != []
+    with pytest.raises(sqlite3.DatabaseError):
+        backup.restaurar(snapshot, caminho_db, pasta)
+    assert _alunos(caminho_db) == ["Ana"]
+
+
+def test_nomes_antigos_com_segundos_continuam_listados(tmp_path):
+    pasta = tmp_path / "backups"
+    pasta.mkdir()
+    with gzip.open(pasta / "escola-20260101T120000Z.db.gz", "wb"):
+        pass
+    (s,) = backup.listar(str(pasta))
+    assert (s.base, s.momento.isoformat(), s.comprimido) == ("escola", "2026-01-01T12:00:00+00:00", True)
@@ -0,0 +1,62 @@
+import boletim
+from sistema import Nota
+
+
+def test_motor_sql_igual_ao_algoritmo_original():
+    for seed in range(3):
+        assert boletim.verificar_equivalencia(alunos=150, seed=seed) == []
+
+
+def _aluno_com_notas(db):
+    """Ana com 10 e 14 no 1º e 15 no 2º trimestre a Matemática, e 11 a Português."""
+    with db.transacao() as conn:
+        aluno_id = conn.execute("""
+            INSERT INTO alunos (nome, data_nascimento, genero, turma, curso)
+            VALUES ('Ana', '2009-01-01', 'F', 'A', 'Informatica')
+        """).lastrowid
+        mat, por = (conn.execute("INSERT INTO disciplinas (nome, curso, classe) VALUES (?, 'Informatica', '10º')",
+                                 (nome,)).lastrowid for nome in ("Matemática", "Português"))
+        conn.executemany("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, ?)",
+                         [(aluno_id, mat, "1º Trimestre", 10), (aluno_id, mat, "1º Trimestre", 14),
+                          (aluno_id, mat, "2º Trimestre", 15), (aluno_id, por, "1º Trimestre", 11)])
+    return aluno_id, mat, por
+
+
+def test_boletim_de_um_aluno(db):
+    aluno_id, _, _ = _aluno_com_notas(db)
+    b = boletim.gerar_boletim(db, aluno_id)
+    # Matemática: média das médias trimestrais (12 e 15) = 13.5
+    assert {d.nome: d.media_final for d in b.disciplinas} == {"Matemática": 13.5, "Português": 11.0}
+    assert [(t.trimestre, t.notas) for t in b.disciplinas[0].trimestres] == [
+        ("1º Trimestre", [10.0, 14.0]), ("2º Trimestre", [15.0])]
+    assert b.media_geral == 12.25
+    assert b.situacao == "Aprovado"
+    assert boletim.gerar_boletim(db, aluno_id + 1) is None
+
+
+def test_media_materializada_acompanha_as_notas(db):
+    aluno_id, mat, por = _aluno_com_notas(db)
+    assert boletim.media_final(db, aluno_id) == 12.25
+    assert Nota(db).calcular_media_final(aluno_id) == 12.25
+
+    # Nova nota: resumo e média atualizados na mesma transação
+    Nota(db).adicionar(aluno_id, por, "2º Trimestre", 15)
+    assert boletim.media_final(db, aluno_id) == 13.25
+
+    # Apagar notas diretamente invalida a média, que é recalculada na leitura
+    with db.transacao() as conn:
+        conn.execute("DELETE FROM notas WHERE disciplina_id=?", (por,))
+    assert boletim.media_final(db, aluno_id) == 13.5
+    assert boletim.verificar_resumos(db) == []
+
+
+def test_notas_nulas_nao_contam(db):
+    aluno_id, mat, por = _aluno_com_notas(db)
+    with db.transacao() as conn:
+        fis = conn.execute("INSERT INTO disciplinas (nome, curso, classe) VALUES ('Física', 'Informatica', '10º')").lastrowid
+        # Física só com notas por lançar; Matemática com uma a mais, nula, no 2º trimestre
+        conn.executemany("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, NULL)",
+                         [(aluno_id, fis, "1º Trimestre"), (aluno_id, mat, "2º Trimestre")])
+    b = boletim.gerar_boletim(db, aluno_id)
+    assert {d.nome: d.media_final for d in b.disciplinas} == {"Matemática": 13.5, "Português": 11.0}
+    assert b.media_geral == boletim.media_final(db, aluno_id) == 12.25
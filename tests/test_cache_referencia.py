@@ -0,0 +1,66 @@
+import pytest
+
+import banco_do_sistema
+from cache_referencia import CacheReferencia
+
+
+@pytest.fixture
+def cache(db):
+    cache = CacheReferencia(db)
+    yield cache
+    cache.fechar()
+
+
+@pytest.fixture
+def outra_conexao(caminho_db):
+    # Outra conexão (como a de outro processo), fora do pool do DatabaseManager
+    conn = banco_do_sistema.conectar(caminho_db)
+    yield conn
+    conn.close()
+
+
+class Leitor:
+    """carregar(conn) que conta quantas vezes foi à base."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.leituras = 0
+
+    def __call__(self, conn):
+        self.leituras += 1
+        return [tuple(r) for r in conn.execute(self.sql)]
+
+
+def test_escrita_de_outra_conexao_renova_a_cache(cache, outra_conexao):
+    disciplinas = Leitor("SELECT nome FROM disciplinas ORDER BY id")
+    assert cache.obter("disciplinas", "todas", disciplinas) == []
+    assert cache.obter("disciplinas", "todas", disciplinas) == []
+    assert disciplinas.leituras == 1
+
+    outra_conexao.execute("INSERT INTO disciplinas (nome, curso, classe) VALUES ('Física', 'Informatica', '10º')")
+    outra_conexao.commit()
+    assert cache.obter("disciplinas", "todas", disciplinas) == [("Física",)]
+    assert disciplinas.leituras == 2
+    assert cache.estatisticas()["mudancas_detetadas"] == 1
+    assert cache.obter("disciplinas", "todas", disciplinas) == [("Física",)]
+    assert disciplinas.leituras == 2
+
+
+def test_escrita_noutra_tabela_nao_invalida(cache, outra_conexao):
+    disciplinas = Leitor("SELECT nome FROM disciplinas ORDER BY id")
+    vagas = Leitor("SELECT curso, total_vagas FROM vagas ORDER BY curso")
+    cache.obter("disciplinas", "todas", disciplinas)
+    antes = cache.obter("vagas", "todas", vagas)
+
+    # Tabela sem versão (alunos) e outra tabela de referência (vagas)
+    outra_conexao.execute("""
+        INSERT INTO alunos (nome, data_nascimento, genero, turma, curso)
+        VALUES ('Ana', '2009-01-01', 'F', 'A', 'Informatica')
+    """)
+    outra_conexao.execute("UPDATE vagas SET total_vagas = total_vagas + 1 WHERE curso='Informatica'")
+    outra_conexao.commit()
+
+    cache.obter("disciplinas", "todas", disciplinas)
+    assert disciplinas.leituras == 1
+    assert cache.obter("vagas", "todas", vagas) != antes
+    assert vagas.leituras == 2
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+
+import pytest
+
+from escrita_diferida import EscritaDiferida
+from sistema import Nota
+
+
+@pytest.fixture
+def escrita(db):
+    escrita = EscritaDiferida(db)
+    yield escrita
+    escrita.fechar()
+
+
+@pytest.fixture
+def aluno_e_disciplina(db):
+    with db.transacao() as conn:
+        aluno_id = conn.execute("""
+            INSERT INTO alunos (nome, data_nascimento, genero, turma, curso)
+            VALUES ('Ana', '2009-01-01', 'F', 'A', 'Informatica')
+        """).lastrowid
+        disciplina_id = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Matemática', 'Informatica', '10º')").lastrowid
+    return aluno_id, disciplina_id
+
+
+def _nota(aluno_id, disciplina_id, valor):
+    return lambda conn: conn.execute("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, ?, ?)",
+                                     (aluno_id, disciplina_id, "1º Trimestre", valor)).lastrowid
+
+
+def _notas(db):
+    with db.conexao() as conn:
+        return [r[0] for r in conn.execute("SELECT nota FROM notas ORDER BY id")]
+
+
+def _segurar_escritor(escrita):
+    """Ocupa a thread escritora até o evento devolvido ser ativado; o que vier depois junta-se num lote."""
+    ocupado, soltar = threading.Event(), threading.Event()
+    escrita.submeter(lambda conn: (ocupado.set(), soltar.wait()))
+    ocupado.wait()
+    return soltar
+
+
+def test_lote_com_uma_operacao_invalida_grava_as_outras(db, escrita, aluno_e_disciplina):
+    aluno_id, disciplina_id = aluno_e_disciplina
+    soltar = _segurar_escritor(escrita)
+    futuros = [escrita.submeter(_nota(aluno_id, disciplina_id, 10)),
+               escrita.submeter(_nota(aluno_id + 99, disciplina_id, 11)),  # aluno inexistente
+               escrita.submeter(_nota(aluno_id, disciplina_id, 12))]
+    soltar.set()
+
+    assert futuros[0].result(5) > 0
+    with pytest.raises(sqlite3.IntegrityError):
+        futuros[1].result(5)
+    assert futuros[2].result(5) > futuros[0].result()
+    assert _notas(db) == [10, 12]
+    estado = escrita.estatisticas()
+    # As três foram no mesmo lote (o primeiro é o que segurou o escritor)
+    assert (estado["lotes"], estado["maior_lote"], estado["gravadas"], estado["falhadas"]) == (2, 3, 3, 1)
+
+
+def test_group_commit_e_fechar_grava_a_fila(db, escrita, aluno_e_disciplina):
+    aluno_id, disciplina_id = aluno_e_disciplina
+    soltar = _segurar_escritor(escrita)
+    futuros = [escrita.submeter(_nota(aluno_id, disciplina_id, n)) for n in range(20)]
+    # Ainda nada gravado: a primeira transação está aberta, as outras na fila
+    assert not any(f.done() for f in futuros)
+    soltar.set()
+    escrita.esvaziar(5)
+    assert all(f.done() for f in futuros)
+    assert escrita.estatisticas()["lotes"] <= 3
+
+    ultimos = [escrita.submeter(_nota(aluno_id, disciplina_id, 20)) for _ in range(5)]
+    escrita.fechar()
+    assert all(f.result(0) for f in ultimos)
+    assert _notas(db) == list(range(20)) + [20] * 5
+    with pytest.raises(sqlite3.ProgrammingError):
+        escrita.submeter(_nota(aluno_id, disciplina_id, 1))
+
+
+def test_nota_dentro_de_uma_transacao_grava_nela(db, escrita, aluno_e_disciplina, monkeypatch):
+    monkeypatch.setattr(db, "escrita", escrita)
+    notas = Nota(db)
+    # O escritor precisaria do lock desta transação: esperar por ele seria um deadlock
+    with db.transacao("IMMEDIATE"):
+        assert notas.adicionar(*aluno_e_disciplina, "1º Trimestre", 12) is True
+    with pytest.raises(RuntimeError):
+        with db.transacao("IMMEDIATE"):
+            assert notas.adicionar(*aluno_e_disciplina, "1º Trimestre", 15) is True
+            raise RuntimeError("desfaz a transação e a nota com ela")
+    assert _notas(db) == [12.0]
+    assert escrita.gravadas == 0
+
+    # Fora de uma transação a nota vai pela fila
+    assert notas.adicionar(*aluno_e_disciplina, "2º Trimestre", 14) is True
+    assert escrita.gravadas == 1
+    assert _notas(db) == [12.0, 14.0]
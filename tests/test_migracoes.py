@@ -0,0 +1,63 @@
+import os
+import shutil
+import sqlite3
+
+import banco_do_sistema
+import boletim
+from sistema import DatabaseManager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ULTIMA = banco_do_sistema.MIGRACOES[-1][0]
+
+
+def _objetos(conn, tipo):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type=?", (tipo,))}
+
+
+def test_banco_vazio_migra_ate_a_ultima_versao(tmp_path):
+    conn = banco_do_sistema.conectar(str(tmp_path / "vazio.db"))
+    try:
+        assert banco_do_sistema.versao_esquema(conn) == 0
+        assert banco_do_sistema.migrar(conn) == [v for v, _, _ in banco_do_sistema.MIGRACOES]
+        assert banco_do_sistema.versao_esquema(conn) == ULTIMA
+        # Segunda vez não aplica nada
+        assert banco_do_sistema.migrar(conn) == []
+
+        assert {"alunos", "notas", "presencas", "matriculas", "usuarios", "schema_version"} <= _objetos(conn, "table")
+        assert {"idx_notas_aluno", "uq_presencas_aula", "idx_matriculas_curso"} <= _objetos(conn, "index")
+        assert {"idx_candidaturas_fila", "uq_candidaturas_username"} <= _objetos(conn, "index")
+        # Consultas quentes de todos os módulos, incluindo a fila de admissões por ano letivo
+        assert banco_do_sistema.verificar_planos(conn, banco_do_sistema._todas_consultas_quentes()) == []
+    finally:
+        conn.close()
+
+
+def test_banco_legado_migra_sem_perder_dados(tmp_path):
+    # banco_escolar.db do repositório é um banco anterior às migrações (versão 0)
+    caminho = str(tmp_path / "legado.db")
+    shutil.copyfile(os.path.join(RAIZ, "banco_escolar.db"), caminho)
+    origem = sqlite3.connect(caminho)
+    contagens = {t: origem.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                 for t in ("alunos", "notas", "disciplinas", "usuarios")}
+    origem.close()
+
+    conn = banco_do_sistema.conectar(caminho)
+    try:
+        assert banco_do_sistema.versao_esquema(conn) == 0
+        banco_do_sistema.migrar(conn)
+        assert banco_do_sistema.versao_esquema(conn) == ULTIMA
+        for tabela, total in contagens.items():
+            assert conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] == total
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        # "1º Tri", "1ºtrimestre"... normalizados; "trimestre" (sem número) fica para correção manual
+        trimestres = {t for (t,) in conn.execute("SELECT DISTINCT trimestre FROM notas")}
+        assert trimestres == {"1º Trimestre", "2º Trimestre", "trimestre"}
+    finally:
+        conn.close()
+
+    # Resumos e médias materializados coerentes com as notas migradas
+    db = DatabaseManager(caminho, tamanho_pool=2)
+    try:
+        assert boletim.verificar_resumos(db) == []
+    finally:
+        db.fechar()
@@ -0,0 +1,56 @@
+import pytest
+
+import banco_do_sistema
+import importacao
+from sistema import Nota
+
+
+@pytest.fixture
+def aluno_e_disciplina(db):
+    with db.transacao() as conn:
+        aluno_id = conn.execute("""
+            INSERT INTO alunos (nome, data_nascimento, genero, turma, curso, numero_bilhete)
+            VALUES ('Ana', '2009-01-01', 'F', 'A', 'Informatica', 'BI-ANA')
+        """).lastrowid
+        disciplina_id = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Matemática', 'Informatica', '10º')").lastrowid
+    return aluno_id, disciplina_id
+
+
+def _trimestres(db):
+    with db.conexao() as conn:
+        return [t for (t,) in conn.execute("SELECT trimestre FROM notas ORDER BY id")]
+
+
+@pytest.mark.parametrize("texto, canonico", [
+    ("1", "1º Trimestre"), ("1º Tri", "1º Trimestre"), ("2ºtrimestre", "2º Trimestre"),
+    (" 3 TRIMESTRE ", "3º Trimestre"), ("3º Trimestre", "3º Trimestre"),
+    ("trimestre", None), ("4º Trimestre", None), ("1º semestre", None), ("", None), (None, None)])
+def test_trimestre_canonico(texto, canonico):
+    assert banco_do_sistema.trimestre_canonico(texto) == canonico
+
+
+def test_adicionar_normaliza_ou_recusa_o_trimestre(db, aluno_e_disciplina):
+    notas = Nota(db)
+    assert notas.adicionar(*aluno_e_disciplina, "1º tri", 12) is True
+    assert notas.adicionar(*aluno_e_disciplina, "trimestre", 12) is False
+    assert _trimestres(db) == ["1º Trimestre"]
+
+
+def test_adicionar_em_lote_recusa_o_lote_com_trimestre_invalido(db, aluno_e_disciplina):
+    aluno_id, disciplina_id = aluno_e_disciplina
+    notas = Nota(db)
+    assert notas.adicionar_em_lote([(aluno_id, disciplina_id, "2", 10), (aluno_id, disciplina_id, "3º", 11)]) == 2
+    with pytest.raises(ValueError):
+        notas.adicionar_em_lote([(aluno_id, disciplina_id, "1", 10), (aluno_id, disciplina_id, "5º", 11)])
+    assert _trimestres(db) == ["2º Trimestre", "3º Trimestre"]
+
+
+def test_importar_notas_usa_o_mesmo_trimestre_canonico(db, aluno_e_disciplina, tmp_path):
+    arquivo = tmp_path / "notas.csv"
+    arquivo.write_text("numero_bilhete,disciplina,trimestre,nota\n"
+                       "bi-ana,Matemática,1º Tri,14\n"
+                       "BI-ANA,Matemática,trimestre,9\n", encoding="utf-8")
+    relatorio = importacao.importar_notas(db, str(arquivo), caminho_rejeitados=str(tmp_path / "rejeitados.csv"))
+    assert (relatorio["inseridas"], relatorio["rejeitadas"]) == (1, 1)
+    assert _trimestres(db) == ["1º Trimestre"]
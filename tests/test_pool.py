@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+
+import pytest
+
+from banco_do_sistema import PoolConexoes
+
+
+@pytest.fixture
+def pool(caminho_db):
+    pool = PoolConexoes(caminho_db, tamanho_max=2, timeout=0.2)
+    yield pool
+    pool.fechar()
+
+
+def _vagas_teste(pool):
+    with pool.conexao() as conn:
+        return conn.execute("SELECT COUNT(*) FROM vagas WHERE curso LIKE 'Teste%'").fetchone()[0]
+
+
+def test_mesma_thread_reutiliza_a_conexao_ate_ao_ultimo_close(pool):
+    externa = pool.obter()
+    interna = pool.obter()
+    assert interna is externa
+    interna.close()
+    # Ainda emprestada: o close() interno só baixou o contador
+    assert pool.estatisticas()["em_uso"] == 1
+    externa.close()
+    estado = pool.estatisticas()
+    assert (estado["abertas"], estado["livres"], estado["em_uso"], estado["checkouts"]) == (1, 1, 0, 1)
+    with pool.conexao() as conn:
+        assert conn is externa
+
+
+def test_threads_diferentes_e_limite_do_pool(pool):
+    emprestadas = []
+    soltar = threading.Event()
+    prontas = threading.Barrier(3)
+
+    def segurar():
+        with pool.conexao() as conn:
+            emprestadas.append(conn)
+            prontas.wait()
+            soltar.wait()
+
+    threads = [threading.Thread(target=segurar) for _ in range(2)]
+    for t in threads:
+        t.start()
+    prontas.wait()
+    try:
+        assert emprestadas[0] is not emprestadas[1]
+        # As duas conexões estão emprestadas: a terceira thread espera e desiste
+        with pytest.raises(TimeoutError):
+            pool.obter()
+    finally:
+        soltar.set()
+        for t in threads:
+            t.join()
+    assert pool.estatisticas()["livres"] == 2
+
+
+def test_transacao_confirma_ou_desfaz(pool):
+    with pool.transacao() as externa:
+        externa.execute("INSERT INTO vagas (curso, total_vagas) VALUES ('Teste A', 1)")
+        # Aninhada: reutiliza a transação de fora
+        with pool.transacao() as interna:
+            assert interna is externa
+            interna.execute("INSERT INTO vagas (curso, total_vagas) VALUES ('Teste B', 1)")
+        assert externa.in_transaction
+    assert _vagas_teste(pool) == 2
+
+    with pytest.raises(ValueError):
+        with pool.transacao("IMMEDIATE") as conn:
+            conn.execute("INSERT INTO vagas (curso, total_vagas) VALUES ('Teste C', 1)")
+            raise ValueError("falhou a meio")
+    assert _vagas_teste(pool) == 2
+
+
+def test_close_com_transacao_aberta_faz_rollback(pool):
+    conn = pool.obter()
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO vagas (curso, total_vagas) VALUES ('Teste', 1)")
+    conn.close()
+    assert not conn.in_transaction
+    assert _vagas_teste(pool) == 0
+
+
+def test_fechar_fecha_livres_e_as_que_voltarem(pool):
+    emprestada = threading.Event()
+    devolver = threading.Event()
+
+    def usar():
+        with pool.conexao():
+            emprestada.set()
+            devolver.wait()
+
+    t = threading.Thread(target=usar)
+    t.start()
+    try:
+        emprestada.wait()
+        livre = pool.obter()
+        livre.close()
+        pool.fechar()
+        # A livre fecha já; a emprestada só quando voltar
+        assert pool.estatisticas()["abertas"] == 1
+        with pytest.raises(sqlite3.ProgrammingError):
+            livre.execute("SELECT 1")
+        with pytest.raises(sqlite3.ProgrammingError):
+            pool.obter()
+    finally:
+        devolver.set()
+        t.join()
+    assert pool.estatisticas()["abertas"] == 0
@@ -0,0 +1,116 @@
+import sqlite3
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from sistema import Presenca
+
+DATA = "2026-03-02"
+
+
+@pytest.fixture
+def turma(db):
+    """Disciplina e três alunos da turma Informatica/A. Devolve (disciplina_id, [aluno_ids])."""
+    with db.transacao() as conn:
+        disciplina_id = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Matemática', 'Informatica', '10º')").lastrowid
+        alunos = [conn.execute("""
+            INSERT INTO alunos (nome, data_nascimento, genero, turma, curso)
+            VALUES (?, '2009-01-01', 'M', 'A', 'Informatica')
+        """, (nome,)).lastrowid for nome in ("Ana", "Beto", "Caio")]
+    return disciplina_id, alunos
+
+
+def _chamada(db, disciplina_id):
+    with db.conexao() as conn:
+        return conn.execute("""
+            SELECT aluno_id, presente FROM presencas WHERE disciplina_id=? AND data=? ORDER BY aluno_id
+        """, (disciplina_id, DATA)).fetchall()
+
+
+def test_repetir_a_chamada_nao_duplica_e_atualiza_presente(db, turma):
+    disciplina_id, (ana, beto, caio) = turma
+    presencas = Presenca(db)
+    assert presencas.registrar_turma(disciplina_id, DATA, "Informatica", "A", ausentes=[beto]) == (3, 1)
+    assert presencas.registrar_turma(disciplina_id, DATA, "Informatica", "A", ausentes=[beto]) == (3, 1)
+    assert _chamada(db, disciplina_id) == [(ana, 1), (beto, 0), (caio, 1)]
+
+    # Correção da chamada: o Beto afinal veio e a Ana faltou
+    assert presencas.registrar_turma(disciplina_id, DATA, "Informatica", "A", ausentes=[ana]) == (3, 1)
+    assert _chamada(db, disciplina_id) == [(ana, 0), (beto, 1), (caio, 1)]
+
+
+def test_aluno_recusado_desfaz_a_chamada_inteira(db, turma):
+    disciplina_id, (ana, beto, caio) = turma
+    presencas = Presenca(db)
+    presencas.registrar_turma(disciplina_id, DATA, "Informatica", "A")
+    with db.transacao() as conn:
+        # Simula um aluno cuja linha é recusada a meio do lote
+        conn.execute(f"""
+            CREATE TRIGGER recusar_aluno BEFORE UPDATE ON presencas WHEN NEW.aluno_id = {caio}
+            BEGIN SELECT RAISE(ABORT, 'aluno inválido'); END
+        """)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        presencas.registrar_turma(disciplina_id, DATA, "Informatica", "A", ausentes=[ana, beto, caio])
+    # Nem a Ana nem o Beto, escritos antes do Caio no mesmo lote, ficaram com falta
+    assert _chamada(db, disciplina_id) == [(ana, 1), (beto, 1), (caio, 1)]
+
+
+def _resumos_esperados(db):
+    """Os três resumos recalculados em Python a partir de presencas."""
+    dia, semana, mes = Counter(), Counter(), Counter()
+    with db.conexao() as conn:
+        for aluno_id, disciplina_id, data, presente in conn.execute(
+                "SELECT aluno_id, disciplina_id, data, presente FROM presencas"):
+            d = date.fromisoformat(data)
+            contagem = Counter({"presencas": presente, "faltas": 1 - presente})
+            for resumo, chave in ((dia, (aluno_id, data)),
+                                  (semana, (aluno_id, str(d - timedelta(days=d.weekday())), disciplina_id)),
+                                  (mes, (aluno_id, str(d.replace(day=1)), disciplina_id))):
+                resumo[chave + ("presencas",)] += contagem["presencas"]
+                resumo[chave + ("faltas",)] += contagem["faltas"]
+
+    def linhas(resumo):
+        chaves = sorted({k[:-1] for k in resumo})
+        return [(*k, resumo[k + ("presencas",)], resumo[k + ("faltas",)]) for k in chaves]
+    return linhas(dia), linhas(semana), linhas(mes)
+
+
+def _resumos(db):
+    with db.conexao() as conn:
+        return tuple(conn.execute(sql).fetchall() for sql in (
+            "SELECT aluno_id, data, presencas, faltas FROM presencas_dia ORDER BY 1, 2",
+            "SELECT aluno_id, semana, disciplina_id, presencas, faltas FROM presencas_semana ORDER BY 1, 2, 3",
+            "SELECT aluno_id, mes, disciplina_id, presencas, faltas FROM presencas_mes ORDER BY 1, 2, 3"))
+
+
+def test_resumos_de_presencas_coerentes_com_presencas(db, turma):
+    disciplina_id, (ana, beto, caio) = turma
+    with db.transacao() as conn:
+        fisica = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Física', 'Informatica', '10º')").lastrowid
+    presencas = Presenca(db)
+    # Fim de março e início de abril: semanas e meses diferentes
+    for data, ausentes in [("2026-03-30", [ana]), ("2026-04-01", []), ("2026-04-05", [beto, caio]),
+                           ("2026-04-06", [caio])]:
+        presencas.registrar_turma(disciplina_id, data, "Informatica", "A", ausentes)
+        presencas.registrar_turma(fisica, data, "Informatica", "A", [ana])
+    assert _resumos(db) == _resumos_esperados(db)
+
+    # Upserts: chamada corrigida e presença individual por cima de uma existente
+    presencas.registrar_turma(disciplina_id, "2026-03-30", "Informatica", "A", [beto])
+    presencas.registrar(caio, fisica, "2026-04-06", False)
+    presencas.registrar(ana, fisica, "2026-04-07", True)
+    assert _resumos(db) == _resumos_esperados(db)
+
+    # UPDATE que muda a aula de semana e de mês, DELETE direto e em cascata
+    with db.transacao() as conn:
+        conn.execute("UPDATE presencas SET data='2026-03-31' WHERE aluno_id=? AND data='2026-04-06'", (beto,))
+        conn.execute("DELETE FROM presencas WHERE aluno_id=? AND data='2026-04-01'", (ana,))
+        conn.execute("DELETE FROM alunos WHERE id=?", (caio,))
+    assert _resumos(db) == _resumos_esperados(db)
+    with db.conexao() as conn:
+        for tabela in ("presencas_dia", "presencas_semana", "presencas_mes"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE presencas + faltas <= 0").fetchone()[0] == 0
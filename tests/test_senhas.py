@@ -0,0 +1,64 @@
+import hashlib
+
+import pytest
+
+import senhas
+from sistema import Auth
+
+
+@pytest.fixture
+def auth(db):
+    return Auth(db, cache=senhas.CacheVerificacoes())
+
+
+def _guardar_usuario(db, username, armazenado):
+    with db.transacao() as conn:
+        conn.execute("INSERT INTO usuarios (username, senha, tipo, referencia_id) VALUES (?, ?, 'aluno', 1)",
+                     (username, armazenado))
+
+
+def _hash_guardado(db, username):
+    with db.conexao() as conn:
+        return conn.execute("SELECT senha FROM usuarios WHERE username=?", (username,)).fetchone()[0]
+
+
+def test_hash_scrypt_com_sal():
+    a, b = senhas.gerar_hash("segredo"), senhas.gerar_hash("segredo")
+    assert a != b and a.startswith(f"scrypt${senhas.SCRYPT_N}$8$1$")
+    assert senhas.verificar_senha("segredo", a) == (True, False)
+    assert senhas.verificar_senha("outra", a) == (False, False)
+    # Custo diferente do atual: confere, mas pede rehash
+    assert senhas.verificar_senha("segredo", senhas.gerar_hash("segredo", n=2 ** 9)) == (True, True)
+
+
+def test_login_com_hash_sha256_antigo_faz_rehash(db, auth):
+    _guardar_usuario(db, "ana", hashlib.sha256(b"segredo").hexdigest())
+    assert auth.verificar_credenciais("ana", "segredo")["tipo"] == "aluno"
+
+    novo = _hash_guardado(db, "ana")
+    assert novo.startswith(f"scrypt${senhas.SCRYPT_N}$")
+    assert senhas.verificar_senha("segredo", novo) == (True, False)
+    # Sem cache, o login continua a funcionar com o hash novo
+    assert Auth(db, cache=senhas.CacheVerificacoes(max_entradas=0)).verificar_credenciais("ana", "segredo")
+    assert auth.verificar_credenciais("ana", "errada") is None
+
+
+def test_senha_errada_recusada_mesmo_com_a_certa_em_cache(db, auth):
+    _guardar_usuario(db, "beto", senhas.gerar_hash("certa"))
+    assert auth.verificar_credenciais("beto", "certa")
+    assert auth.verificar_credenciais("beto", "certa")
+    assert auth.cache.estatisticas()["acertos"] == 1
+
+    assert auth.verificar_credenciais("beto", "errada") is None
+    assert auth.verificar_credenciais("beto", "") is None
+    assert auth.cache.estatisticas()["acertos"] == 1
+
+    # Senha trocada na base: a entrada em cache (ligada ao hash antigo) deixa de servir
+    with db.transacao() as conn:
+        conn.execute("UPDATE usuarios SET senha=? WHERE username='beto'", (senhas.gerar_hash("nova"),))
+    assert auth.verificar_credenciais("beto", "certa") is None
+    assert auth.verificar_credenciais("beto", "nova")
+
+
+def test_usuario_inexistente(auth):
+    assert auth.verificar_credenciais("ninguem", "x") is None
@@ -0,0 +1,54 @@
+import pytest
+
+from servidor import ErroHttp, Pedido, Servico
+
+
+@pytest.fixture
+def servico(db):
+    servico = Servico(db)
+    yield servico
+    servico.fechar()
+
+
+def _pedido(tipo="professor", ref=1, dados=None, query=None):
+    pedido = Pedido((), query or {}, dados or {}, "token")
+    pedido.usuario = {"tipo": tipo, "ref": ref}
+    return pedido
+
+
+def test_lancar_nota_normaliza_ou_recusa_o_trimestre(db, servico):
+    with db.transacao() as conn:
+        aluno_id = conn.execute(
+            "INSERT INTO alunos (nome, data_nascimento, curso) VALUES ('Ana', '2009-01-01', 'Informatica')").lastrowid
+        disciplina_id = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Matemática', 'Informatica', '10º')").lastrowid
+    nota = {"aluno_id": aluno_id, "disciplina_id": disciplina_id, "nota": 15}
+
+    assert servico.lancar_nota(_pedido(dados=dict(nota, trimestre="2ºtrimestre")))[0] == 201
+    with pytest.raises(ErroHttp) as erro:
+        servico.lancar_nota(_pedido(dados=dict(nota, trimestre="trimestre")))
+    assert erro.value.status == 400
+    with db.conexao() as conn:
+        assert conn.execute("SELECT trimestre FROM notas").fetchall() == [("2º Trimestre",)]
+
+
+@pytest.mark.parametrize("limite", ["0", "-5", "x"])
+def test_listagem_recusa_limite_invalido(servico, limite):
+    with pytest.raises(ErroHttp) as erro:
+        servico.listar_notas(_pedido(query={"limite": limite}))
+    assert erro.value.status == 400
+
+
+def test_listagem_pagina_com_limite(db, servico):
+    with db.transacao() as conn:
+        aluno_id = conn.execute(
+            "INSERT INTO alunos (nome, data_nascimento, curso) VALUES ('Ana', '2009-01-01', 'Informatica')").lastrowid
+        disciplina_id = conn.execute(
+            "INSERT INTO disciplinas (nome, curso, classe) VALUES ('Matemática', 'Informatica', '10º')").lastrowid
+        conn.executemany("INSERT INTO notas (aluno_id, disciplina_id, trimestre, nota) VALUES (?, ?, '1º Trimestre', ?)",
+                         [(aluno_id, disciplina_id, v) for v in (10, 12, 14)])
+
+    status, pagina = servico.listar_notas(_pedido(query={"limite": "2"}))
+    assert status == 200 and len(pagina["linhas"]) == 2 and pagina["proximo"] is not None
+    _, resto = servico.listar_notas(_pedido(query={"limite": "2", "depois": str(pagina["proximo"])}))
+    assert [r["nota"] for r in resto["linhas"]] == [14] and resto["proximo"] is None
@@ -0,0 +1,106 @@
+import pytest
+
+import sessoes
+
+USUARIO = {"id": 7, "tipo": "professor", "ref": 3}
+
+
+class RelogioFalso:
+    """Substitui o módulo time em sessoes: o teste decide as horas."""
+
+    def __init__(self, agora=1_000_000.0):
+        self.agora = agora
+
+    def time(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture(autouse=True)
+def usuario(db):
+    with db.transacao() as conn:
+        conn.execute("INSERT INTO usuarios (id, username, senha, tipo, referencia_id) VALUES (?, 'prof', 'x', ?, ?)",
+                     (USUARIO["id"], USUARIO["tipo"], USUARIO["ref"]))
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(sessoes, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def gestor(db, relogio):
+    return sessoes.GestorSessoes(db, duracao=3600, ttl_cache=60, intervalo_varredura=10 ** 9)
+
+
+def _linhas(db):
+    with db.conexao() as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessoes").fetchone()[0]
+
+
+def test_criar_e_validar_pela_cache(db, gestor):
+    token = gestor.criar(USUARIO)
+    assert _linhas(db) == 1
+    assert gestor.validar(token) == USUARIO
+    assert gestor.validar(token) == USUARIO
+    assert gestor.estatisticas()["acertos"] == 2
+    assert gestor.validar("token-inventado") is None
+    assert gestor.validar("") is None
+    # Na base só fica o hash do token
+    with db.conexao() as conn:
+        assert conn.execute("SELECT token_hash FROM sessoes").fetchone()[0] == sessoes.hash_token(token)
+
+
+def test_sessao_expirada_recusada_mesmo_em_cache(db, gestor, relogio):
+    token = gestor.criar(USUARIO)
+    relogio.avancar(3590)
+    assert gestor.validar(token) == USUARIO
+    assert gestor.estatisticas()["em_cache"] == 1
+    relogio.avancar(11)
+    assert gestor.validar(token) is None
+    assert gestor.validar(token) is None
+    assert gestor.varrer() == 1
+    assert _linhas(db) == 0
+
+
+def test_logout_recusa_o_token_logo(db, gestor):
+    token = gestor.criar(USUARIO)
+    outro = gestor.criar(USUARIO)
+    assert gestor.validar(token) == USUARIO
+    gestor.encerrar(token)
+    assert gestor.validar(token) is None
+    assert gestor.validar(token) is None
+    assert gestor.validar(outro) == USUARIO
+
+    assert gestor.encerrar_do_usuario(USUARIO["id"]) == 1
+    assert gestor.validar(outro) is None
+    assert _linhas(db) == 0
+
+
+def test_revogada_noutro_processo_dura_no_maximo_o_ttl_da_cache(db, gestor, relogio):
+    token = gestor.criar(USUARIO)
+    # Outro processo (outro gestor, mesma base) encerra a sessão
+    sessoes.GestorSessoes(db).encerrar(token)
+    # Até ao fim do ttl da cache a entrada em memória ainda vale...
+    relogio.avancar(59)
+    assert gestor.validar(token) == USUARIO
+    # ...depois vai à base, recusa e não volta a aceitar
+    relogio.avancar(2)
+    assert gestor.validar(token) is None
+    assert gestor.validar(token) is None
+    assert gestor.estatisticas()["em_cache"] == 0
+
+
+def test_varredura_periodica_apaga_as_expiradas(db, relogio):
+    gestor = sessoes.GestorSessoes(db, duracao=100, intervalo_varredura=50)
+    antigas = [gestor.criar(USUARIO) for _ in range(3)]
+    relogio.avancar(120)
+    nova = gestor.criar(USUARIO)
+    assert _linhas(db) == 1
+    assert gestor.estatisticas()["expiradas_removidas"] == 3
+    assert [gestor.validar(t) for t in antigas] == [None, None, None]
+    assert gestor.validar(nova) == USUARIO